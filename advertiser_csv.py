@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+広告主CSVを1回の読み込みで逐次解析するモジュール
+"""
+import io
+import re
+import os
+import csv
+from collections import namedtuple
+from loguru import logger
+
+from csv_encoding import SAMPLE_SIZE, detect_encoding_from_bytes, get_cached_encoding, remember_encoding
+
+# エンコーディング・改行コード判定に使う先頭バッファのサイズ（バイト）
+SNIFF_SIZE = SAMPLE_SIZE
+
+# この行数までにヘッダー行が見つからなければヘッダーなしとみなす
+HEADER_SCAN_LIMIT = 10
+
+# ヘッダー行（「ID」と「広告主」を含む行、またはパンくずの「広告管理」行）
+HEADER_PATTERN = re.compile(r'^(?:(?=.*id)(?=.*広告主)|(?=.*広告管理))', re.IGNORECASE | re.DOTALL)
+
+# 参照シートのF〜M列に対応する数値項目の数（表示率〜ネット）
+METRIC_COLUMNS = 8
+
+# 広告主1行分のデータ
+AdvertiserRow = namedtuple("AdvertiserRow", ["line_no", "advertiser_id", "name", "agency", "metrics"])
+
+def sniff_newline(sample):
+    """先頭バッファから改行コードを判定"""
+    if b'\r\n' in sample:
+        return "CRLF (Windows)"
+    if b'\r' in sample:
+        return "CR (旧Mac)"
+    if b'\n' in sample:
+        return "LF (Unix/Linux/新Mac)"
+    return "不明"
+
+def is_header_row(row):
+    """ヘッダー行かどうか"""
+    return HEADER_PATTERN.match(' '.join(row)) is not None
+
+def to_record(line_no, row):
+    """CSVの1行を広告主データに変換（代理店名の列ずれ補正込み）"""
+    # 代理店名（列ずれ補正）
+    agency = ""
+    if len(row) >= 3 and row[2].strip():
+        agency = row[2].strip()
+    elif len(row) >= 4 and row[3].strip():
+        agency = row[3].strip()
+    elif len(row) >= 5:
+        agency = ' '.join(cell.strip() for cell in row[2:] if cell.strip())
+
+    # 表示率〜ネット（空の値はNone）
+    metrics = [None] * METRIC_COLUMNS
+    for offset, val in enumerate(row[3:3 + METRIC_COLUMNS]):
+        if val and val.strip():
+            metrics[offset] = val
+
+    return AdvertiserRow(line_no, row[0], row[1], agency, tuple(metrics))
+
+def iter_advertiser_rows(file_path, info=None):
+    """広告主CSVを1回だけ開いて復号し、データ行を逐次返す
+
+    info に辞書を渡すと、判定したエンコーディング・改行コード・件数を格納する
+    """
+    if info is None:
+        info = {}
+
+    with open(file_path, 'rb', buffering=SNIFF_SIZE) as raw:
+        # 先頭バッファを消費せずに参照してエンコーディングと改行コードを判定
+        sample = raw.peek(SNIFF_SIZE)[:SNIFF_SIZE]
+        stat_result = os.fstat(raw.fileno())
+        encoding = get_cached_encoding(file_path, stat_result)
+        # 先頭バッファだけで判定した場合はファイル全体を復号できるとは限らないため、
+        # 復号できないバイトは置換文字にして読み進め、最後まで置換がなければキャッシュする
+        verified = encoding is not None
+        if not verified:
+            encoding = detect_encoding_from_bytes(sample, truncated=len(sample) >= SNIFF_SIZE)
+        info["encoding"] = encoding
+        info["replaced"] = 0
+        info["newline"] = sniff_newline(sample)
+        info["rows"] = 0
+        info["skipped"] = 0
+
+        logger.info(f"広告主CSVのエンコーディング: {encoding}")
+        logger.info(f"CSVファイル先頭50文字: {repr(sample[:100].decode(encoding, errors='replace')[:50])}")
+        logger.info(f"改行コード: {info['newline']}")
+
+        reader = csv.reader(io.TextIOWrapper(raw, encoding=encoding, errors='strict' if verified else 'replace', newline=''))
+
+        # ヘッダー行が見つかるまでの行（ヘッダーより前はパンくず等のため捨てる）
+        pending = []
+        header_done = False
+
+        for line_no, row in enumerate(reader, start=1):
+            if not verified and any('\ufffd' in cell for cell in row):
+                logger.warning(f"CSV {line_no}行目に{encoding}で復号できない文字があります（置換文字で読み込みます）")
+                info["replaced"] += 1
+
+            # 空行を除外
+            if not row or not any(cell.strip() for cell in row):
+                continue
+
+            if is_header_row(row):
+                logger.info(f"ヘッダー行として検出: {row}")
+                pending = []
+                header_done = True
+                continue
+
+            if not header_done:
+                pending.append((line_no, row))
+                if len(pending) < HEADER_SCAN_LIMIT:
+                    continue
+                # ヘッダー行がないファイルは先頭からデータとして扱う
+                logger.warning(f"先頭{HEADER_SCAN_LIMIT}行にヘッダー行がないため先頭からデータとして扱います")
+                header_done = True
+                rows, pending = pending, []
+            else:
+                rows = [(line_no, row)]
+
+            for data_line_no, data_row in rows:
+                # 行データの長さチェック
+                if len(data_row) < 3:
+                    logger.warning(f"CSV {data_line_no}行目はデータ不足のためスキップします: {data_row}")
+                    info["skipped"] += 1
+                    continue
+
+                info["rows"] += 1
+                yield to_record(data_line_no, data_row)
+
+        # ヘッダー行がないまま終わった短いファイル
+        for data_line_no, data_row in pending:
+            if len(data_row) < 3:
+                logger.warning(f"CSV {data_line_no}行目はデータ不足のためスキップします: {data_row}")
+                info["skipped"] += 1
+                continue
+
+            info["rows"] += 1
+            yield to_record(data_line_no, data_row)
+
+    if not verified and info["replaced"] == 0:
+        remember_encoding(file_path, encoding, stat_result)
+
+    logger.info(f"広告主CSVのデータ行数: {info['rows']}（スキップ {info['skipped']}行）")
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+共有フォルダ上の進捗ブックをローカルにキャッシュして作業するモジュール
+
+共有フォルダのブックはサイズ・更新時刻が変わった場合だけローカルにコピーし、
+Excelでの作業はローカルのコピーに対して行い、最後に共有フォルダへ書き戻す。
+"""
+import os
+import json
+import time
+import shutil
+from datetime import datetime
+from loguru import logger
+
+# 設定
+CONFIG = {
+    # ローカルの作業コピーの保存先
+    "cache_dir": os.path.join("meta", "book_cache")
+}
+
+class BookConflictError(Exception):
+    """コピー後に共有フォルダのブックが更新されていた"""
+
+def get_local_path(remote_path):
+    """作業コピーのパス"""
+    return os.path.abspath(os.path.join(CONFIG["cache_dir"], os.path.basename(remote_path)))
+
+def get_sidecar_path(local_path):
+    """作業コピーの状態ファイルのパス"""
+    return local_path + ".json"
+
+def file_state(path):
+    """比較用のファイル状態（サイズ・更新時刻）"""
+    stat_result = os.stat(path)
+    return {"size": stat_result.st_size, "mtime_ns": stat_result.st_mtime_ns}
+
+def load_sidecar(local_path):
+    """状態ファイルを読み込む（なければNone）"""
+    sidecar_path = get_sidecar_path(local_path)
+    if not os.path.exists(sidecar_path):
+        return None
+    try:
+        with open(sidecar_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"作業コピーの状態ファイルを読み込めません: {str(e)}")
+        return None
+
+def save_sidecar(local_path, remote_path, remote_state):
+    """状態ファイルを書き込む（共有フォルダ側とローカル側の状態を記録）"""
+    sidecar = {
+        "remote_path": remote_path,
+        "remote": remote_state,
+        "local": file_state(local_path)
+    }
+    sidecar_path = get_sidecar_path(local_path)
+    tmp_path = sidecar_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(sidecar, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, sidecar_path)
+
+def copy_atomic(src, dst):
+    """同じフォルダの一時ファイルにコピーしてから置き換える（途中で失敗しても既存ファイルを壊さない）"""
+    part_path = os.path.join(os.path.dirname(dst), f".{os.path.basename(dst)}.part")
+    try:
+        shutil.copy2(src, part_path)
+        os.replace(part_path, dst)
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+
+def checkout(remote_path, before_refresh=None):
+    """作業コピーを用意してパスと共有フォルダ側の状態を返す
+
+    共有フォルダのブックが前回コピー時から変わっていない場合はコピーを省略する。
+    before_refresh を渡すと、作業コピーを置き換える前に呼び出す（開いたままのブックを閉じる等）。
+    """
+    os.makedirs(CONFIG["cache_dir"], exist_ok=True)
+    local_path = get_local_path(remote_path)
+
+    start_time = time.time()
+    remote_state = file_state(remote_path)
+    stat_elapsed = time.time() - start_time
+
+    sidecar = load_sidecar(local_path)
+    if (sidecar and sidecar.get("remote_path") == remote_path and sidecar.get("remote") == remote_state
+            and os.path.exists(local_path) and sidecar.get("local") == file_state(local_path)):
+        logger.info(f"進捗ブックの作業コピーを使用します（共有フォルダ側は未更新）: {local_path}")
+        logger.info(f"[ネットワーク] 更新確認 {stat_elapsed:.2f}秒 / コピー省略")
+        return local_path, remote_state
+
+    if before_refresh is not None:
+        before_refresh(local_path)
+
+    start_time = time.time()
+    copy_atomic(remote_path, local_path)
+    copy_elapsed = time.time() - start_time
+    save_sidecar(local_path, remote_path, remote_state)
+
+    logger.info(f"進捗ブックを作業コピーに取得しました: {remote_path} → {local_path}")
+    logger.info(f"[ネットワーク] 更新確認 {stat_elapsed:.2f}秒 / コピー {copy_elapsed:.2f}秒（{remote_state['size']} バイト）")
+    return local_path, remote_state
+
+def checkin(local_path, remote_path, remote_state):
+    """作業コピーを共有フォルダに書き戻す（コピー後に共有フォルダ側が更新されていればBookConflictError）"""
+    start_time = time.time()
+    current_state = file_state(remote_path)
+
+    if current_state != remote_state:
+        # 作業コピーは別名で残し、共有フォルダ側は上書きしない
+        stamp = datetime.now().strftime('%Y%m%d%H%M%S')
+        root, ext = os.path.splitext(local_path)
+        conflict_path = f"{root}.conflict-{stamp}{ext}"
+        shutil.copy2(local_path, conflict_path)
+        logger.error(f"作業コピーの取得後に共有フォルダの進捗ブックが更新されています: {remote_path}")
+        logger.error(f"転記済みの作業コピーを保存しました: {conflict_path}")
+        raise BookConflictError(f"共有フォルダの進捗ブックが更新されているため書き戻しを中止しました: {remote_path}")
+
+    copy_atomic(local_path, remote_path)
+    save_sidecar(local_path, remote_path, file_state(remote_path))
+    elapsed = time.time() - start_time
+
+    logger.info(f"作業コピーを共有フォルダに書き戻しました: {remote_path}")
+    logger.info(f"[ネットワーク] 書き戻し {elapsed:.2f}秒（{os.path.getsize(local_path)} バイト）")
@@ -7,11 +7,15 @@ import os
 import sys
 import time
 import asyncio
-import shutil
+import json
+import hashlib
+import urllib.error
+import urllib.request
+from urllib.parse import quote_plus, unquote_plus, urlsplit
 from datetime import datetime, timedelta
 from loguru import logger
 from pathlib import Path
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+from playwright.async_api import async_playwright, Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
 
 # 設定情報
 CONFIG = {
@@ -24,7 +28,6 @@ CONFIG = {
    
     # パス設定
     "PATHS": {
-        "tmp_dir": "tmp",
         "csv_base_dir": "csv",
         "log_dir": "log",
     },
@@ -36,7 +39,7 @@ CONFIG = {
         "download": 120000,
     },
    
-    # 待機時間（秒）
+    # 待機時間（秒）- 待機戦略が有効な場合は各ステップの上限時間として使用
     "WAIT": {
         "between_steps": 5,
         "after_click": 2,
@@ -44,6 +47,39 @@ CONFIG = {
         "after_report_mode": 10
     },
    
+    # 待機戦略（固定待機の代わりに準備完了条件を待つ）
+    "WAIT_STRATEGY": {
+        # trueの場合、条件成立で即座に次へ進む。falseの場合、従来どおりWAITの秒数だけ固定待機
+        "event_driven": True,
+        # 検索結果テーブルの行セレクタ（行数が安定したら描画完了とみなす）
+        "result_rows": "#main_area table tr",
+        # 行数・通信が変化しない状態が続けば安定とみなす秒数
+        "stable_sec": 1.0,
+        # 条件の確認間隔（秒）
+        "poll_interval": 0.2,
+        # 検索・モード切替で完了を待つリクエストURLの一部（空文字なら全リクエスト）
+        "request_filter": "",
+    },
+   
+    # ログインセッションのキャッシュ設定
+    "SESSION": {
+        # trueの場合、ログイン後のstorage_stateを保存して次回以降のログインを省略
+        "enabled": True,
+        "state_file": os.path.join("meta", "session_state.json"),
+        # 保存から指定時間を超えたセッションは使わずに再ログイン
+        "max_age_hours": 12,
+    },
+   
+    # 直接エクスポート設定（DOM操作を省略してCSV出力フォームのPOSTを再送する）
+    "DIRECT_EXPORT": {
+        # trueの場合、記録済みのPOSTを再送してCSVを取得（失敗時は通常の画面操作に戻る）
+        "enabled": False,
+        # 画面操作時に記録したPOSTの保存先
+        "template_file": os.path.join("meta", "export_templates.json"),
+        # 送信先URLの上書き（空文字なら記録したURL。検証用のスタブサーバー等を指定）
+        "url": "",
+    },
+   
     # ブラウザ設定
     "BROWSER": {
         "headless": False,
@@ -52,7 +88,25 @@ CONFIG = {
     # 処理モード
     "PROCESSING_MODE": {
         # trueの場合、日付範囲を一括処理。falseの場合、日付ごとに個別処理
-        "range_as_batch": True
+        "range_as_batch": True,
+        # trueの場合、一般/アダルト/広告主CSVを別コンテキストで並列取得
+        "concurrent_fetch": False,
+        # 並列取得時に同時に操作するコンテキスト数の上限（管理画面への負荷対策）
+        "max_concurrency": 3,
+        # trueの場合、個別処理モードの日付を複数ページで並列にバックフィル
+        "backfill": False,
+    },
+   
+    # バックフィル設定（長期間の個別処理用）
+    "BACKFILL": {
+        # 並列に動かすワーカーページ数
+        "workers": 3,
+        # 1日付あたりの再試行回数
+        "max_retries": 2,
+        # 日付ごとの取得結果（完了・失敗）を記録するマニフェスト（csv_base_dir配下）
+        "manifest_file": "backfill_manifest.json",
+        # ブラウザが落ちた場合に起動し直す回数の上限（バックフィル全体）
+        "max_relaunches": 3,
     }
 }
 
@@ -142,6 +196,175 @@ def generate_date_range(start_date, end_date):
         
     return date_list
 
+# 待機統計（ステップ名 → 回数・上限合計・実待機合計）
+WAIT_STATS = {}
+
+async def _run_conditions(conditions):
+    """準備完了条件を順番にすべて満たすまで待機"""
+    for condition in conditions:
+        await condition()
+
+async def wait_ready(step, budget, *conditions):
+    """固定待機の代わりに準備完了条件を待機する（budget秒を上限とする）"""
+    start = time.time()
+   
+    if not CONFIG["WAIT_STRATEGY"]["event_driven"] or not conditions:
+        await asyncio.sleep(budget)
+    else:
+        try:
+            await asyncio.wait_for(_run_conditions(conditions), timeout=budget)
+        except asyncio.TimeoutError:
+            logger.warning(f"[待機] {step}: 上限{budget}秒以内に準備完了を確認できなかったため続行します")
+        except Exception as e:
+            # 条件の判定自体に失敗した場合は従来どおり残り時間を待機する
+            logger.warning(f"[待機] {step}: 条件判定に失敗したため固定待機に切り替えます - {str(e)}")
+            await asyncio.sleep(max(0.0, budget - (time.time() - start)))
+   
+    elapsed = time.time() - start
+    saved = max(0.0, budget - elapsed)
+   
+    stats = WAIT_STATS.setdefault(step, {"count": 0, "budget": 0.0, "elapsed": 0.0})
+    stats["count"] += 1
+    stats["budget"] += budget
+    stats["elapsed"] += elapsed
+   
+    logger.info(f"[待機] {step}: {elapsed:.1f}秒（上限{budget}秒, 短縮{saved:.1f}秒）")
+
+def log_wait_summary():
+    """待機ステップごとの短縮時間をログ出力"""
+    if not WAIT_STATS:
+        return
+   
+    total_budget = sum(s["budget"] for s in WAIT_STATS.values())
+    total_elapsed = sum(s["elapsed"] for s in WAIT_STATS.values())
+   
+    logger.info("==== 待機時間サマリー ====")
+    for step, stats in WAIT_STATS.items():
+        saved = max(0.0, stats["budget"] - stats["elapsed"])
+        logger.info(f"  {step}: {stats['count']}回, 実待機{stats['elapsed']:.1f}秒 / 上限{stats['budget']:.1f}秒（短縮{saved:.1f}秒）")
+    logger.info(f"待機合計: 実待機{total_elapsed:.1f}秒 / 上限{total_budget:.1f}秒（短縮{max(0.0, total_budget - total_elapsed):.1f}秒）")
+
+def network_idle(page):
+    """条件: ページ読み込み後に通信が落ち着いた（読み込み済みのページでは即座に満たされるため、画面遷移の直後だけに使う）"""
+    async def condition():
+        await page.wait_for_load_state("networkidle", timeout=0)
+    return condition
+
+class RequestWatcher:
+    """with文の間だけページのリクエストを追跡する（条件を待たずに抜けた場合もリスナーを必ず外す）"""
+
+    def __init__(self, page, url_part=None, require_seen=True):
+        self.page = page
+        self.url_part = CONFIG["WAIT_STRATEGY"]["request_filter"] if url_part is None else url_part
+        # Falseの場合、リクエストが1件も発生しなくても一定時間途絶えれば完了とみなす
+        self.require_seen = require_seen
+        self.pending = 0
+        self.seen = False
+        self.last = time.time()
+
+    def _on_request(self, request):
+        if self.url_part in request.url:
+            self.pending += 1
+            self.seen = True
+            self.last = time.time()
+
+    def _on_done(self, request):
+        if self.url_part in request.url:
+            self.pending = max(0, self.pending - 1)
+            self.last = time.time()
+
+    def __enter__(self):
+        self.page.on("request", self._on_request)
+        self.page.on("requestfinished", self._on_done)
+        self.page.on("requestfailed", self._on_done)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.page.remove_listener("request", self._on_request)
+        self.page.remove_listener("requestfinished", self._on_done)
+        self.page.remove_listener("requestfailed", self._on_done)
+        return False
+
+    async def settled(self):
+        """条件: 追跡中のリクエストがすべて完了し一定時間途絶えた"""
+        quiet = CONFIG["WAIT_STRATEGY"]["stable_sec"]
+        while ((self.require_seen and not self.seen) or self.pending > 0
+               or time.time() - self.last < quiet):
+            await asyncio.sleep(CONFIG["WAIT_STRATEGY"]["poll_interval"])
+
+def watch_requests(page, url_part=None, require_seen=True):
+    """操作の直前にwith文で使う。settled が条件: 操作で発生したリクエストがすべて完了し一定時間途絶えた"""
+    return RequestWatcher(page, url_part, require_seen)
+
+def rows_stable(page, selector=None):
+    """条件: 結果テーブルの行数が一定時間変化しない"""
+    if selector is None:
+        selector = CONFIG["WAIT_STRATEGY"]["result_rows"]
+   
+    async def condition():
+        interval = CONFIG["WAIT_STRATEGY"]["poll_interval"]
+        stable_sec = CONFIG["WAIT_STRATEGY"]["stable_sec"]
+        last_count = -1
+        stable_since = time.time()
+        while True:
+            try:
+                count = await page.locator(selector).count()
+            except Exception:
+                # 画面遷移中はDOMが取得できないため変化ありとみなす
+                count = -1
+            if count != last_count:
+                last_count = count
+                stable_since = time.time()
+            elif count > 0 and time.time() - stable_since >= stable_sec:
+                return
+            await asyncio.sleep(interval)
+    return condition
+
+def checkbox_state(page, selector, expected):
+    """条件: チェックボックスが期待した状態になっている"""
+    async def condition():
+        while await page.is_checked(selector) != expected:
+            await asyncio.sleep(CONFIG["WAIT_STRATEGY"]["poll_interval"])
+    return condition
+
+def input_value(page, selector, expected):
+    """条件: 入力欄が期待した値になっている"""
+    async def condition():
+        while await page.input_value(selector) != expected:
+            await asyncio.sleep(CONFIG["WAIT_STRATEGY"]["poll_interval"])
+    return condition
+
+def select_index(page, selector, index):
+    """条件: プルダウンが期待した位置を選択している"""
+    async def condition():
+        await page.wait_for_function(
+            "([selector, index]) => { const el = document.querySelector(selector); return !!el && el.selectedIndex === index; }",
+            arg=[selector, index],
+            timeout=0,
+            polling=int(CONFIG["WAIT_STRATEGY"]["poll_interval"] * 1000),
+        )
+    return condition
+
+def display_items_synced(page):
+    """条件: hiddenフィールド display_items がチェック済み項目と一致している"""
+    async def condition():
+        await page.wait_for_function(
+            """() => {
+                const form = document.forms['mainform'];
+                if (!form || !form.display_items) return false;
+                const items = Array.from(form.querySelectorAll('input[name="check_display_items"]:checked'))
+                                    .map(cb => cb.value)
+                                    .join(',');
+                return form.display_items.value !== '' && form.display_items.value === items;
+            }""",
+            timeout=0,
+            polling=int(CONFIG["WAIT_STRATEGY"]["poll_interval"] * 1000),
+        )
+    return condition
+
+# ログインフォーム（表示されていればログアウト状態）
+LOGIN_FORM_XPATH = "//*[@id='topmenu']/tbody/tr[2]/td/div[1]/form"
+
 async def login(page, logger):
     """ログイン処理を実行"""
     logger.info("ログイン処理を開始します")
@@ -158,21 +381,278 @@ async def login(page, logger):
    
     logger.info("ログインに成功しました")
    
+    await open_campaign_report(page)
+
+async def open_campaign_report(page):
+    """キャンペーン画面に遷移してレポートモードに切り替える（ログイン済み前提）"""
     await page.click("//*[@id='sidemenu']/div[1]/a[8]/div")
     await page.wait_for_load_state("networkidle")
    
     logger.info("キャンペーン画面に遷移しました")
    
     # レポートボタンをクリック
-    await page.click("//*[@id='display_modesummary_mode']")
-    logger.info("レポートモードボタンをクリックしました")
-   
-    # レポートモードに完全にロードされるのを待機
-    await page.wait_for_load_state("networkidle")
-    await asyncio.sleep(CONFIG["WAIT"]["after_report_mode"])
+    with watch_requests(page) as report_requests:
+        await page.click("//*[@id='display_modesummary_mode']")
+        logger.info("レポートモードボタンをクリックしました")
+
+        # レポートモードに完全にロードされるのを待機
+        await page.wait_for_load_state("networkidle")
+        await wait_ready("レポートモード切替", CONFIG["WAIT"]["after_report_mode"],
+                         report_requests.settled, network_idle(page), rows_stable(page))
    
     logger.info("レポートモードに正常に切り替わりました")
 
+def csv_file_name(kind, start_date, end_date):
+    """保存するCSVファイル名（日付範囲の場合は先頭に範囲を付ける）"""
+    file_prefix = ""
+    if start_date != end_date:
+        file_prefix = f"{start_date}-{end_date}_"
+   
+    if kind == "advertiser":
+        return f"{file_prefix}advertiser.csv"
+    return f"{file_prefix}{kind}_campane.csv"
+
+# 保存したCSVのバイト数とチェックサムの記録先（CSVフォルダごと）
+DOWNLOAD_MANIFEST = "download_manifest.json"
+
+def partial_path(save_path):
+    """書き込み途中のファイル名（excel_writer.py等が誤って読まない名前）"""
+    directory, name = os.path.split(save_path)
+    return os.path.join(directory, f".{name}.part")
+
+def record_download(save_path, file_size, checksum):
+    """保存したCSVのバイト数とチェックサムをフォルダ内のマニフェストに記録"""
+    directory, name = os.path.split(save_path)
+    manifest_path = os.path.join(directory, DOWNLOAD_MANIFEST)
+   
+    manifest = {}
+    if os.path.exists(manifest_path):
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+   
+    manifest[name] = {
+        "bytes": file_size,
+        "sha256": checksum,
+        "saved_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+   
+    tmp_manifest = manifest_path + ".tmp"
+    with open(tmp_manifest, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_manifest, manifest_path)
+
+def commit_partial(part_path, save_path, file_size, checksum):
+    """書き込み完了した一時ファイルを本来のファイル名に置き換えて記録"""
+    os.replace(part_path, save_path)
+    record_download(save_path, file_size, checksum)
+    logger.info(f"CSVを確定しました: {save_path}（{file_size} バイト, sha256={checksum[:12]}…）")
+
+async def save_download(download, save_path):
+    """ダウンロードを保存先フォルダに1回だけ書き込み、完了後にアトミックに置き換える"""
+    part_path = partial_path(save_path)
+    try:
+        await download.save_as(part_path)
+       
+        sha256 = hashlib.sha256()
+        file_size = 0
+        with open(part_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha256.update(chunk)
+                file_size += len(chunk)
+       
+        commit_partial(part_path, save_path, file_size, sha256.hexdigest())
+        return file_size, sha256.hexdigest()
+    except Exception:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+
+# 直接エクスポートの応答を一時ファイルに書き込む単位（バイト）
+EXPORT_CHUNK_SIZE = 256 * 1024
+
+def save_stream(response, save_path):
+    """応答を少しずつ一時ファイルに書き込み（全体をメモリに載せない）、完了後にアトミックに置き換える"""
+    part_path = partial_path(save_path)
+    try:
+        sha256 = hashlib.sha256()
+        file_size = 0
+        with open(part_path, "wb") as f:
+            while True:
+                chunk = response.read(EXPORT_CHUNK_SIZE)
+                if not chunk:
+                    break
+                f.write(chunk)
+                sha256.update(chunk)
+                file_size += len(chunk)
+       
+        checksum = sha256.hexdigest()
+        commit_partial(part_path, save_path, file_size, checksum)
+        return file_size, checksum
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+
+def load_export_templates():
+    """記録済みのCSV出力リクエストを読み込む"""
+    template_file = Path(CONFIG["DIRECT_EXPORT"]["template_file"])
+    if not template_file.exists():
+        return {}
+   
+    try:
+        with open(template_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"CSV出力リクエストの記録を読み込めません: {str(e)}")
+        return {}
+
+def save_export_template(kind, template):
+    """CSV出力リクエストを種類ごとに記録"""
+    templates = load_export_templates()
+    templates[kind] = template
+   
+    template_file = Path(CONFIG["DIRECT_EXPORT"]["template_file"])
+    template_file.parent.mkdir(parents=True, exist_ok=True)
+   
+    tmp_path = template_file.with_name(template_file.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(templates, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, template_file)
+    logger.info(f"CSV出力リクエストを記録しました: {kind}")
+
+def build_export_body(template, start_date, end_date):
+    """記録したフォーム本文の日付だけを差し替える（他の値はエンコードをそのまま維持）"""
+    replacements = {
+        template["from_field"]: quote_plus(format_date_for_site(start_date)),
+        template["to_field"]: quote_plus(format_date_for_site(end_date)),
+    }
+   
+    parts = []
+    for part in template["body"].split("&"):
+        key, sep, value = part.partition("=")
+        name = unquote_plus(key)
+        if sep and name in replacements:
+            value = replacements[name]
+        parts.append(f"{key}{sep}{value}")
+   
+    return "&".join(parts)
+
+async def export_csv_download(page, kind, start_date, end_date):
+    """sub_export('csv')を実行してダウンロードを取得し、送信されたPOSTを直接エクスポート用に記録"""
+    captured = []
+   
+    def on_request(request):
+        if request.method == "POST" and not captured:
+            captured.append(request)
+   
+    page.on("request", on_request)
+    try:
+        async with page.expect_download(timeout=CONFIG["TIMEOUT"]["download"]) as download_info:
+            await page.evaluate("sub_export('csv')")
+            logger.info("JavaScriptでCSV出力関数を実行しました")
+       
+        download = await download_info.value
+    finally:
+        page.remove_listener("request", on_request)
+   
+    # 記録に失敗しても通常のダウンロードは続行する
+    try:
+        if captured and captured[0].post_data:
+            from_field = await page.eval_on_selector("#cal_input_from", "el => el.name")
+            to_field = await page.eval_on_selector("#cal_input_to", "el => el.name")
+            save_export_template(kind, {
+                "url": captured[0].url,
+                "body": captured[0].post_data,
+                "from_field": from_field,
+                "to_field": to_field,
+                "captured_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            })
+        else:
+            logger.warning(f"CSV出力のPOSTリクエストを記録できませんでした: {kind}")
+    except Exception as e:
+        logger.warning(f"CSV出力リクエストの記録に失敗しました: {str(e)}")
+   
+    return download
+
+def build_cookie_header(cookies, url):
+    """ブラウザコンテキストのCookieのうち、送信先URLに送るものをCookieヘッダーにまとめる"""
+    parts = urlsplit(url)
+    host = parts.hostname or ""
+    path = parts.path or "/"
+   
+    pairs = []
+    for cookie in cookies:
+        domain = cookie["domain"].lstrip(".")
+        if host != domain and not host.endswith("." + domain):
+            continue
+        if not path.startswith(cookie.get("path") or "/"):
+            continue
+        if cookie.get("secure") and parts.scheme != "https":
+            continue
+        pairs.append(f"{cookie['name']}={cookie['value']}")
+    return "; ".join(pairs)
+
+def post_export(url, body, headers, save_path):
+    """POSTを送り、応答のCSVを保存する（ブロッキング処理のため別スレッドで実行）"""
+    request = urllib.request.Request(url, data=body.encode("utf-8"), headers=headers, method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=CONFIG["TIMEOUT"]["download"] / 1000) as response:
+            # ログアウト状態ではCSVではなくHTML（ログイン画面）が返る
+            content_type = response.headers.get("content-type", "")
+            disposition = response.headers.get("content-disposition", "")
+            if "text/html" in content_type and "attachment" not in disposition:
+                raise Exception(f"直接エクスポートでCSV以外の応答を受信しました: {content_type}")
+           
+            return save_stream(response, save_path)
+    except urllib.error.HTTPError as e:
+        raise Exception(f"直接エクスポートが失敗しました: HTTP {e.code}")
+
+async def direct_export(request_context, kind, csv_dir, start_date, end_date, template):
+    """記録したPOSTをログイン中のCookieで再送し、CSVを少しずつ保存
+
+    APIRequestContextの応答は本文全体をメモリに読み込むため、送信はurllibで行い
+    CookieだけAPIRequestContext（ブラウザコンテキスト）から引き継ぐ。
+    """
+    url = CONFIG["DIRECT_EXPORT"]["url"] or template["url"]
+    body = build_export_body(template, start_date, end_date)
+   
+    state = await request_context.storage_state()
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    cookie = build_cookie_header(state.get("cookies", []), url)
+    if cookie:
+        headers["Cookie"] = cookie
+   
+    start_time = time.time()
+    save_path = os.path.join(csv_dir, csv_file_name(kind, start_date, end_date))
+    file_size, _ = await asyncio.to_thread(post_export, url, body, headers, save_path)
+   
+    logger.info(f"直接エクスポートでCSVを保存しました: {save_path}（{file_size} バイト, {time.time() - start_time:.1f}秒）")
+    return save_path
+
+async def try_direct_export(request_context, csv_dir, start_date, end_date):
+    """記録済みのPOSTで3種類のCSVを直接取得（取得できなければFalseを返し画面操作に任せる）"""
+    if not CONFIG["DIRECT_EXPORT"]["enabled"]:
+        return False
+   
+    templates = load_export_templates()
+    kinds = ["general", "adult", "advertiser"]
+    missing = [kind for kind in kinds if kind not in templates]
+    if missing:
+        logger.info(f"CSV出力リクエストが未記録のため画面操作で取得します: {', '.join(missing)}")
+        return False
+   
+    try:
+        await asyncio.gather(*[
+            direct_export(request_context, kind, csv_dir, start_date, end_date, templates[kind])
+            for kind in kinds
+        ])
+        return True
+    except Exception as e:
+        logger.warning(f"直接エクスポートに失敗したため画面操作で取得します: {str(e)}")
+        return False
+
 async def process_csv(page, logger, mode, csv_dir, start_date, end_date):
     """CSV取得処理（一般/アダルト共通）- 日付範囲対応"""
     mode_jp = "一般" if mode == "general" else "アダルト"
@@ -190,17 +670,21 @@ async def process_csv(page, logger, mode, csv_dir, start_date, end_date):
     await page.focus("//*[@id='cal_input_from']")
     await page.fill("//*[@id='cal_input_from']", start_date_str)
     logger.info(f"開始日を設定しました: {start_date_str}")
-    await asyncio.sleep(CONFIG["WAIT"]["after_click"])
+    await wait_ready("開始日入力", CONFIG["WAIT"]["after_click"],
+                     input_value(page, "//*[@id='cal_input_from']", start_date_str))
     
     # 重要: 終了日フィールドにフォーカスしてから入力
     await page.focus("//*[@id='cal_input_to']")
     await page.fill("//*[@id='cal_input_to']", end_date_str)
     logger.info(f"終了日を設定しました: {end_date_str}")
-    await asyncio.sleep(CONFIG["WAIT"]["after_click"])
+    await wait_ready("終了日入力", CONFIG["WAIT"]["after_click"],
+                     input_value(page, "//*[@id='cal_input_to']", end_date_str))
     
     # フォーカスを外して日付入力を確定
     await page.click("body")
-    await asyncio.sleep(CONFIG["WAIT"]["after_click"])
+    await wait_ready("日付入力確定", CONFIG["WAIT"]["after_click"],
+                     input_value(page, "//*[@id='cal_input_from']", start_date_str),
+                     input_value(page, "//*[@id='cal_input_to']", end_date_str))
     
     # 入力内容を検証 (とても重要)
     actual_start = await page.input_value("//*[@id='cal_input_from']")
@@ -217,7 +701,9 @@ async def process_csv(page, logger, mode, csv_dir, start_date, end_date):
         # 既存の入力をクリア
         await page.fill("//*[@id='cal_input_from']", "")
         await page.fill("//*[@id='cal_input_to']", "")
-        await asyncio.sleep(1)
+        await wait_ready("日付クリア", 1,
+                         input_value(page, "//*[@id='cal_input_from']", ""),
+                         input_value(page, "//*[@id='cal_input_to']", ""))
         
         # JavaScriptで直接設定
         await page.evaluate(f"""
@@ -225,7 +711,9 @@ async def process_csv(page, logger, mode, csv_dir, start_date, end_date):
             document.querySelector('#cal_input_to').value = '{end_date_str}';
         """)
         logger.info("JavaScriptで日付を設定しました")
-        await asyncio.sleep(1)
+        await wait_ready("日付再設定", 1,
+                         input_value(page, "//*[@id='cal_input_from']", start_date_str),
+                         input_value(page, "//*[@id='cal_input_to']", end_date_str))
         
         # 再検証
         actual_start = await page.input_value("//*[@id='cal_input_from']")
@@ -243,20 +731,23 @@ async def process_csv(page, logger, mode, csv_dir, start_date, end_date):
         if adult_checked:
             await page.click(adult_checkbox)
             logger.info("「アダルト」チェックボックスを解除しました")
-            await asyncio.sleep(CONFIG["WAIT"]["after_click"])
+            await wait_ready("チェックボックス操作", CONFIG["WAIT"]["after_click"],
+                             checkbox_state(page, adult_checkbox, False))
     else:
         # 「アダルト」モードの場合：一般チェックを外し、アダルトチェックを入れる
         general_checked = await page.is_checked(general_checkbox)
         if general_checked:
             await page.click(general_checkbox)
             logger.info("「一般」チェックボックスを解除しました")
-            await asyncio.sleep(CONFIG["WAIT"]["after_click"])
+            await wait_ready("チェックボックス操作", CONFIG["WAIT"]["after_click"],
+                             checkbox_state(page, general_checkbox, False))
        
         adult_checked = await page.is_checked(adult_checkbox)
         if not adult_checked:
             await page.click(adult_checkbox)
             logger.info("「アダルト」チェックボックスを選択しました")
-            await asyncio.sleep(CONFIG["WAIT"]["after_click"])
+            await wait_ready("チェックボックス操作", CONFIG["WAIT"]["after_click"],
+                             checkbox_state(page, adult_checkbox, True))
    
     # 代理店名プルダウン選択 - JavaScriptで直接実行
     await page.evaluate("""
@@ -276,7 +767,8 @@ async def process_csv(page, logger, mode, csv_dir, start_date, end_date):
         })();
     """)
     logger.info("代理店名を選択しました")
-    await asyncio.sleep(CONFIG["WAIT"]["after_click"])
+    await wait_ready("プルダウン選択", CONFIG["WAIT"]["after_click"],
+                     select_index(page, "#main_area > form > div.where > select:nth-child(41)", 6))
    
     # 検索条件プルダウン選択 - JavaScriptで直接実行
     await page.evaluate("""
@@ -296,21 +788,25 @@ async def process_csv(page, logger, mode, csv_dir, start_date, end_date):
         })();
     """)
     logger.info("検索条件を選択しました")
-    await asyncio.sleep(CONFIG["WAIT"]["after_click"])
+    await wait_ready("プルダウン選択", CONFIG["WAIT"]["after_click"],
+                     select_index(page, "#main_area > form > div.where > select:nth-child(42)", 4))
    
     # キーワード入力
     search_text = "9999_フィングネットワーク広告" if mode == "adult" else "9999_EC自社運用"
     await page.fill("#main_area > form > div.where > input:nth-child(43)", search_text)
     logger.info(f"検索語（{search_text}）を入力しました")
-    await asyncio.sleep(CONFIG["WAIT"]["after_click"])
+    await wait_ready("検索語入力", CONFIG["WAIT"]["after_click"],
+                     input_value(page, "#main_area > form > div.where > input:nth-child(43)", search_text))
    
     # 検索ボタンクリック
-    await page.click("#main_area > form > div.where > input.btn")
-    logger.info("検索ボタンをクリックしました")
-   
-    # 検索結果表示を待機
-    logger.info(f"検索結果待機中... ({CONFIG['WAIT']['after_search']}秒)")
-    await asyncio.sleep(CONFIG["WAIT"]["after_search"])
+    with watch_requests(page) as search_requests:
+        await page.click("#main_area > form > div.where > input.btn")
+        logger.info("検索ボタンをクリックしました")
+       
+        # 検索結果表示を待機（上限: after_search秒）
+        logger.info(f"検索結果待機中... (上限{CONFIG['WAIT']['after_search']}秒)")
+        await wait_ready("検索結果表示", CONFIG["WAIT"]["after_search"],
+                         search_requests.settled, network_idle(page), rows_stable(page))
    
     search_time = int(time.time() - start_time)
     logger.info(f"{mode_jp}CSV検索処理完了（処理時間：{search_time}秒）")
@@ -319,37 +815,19 @@ async def process_csv(page, logger, mode, csv_dir, start_date, end_date):
     logger.info("CSVダウンロードボタンをクリックします...")
    
     try:
-        # JavaScriptでsub_export関数を直接呼び出す
-        async with page.expect_download(timeout=CONFIG["TIMEOUT"]["download"]) as download_info:
-            await page.evaluate("sub_export('csv')")
-            logger.info("JavaScriptでCSV出力関数を実行しました")
-       
-        download = await download_info.value
-        logger.info(f"ダウンロードが開始されました: {download.suggested_filename}")
-       
-        # 一時保存先ファイル名
-        tmp_path = os.path.join(CONFIG["PATHS"]["tmp_dir"], download.suggested_filename)
-        await download.save_as(tmp_path)
-        logger.info(f"CSVファイルをダウンロードしました: {tmp_path}")
-       
-        # ファイルの存在確認
-        if not os.path.exists(tmp_path):
-            raise FileNotFoundError(f"ダウンロードしたファイルが見つかりません: {tmp_path}")
-       
-        file_size = os.path.getsize(tmp_path)
-        logger.info(f"ダウンロードしたファイルのサイズ: {file_size} バイト")
-       
-        # 本保存先にリネームしてコピー
-        # ファイル名に日付範囲を含める
-        file_prefix = ""
-        if start_date != end_date:
-            file_prefix = f"{start_date}-{end_date}_"
-            
-        save_path = os.path.join(csv_dir, f"{file_prefix}{mode}_campane.csv")
-        shutil.copy2(tmp_path, save_path)
-        logger.info(f"{mode_jp}CSV保存：{save_path}")
-        # ▼▼▼ ダウンロード後の反映待機（5秒） ▼▼▼
-        await asyncio.sleep(5)
+        # ダウンロード操作で発生したリクエストを追跡（ダウンロード以外の通信がなくても一定時間で完了）
+        with watch_requests(page, require_seen=False) as export_requests:
+            # JavaScriptでsub_export関数を直接呼び出す
+            download = await export_csv_download(page, mode, start_date, end_date)
+            logger.info(f"ダウンロードが開始されました: {download.suggested_filename}")
+           
+            # 保存先フォルダ内の一時ファイルに書き込み、完了後に本来のファイル名へ置き換える
+            save_path = os.path.join(csv_dir, csv_file_name(mode, start_date, end_date))
+            file_size, _ = await save_download(download, save_path)
+            logger.info(f"ダウンロードしたファイルのサイズ: {file_size} バイト")
+            logger.info(f"{mode_jp}CSV保存：{save_path}")
+            # ▼▼▼ ダウンロード後の反映待機（上限5秒） ▼▼▼
+            await wait_ready("ダウンロード後", 5, export_requests.settled)
        
         return True
     except Exception as e:
@@ -365,9 +843,11 @@ async def get_advertiser_csv(page, csv_dir, start_date, end_date):
     await page.wait_for_load_state("networkidle")
    
     # レポートモードに切り替え
-    await page.click("//*[@id='display_modesummary_mode']")
-    await page.wait_for_load_state("networkidle")
-    await asyncio.sleep(CONFIG["WAIT"]["after_report_mode"])
+    with watch_requests(page) as report_requests:
+        await page.click("//*[@id='display_modesummary_mode']")
+        await page.wait_for_load_state("networkidle")
+        await wait_ready("レポートモード切替", CONFIG["WAIT"]["after_report_mode"],
+                         report_requests.settled, network_idle(page), rows_stable(page))
    
     # 日付範囲を設定 - 開始日と終了日を別々に設定
     start_date_str = format_date_for_site(start_date)
@@ -377,17 +857,21 @@ async def get_advertiser_csv(page, csv_dir, start_date, end_date):
     await page.focus("//*[@id='cal_input_from']")
     await page.fill("//*[@id='cal_input_from']", start_date_str)
     logger.info(f"開始日を設定しました: {start_date_str}")
-    await asyncio.sleep(CONFIG["WAIT"]["after_click"])
+    await wait_ready("開始日入力", CONFIG["WAIT"]["after_click"],
+                     input_value(page, "//*[@id='cal_input_from']", start_date_str))
     
     # 重要: 終了日フィールドにフォーカスしてから入力
     await page.focus("//*[@id='cal_input_to']")
     await page.fill("//*[@id='cal_input_to']", end_date_str)
     logger.info(f"終了日を設定しました: {end_date_str}")
-    await asyncio.sleep(CONFIG["WAIT"]["after_click"])
+    await wait_ready("終了日入力", CONFIG["WAIT"]["after_click"],
+                     input_value(page, "//*[@id='cal_input_to']", end_date_str))
     
     # フォーカスを外して日付入力を確定
     await page.click("body")
-    await asyncio.sleep(CONFIG["WAIT"]["after_click"])
+    await wait_ready("日付入力確定", CONFIG["WAIT"]["after_click"],
+                     input_value(page, "//*[@id='cal_input_from']", start_date_str),
+                     input_value(page, "//*[@id='cal_input_to']", end_date_str))
     
     # 入力内容を検証 (とても重要)
     actual_start = await page.input_value("//*[@id='cal_input_from']")
@@ -404,7 +888,9 @@ async def get_advertiser_csv(page, csv_dir, start_date, end_date):
         # 既存の入力をクリア
         await page.fill("//*[@id='cal_input_from']", "")
         await page.fill("//*[@id='cal_input_to']", "")
-        await asyncio.sleep(1)
+        await wait_ready("日付クリア", 1,
+                         input_value(page, "//*[@id='cal_input_from']", ""),
+                         input_value(page, "//*[@id='cal_input_to']", ""))
         
         # JavaScriptで直接設定
         await page.evaluate(f"""
@@ -412,7 +898,9 @@ async def get_advertiser_csv(page, csv_dir, start_date, end_date):
             document.querySelector('#cal_input_to').value = '{end_date_str}';
         """)
         logger.info("JavaScriptで日付を設定しました")
-        await asyncio.sleep(1)
+        await wait_ready("日付再設定", 1,
+                         input_value(page, "//*[@id='cal_input_from']", start_date_str),
+                         input_value(page, "//*[@id='cal_input_to']", end_date_str))
         
         # 再検証
         actual_start = await page.input_value("//*[@id='cal_input_from']")
@@ -431,7 +919,8 @@ async def get_advertiser_csv(page, csv_dir, start_date, end_date):
     # 修正: 代理店名チェックボックス選択 - XPath指定を使用
     await page.check("//*[@id=\"display_itemsagency_name\"]")
     logger.info("代理店名チェックボックスを選択しました")
-    await asyncio.sleep(CONFIG["WAIT"]["after_click"])
+    await wait_ready("チェックボックス操作", CONFIG["WAIT"]["after_click"],
+                     checkbox_state(page, "//*[@id=\"display_itemsagency_name\"]", True))
 
     # ▼ hiddenの display_items をJSで再計算して強制更新（Playwrightのcheckではonclickが発火しないため）
     await page.evaluate("""
@@ -448,7 +937,8 @@ async def get_advertiser_csv(page, csv_dir, start_date, end_date):
     if profit_checked:
         await page.click("//*[@id=\"display_itemsprofit\"]")
         logger.info("利益項目チェックボックスを解除しました")
-        await asyncio.sleep(CONFIG["WAIT"]["after_click"])
+        await wait_ready("チェックボックス操作", CONFIG["WAIT"]["after_click"],
+                         checkbox_state(page, "//*[@id=\"display_itemsprofit\"]", False))
 
         # ▼ display_items 再設定をここでも必ず実行する
         await page.evaluate("""
@@ -468,7 +958,8 @@ async def get_advertiser_csv(page, csv_dir, start_date, end_date):
     if cpc_gross_checked:
         await page.click("//*[@id=\"display_itemscpc_gross\"]")
         logger.info("CPC(グロス)チェックボックスを解除しました")
-        await asyncio.sleep(CONFIG["WAIT"]["after_click"])
+        await wait_ready("チェックボックス操作", CONFIG["WAIT"]["after_click"],
+                         checkbox_state(page, "//*[@id=\"display_itemscpc_gross\"]", False))
 
         # ▼ display_items 再設定をここでも必ず実行する
         await page.evaluate("""
@@ -488,7 +979,8 @@ async def get_advertiser_csv(page, csv_dir, start_date, end_date):
     if ecpm_gross_checked:
         await page.click("//*[@id=\"display_itemscpm_gross\"]")
         logger.info("eCPM(グロス)チェックボックスを解除しました")
-        await asyncio.sleep(CONFIG["WAIT"]["after_click"])
+        await wait_ready("チェックボックス操作", CONFIG["WAIT"]["after_click"],
+                         checkbox_state(page, "//*[@id=\"display_itemscpm_gross\"]", False))
 
         # ▼ display_items 再設定をここでも必ず実行する
         await page.evaluate("""
@@ -509,61 +1001,47 @@ async def get_advertiser_csv(page, csv_dir, start_date, end_date):
         "input.btn[value='検索']",
         "#main_area > form > div.where > input.btn"
     ]
-    search_clicked = False
-    for selector in search_button_selectors:
-        try:
-            await page.click(selector)
-            logger.info(f"検索ボタンをクリックしました: {selector}")
-            search_clicked = True
-            break
-        except Exception as e:
-            logger.warning(f"検索ボタンクリック失敗: {selector} - {str(e)}")
+    # hiddenフィールドへの反映を確認してから検索する
+    await wait_ready("表示項目反映", CONFIG["WAIT"]["after_click"], display_items_synced(page))
+   
+    with watch_requests(page) as search_requests:
+        search_clicked = False
+        for selector in search_button_selectors:
+            try:
+                await page.click(selector)
+                logger.info(f"検索ボタンをクリックしました: {selector}")
+                search_clicked = True
+                break
+            except Exception as e:
+                logger.warning(f"検索ボタンクリック失敗: {selector} - {str(e)}")
 
-    if not search_clicked:
-        logger.warning("検索ボタンが全て失敗 → Enterキーを押下します")
-        await page.keyboard.press("Enter")
-        logger.info("Enterキーで検索を実行しました")
+        if not search_clicked:
+            logger.warning("検索ボタンが全て失敗 → Enterキーを押下します")
+            await page.keyboard.press("Enter")
+            logger.info("Enterキーで検索を実行しました")
 
-    # ▼▼▼ 検索反映のための明示的な待機（5秒） ▼▼▼
-    await asyncio.sleep(5)
+        # ▼▼▼ 検索反映のための待機（上限5秒） ▼▼▼
+        await wait_ready("検索結果表示", 5, search_requests.settled, network_idle(page), rows_stable(page))
    
     # CSVダウンロード
     logger.info("CSVダウンロードボタンをクリックします...")
    
     try:
-        # JavaScriptでsub_export関数を直接呼び出す
-        async with page.expect_download(timeout=CONFIG["TIMEOUT"]["download"]) as download_info:
-            await page.evaluate("sub_export('csv')")
-            logger.info("JavaScriptでCSV出力関数を実行しました")
-       
-        download = await download_info.value
-        logger.info(f"ダウンロードが開始されました: {download.suggested_filename}")
-       
-        # 一時保存先ファイル名
-        tmp_path = os.path.join(CONFIG["PATHS"]["tmp_dir"], download.suggested_filename)
-        await download.save_as(tmp_path)
-        logger.info(f"CSVファイルをダウンロードしました: {tmp_path}")
-       
-        # ファイルの存在確認
-        if not os.path.exists(tmp_path):
-            raise FileNotFoundError(f"ダウンロードしたファイルが見つかりません: {tmp_path}")
-       
-        file_size = os.path.getsize(tmp_path)
-        logger.info(f"ダウンロードしたファイルのサイズ: {file_size} バイト")
-       
-        # 本保存先にリネームしてコピー
-        # ファイル名に日付範囲を含める
-        file_prefix = ""
-        if start_date != end_date:
-            file_prefix = f"{start_date}-{end_date}_"
-            
-        save_path = os.path.join(csv_dir, f"{file_prefix}advertiser.csv")
-        shutil.copy2(tmp_path, save_path)
-        logger.info(f"広告主CSV保存：{save_path}")
-        # ▼▼▼ ダウンロード完了後、ブラウザクローズ前に安定化待機（2秒） ▼▼▼
-        logger.info("ダウンロード完了後のブラウザ維持のため2秒待機開始...")
-        await asyncio.sleep(2)
-        logger.info("2秒待機完了。returnを実行します。")
+        # ダウンロード操作で発生したリクエストを追跡（ダウンロード以外の通信がなくても一定時間で完了）
+        with watch_requests(page, require_seen=False) as export_requests:
+            # JavaScriptでsub_export関数を直接呼び出す
+            download = await export_csv_download(page, "advertiser", start_date, end_date)
+            logger.info(f"ダウンロードが開始されました: {download.suggested_filename}")
+           
+            # 保存先フォルダ内の一時ファイルに書き込み、完了後に本来のファイル名へ置き換える
+            save_path = os.path.join(csv_dir, csv_file_name("advertiser", start_date, end_date))
+            file_size, _ = await save_download(download, save_path)
+            logger.info(f"ダウンロードしたファイルのサイズ: {file_size} バイト")
+            logger.info(f"広告主CSV保存：{save_path}")
+            # ▼▼▼ ダウンロード完了後、ブラウザクローズ前に安定化待機（上限2秒） ▼▼▼
+            logger.info("ダウンロード完了後のブラウザ維持のため安定化待機開始...")
+            await wait_ready("ダウンロード後", 2, export_requests.settled)
+            logger.info("安定化待機完了。returnを実行します。")
                
       
         return True
@@ -571,108 +1049,552 @@ async def get_advertiser_csv(page, csv_dir, start_date, end_date):
         logger.error(f"CSVダウンロードエラー: {str(e)}")
         raise Exception(f"CSVダウンロードに失敗しました: {str(e)}")
 
-async def process_date_individually(date_list):
-    """各日付を個別に処理する（従来の動作）"""
-    logger.info("各日付を個別に処理します（従来モード）")
+async def new_report_page(browser, storage_state=None):
+    """ダウンロード可能なコンテキストとページを作成"""
+    context_options = {
+        "accept_downloads": True,
+        "viewport": {"width": 1280, "height": 800}
+    }
+    if storage_state is not None:
+        # ログイン済みの状態（Cookie等）を引き継ぐ
+        context_options["storage_state"] = storage_state
+   
+    context = await browser.new_context(**context_options)
+    page = await context.new_page()
+   
+    page.set_default_timeout(CONFIG["TIMEOUT"]["page"])
+    page.set_default_navigation_timeout(CONFIG["TIMEOUT"]["navigation"])
+   
+    return context, page
+
+def load_session_state():
+    """保存済みのログインセッションのパスを取得（未保存・期限切れの場合はNone）"""
+    if not CONFIG["SESSION"]["enabled"]:
+        return None
+   
+    state_file = Path(CONFIG["SESSION"]["state_file"])
+    if not state_file.exists():
+        logger.info("保存済みのログインセッションはありません")
+        return None
+   
+    age_hours = (time.time() - state_file.stat().st_mtime) / 3600
+    if age_hours > CONFIG["SESSION"]["max_age_hours"]:
+        logger.info(f"保存済みのログインセッションが期限切れです（{age_hours:.1f}時間経過）")
+        return None
+   
+    return str(state_file)
+
+async def save_session_state(context):
+    """ログイン済みコンテキストのstorage_stateを保存"""
+    if not CONFIG["SESSION"]["enabled"]:
+        return
+   
+    state_file = Path(CONFIG["SESSION"]["state_file"])
+    state_file.parent.mkdir(parents=True, exist_ok=True)
+    await context.storage_state(path=str(state_file))
+    logger.info(f"ログインセッションを保存しました: {state_file}")
+
+async def is_logged_in(page):
+    """管理画面を開いてログイン状態かどうかを確認"""
+    await page.goto(CONFIG["LOGIN"]["url"])
+    await page.wait_for_load_state("networkidle")
    
+    if await page.locator(LOGIN_FORM_XPATH).count() > 0:
+        return False
+   
+    return await page.locator("//*[@id='sidemenu']").count() > 0
+
+async def open_logged_in_page(browser):
+    """ログイン済みでキャンペーン画面を開いたページを用意（保存済みセッションを優先）"""
+    state_file = load_session_state()
+   
+    if state_file:
+        context, page = await new_report_page(browser, state_file)
+        try:
+            if await is_logged_in(page):
+                logger.info("保存済みセッションでログインを省略しました")
+                await open_campaign_report(page)
+                return context, page
+            logger.info("保存済みセッションが無効になっているため再ログインします")
+        except Exception as e:
+            logger.warning(f"保存済みセッションの確認に失敗したため再ログインします: {str(e)}")
+        await context.close()
+   
+    context, page = await new_report_page(browser)
+    await login(page, logger)
+    await save_session_state(context)
+   
+    return context, page
+
+async def fetch_reports_sequentially(page, csv_dir, start_date, end_date):
+    """一般/アダルト/広告主CSVを1つのページで順番に取得（ログイン済み・キャンペーン画面前提）"""
+    # 一般モードのCSV取得
+    await process_csv(page, logger, "general", csv_dir, start_date, end_date)
+   
+    logger.info(f"次のステップまで待機します（上限{CONFIG['WAIT']['between_steps']}秒）...")
+    with watch_requests(page, require_seen=False) as step_requests:
+        await wait_ready("ステップ間", CONFIG["WAIT"]["between_steps"], step_requests.settled)
+   
+    # アダルトモードのCSV取得
+    await process_csv(page, logger, "adult", csv_dir, start_date, end_date)
+   
+    logger.info(f"次のステップまで待機します（上限{CONFIG['WAIT']['between_steps']}秒）...")
+    with watch_requests(page, require_seen=False) as step_requests:
+        await wait_ready("ステップ間", CONFIG["WAIT"]["between_steps"], step_requests.settled)
+   
+    # 広告主CSV取得
+    await get_advertiser_csv(page, csv_dir, start_date, end_date)
+
+async def fetch_reports_concurrently(browser, page, csv_dir, start_date, end_date):
+    """ログイン済みの状態を複製した別コンテキストで3種類のCSVを並列取得"""
+    max_concurrency = max(1, CONFIG["PROCESSING_MODE"]["max_concurrency"])
+    logger.info(f"CSVを並列取得します（同時実行数上限: {max_concurrency}）")
+   
+    # ログイン済みのCookie等を取得して各コンテキストに引き継ぐ
+    storage_state = await page.context.storage_state()
+    semaphore = asyncio.Semaphore(max_concurrency)
+   
+    async def run_job(name, job):
+        async with semaphore:
+            job_start = time.time()
+            context, job_page = await new_report_page(browser, storage_state)
+            try:
+                await job_page.goto(CONFIG["LOGIN"]["url"])
+                await job(job_page)
+                logger.info(f"{name}CSVの並列取得が完了しました（処理時間：{int(time.time() - job_start)}秒）")
+            finally:
+                await context.close()
+   
+    async def general_job(job_page):
+        await open_campaign_report(job_page)
+        await process_csv(job_page, logger, "general", csv_dir, start_date, end_date)
+   
+    async def adult_job(job_page):
+        await open_campaign_report(job_page)
+        await process_csv(job_page, logger, "adult", csv_dir, start_date, end_date)
+   
+    async def advertiser_job(job_page):
+        await get_advertiser_csv(job_page, csv_dir, start_date, end_date)
+   
+    names = ["一般", "アダルト", "広告主"]
+    results = await asyncio.gather(
+        run_job("一般", general_job),
+        run_job("アダルト", adult_job),
+        run_job("広告主", advertiser_job),
+        return_exceptions=True,
+    )
+   
+    # すべてのジョブの結果を確認してから失敗を通知する
+    errors = [(name, result) for name, result in zip(names, results) if isinstance(result, Exception)]
+    for name, error in errors:
+        logger.error(f"{name}CSVの並列取得に失敗しました: {str(error)}")
+   
+    if errors:
+        raise Exception(f"CSVの並列取得に失敗しました: {', '.join(name for name, _ in errors)}")
+
+async def fetch_reports(browser, page, csv_dir, start_date, end_date):
+    """処理モードに応じて3種類のCSVを取得"""
+    # 直接エクスポートが使える場合は画面操作を省略（ログイン中のCookieを共有）
+    if await try_direct_export(page.context.request, csv_dir, start_date, end_date):
+        return
+   
+    if CONFIG["PROCESSING_MODE"]["concurrent_fetch"]:
+        await fetch_reports_concurrently(browser, page, csv_dir, start_date, end_date)
+    else:
+        await fetch_reports_sequentially(page, csv_dir, start_date, end_date)
+
+async def launch_browser(playwright):
+    """ブラウザを起動"""
+    browser_launch_options = {"headless": CONFIG["BROWSER"]["headless"]}
+    logger.info("ブラウザを起動しています...")
+    return await playwright.chromium.launch(**browser_launch_options)
+
+def is_browser_alive(browser, page):
+    """ブラウザとページがまだ操作可能かどうか"""
+    return browser is not None and browser.is_connected() and page is not None and not page.is_closed()
+
+async def reset_report_form(page):
+    """前の日付の入力状態を捨ててキャンペーン画面のレポートモードを開き直す"""
+    logger.info("検索フォームをリセットします")
+    await page.goto(CONFIG["LOGIN"]["url"])
+    await page.wait_for_load_state("networkidle")
+    await open_campaign_report(page)
+
+async def download_dates(date_list):
+    """各日付のCSVを個別に取得し、日付ごとの結果（date, path, success）のリストを返す - ブラウザは全日付で1つを使い回す"""
     results = []
    
-    for target_date in date_list:
-        logger.info(f"--- {target_date} の処理開始 ---")
-       
-        # CSV保存ディレクトリ作成
-        csv_base_dir = Path(CONFIG["PATHS"]["csv_base_dir"])
-        csv_base_dir.mkdir(exist_ok=True)
-       
-        csv_dir = csv_base_dir / target_date
-        csv_dir.mkdir(exist_ok=True)
-       
-        logger.info(f"CSVディレクトリ: {csv_dir}")
-       
-        # TMP ディレクトリ準備
-        tmp_dir = Path(CONFIG["PATHS"]["tmp_dir"])
-        tmp_dir.mkdir(exist_ok=True)
+    # CSV保存ディレクトリ作成
+    csv_base_dir = Path(CONFIG["PATHS"]["csv_base_dir"])
+    csv_base_dir.mkdir(exist_ok=True)
+   
+    async with async_playwright() as playwright:
+        browser = None
+        page = None
+        needs_reset = False
        
-        # 既存ファイルをクリア
-        for file in tmp_dir.glob("*"):
-            if file.is_file():
-                file.unlink()
+        for target_date in date_list:
+            logger.info(f"--- {target_date} の処理開始 ---")
+           
+            csv_dir = csv_base_dir / target_date
+            csv_dir.mkdir(exist_ok=True)
+           
+            logger.info(f"CSVディレクトリ: {csv_dir}")
+           
+            # ブラウザが処理中に落ちた場合のみ再起動して1回だけ再試行する
+            for attempt in range(2):
+                try:
+                    if not is_browser_alive(browser, page):
+                        if browser is not None:
+                            logger.warning("ブラウザの終了を検出したため再起動します")
+                            try:
+                                await browser.close()
+                            except Exception:
+                                pass
+                        browser = await launch_browser(playwright)
+                       
+                        # ログイン & レポートモード設定（保存済みセッションがあればログインを省略）
+                        context, page = await open_logged_in_page(browser)
+                        needs_reset = False
+                    elif needs_reset:
+                        await reset_report_form(page)
+                   
+                    needs_reset = True
+                   
+                    # 一般/アダルト/広告主CSV取得 - 単一日付として処理
+                    await fetch_reports(browser, page, str(csv_dir), target_date, target_date)
+                   
+                    logger.info(f"{target_date} の処理が完了しました")
+                    results.append({"date": target_date, "path": str(csv_dir), "success": True})
+                    break
+                   
+                except Exception as e:
+                    if attempt == 0 and not is_browser_alive(browser, page):
+                        logger.warning(f"{target_date} の処理中にブラウザが終了しました。再起動して再試行します: {str(e)}")
+                        continue
+                   
+                    logger.error(f"{target_date} の処理中にエラーが発生しました: {str(e)}")
+                    import traceback
+                    logger.error(traceback.format_exc())
+                    results.append({"date": target_date, "error": str(e), "success": False})
+                    break
        
-        async with async_playwright() as playwright:
-            # ブラウザ起動
-            browser_launch_options = {"headless": CONFIG["BROWSER"]["headless"]}
-            logger.info("ブラウザを起動しています...")
-            browser = await playwright.chromium.launch(**browser_launch_options)
+        # ブラウザクローズ
+        if browser is not None and browser.is_connected():
+            await browser.close()
+   
+    return results
+
+async def fetch_csv_folder(target_date):
+    """1日分のCSVを取得してCSVフォルダのパスを返す（パイプラインから呼び出す用、失敗時は例外）"""
+    results = await download_dates([target_date])
+    log_wait_summary()
+   
+    if not results or not results[0]["success"]:
+        error = results[0].get("error") if results else "結果なし"
+        raise RuntimeError(f"{target_date} のCSV取得に失敗しました: {error}")
+    return results[0]["path"]
+
+async def process_date_individually(date_list):
+    """各日付を個別に処理する（従来の動作）"""
+    logger.info("各日付を個別に処理します（従来モード）")
+   
+    results = await download_dates(date_list)
+   
+    # 成功・失敗の結果を表示
+    success_count = sum(1 for r in results if r["success"])
+    logger.info(f"処理結果: 成功={success_count}, 失敗={len(results) - success_count}")
+    log_wait_summary()
+   
+    if len(results) > 0 and results[0]["success"]:
+        # 最初の成功した処理のパスを返す
+        print(results[0]["path"])
+        return 0 if success_count == len(results) else 1
+    else:
+        return 1
+
+# 1日付の取得完了とみなすCSVファイル
+REQUIRED_CSV_FILES = ["general_campane.csv", "adult_campane.csv", "advertiser.csv"]
+
+def is_csv_folder_complete(csv_dir):
+    """CSVフォルダに3種類のCSVがすべて揃っているか"""
+    csv_dir = Path(csv_dir)
+    for name in REQUIRED_CSV_FILES:
+        path = csv_dir / name
+        if not path.exists() or path.stat().st_size == 0:
+            return False
+    return True
+
+def get_manifest_path():
+    """バックフィルマニフェストのパスを取得"""
+    return Path(CONFIG["PATHS"]["csv_base_dir"]) / CONFIG["BACKFILL"]["manifest_file"]
+
+def load_backfill_manifest():
+    """バックフィルマニフェストを読み込む（completed: 取得完了, failed: 再試行上限まで失敗）"""
+    manifest_path = get_manifest_path()
+    if not manifest_path.exists():
+        return {"completed": {}, "failed": {}}
+   
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        manifest.setdefault("completed", {})
+        manifest.setdefault("failed", {})
+        return manifest
+    except (OSError, ValueError) as e:
+        logger.warning(f"バックフィルマニフェストを読み込めないため作り直します: {str(e)}")
+        return {"completed": {}, "failed": {}}
+
+def save_backfill_manifest(manifest):
+    """バックフィルマニフェストを書き込む（途中で中断しても壊れないよう置き換えで保存）"""
+    manifest_path = get_manifest_path()
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+   
+    tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+def mark_date_completed(manifest, target_date, csv_dir):
+    """取得完了した日付をマニフェストに記録"""
+    manifest["completed"][target_date] = {
+        "completed_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "files": {name: os.path.getsize(os.path.join(csv_dir, name)) for name in REQUIRED_CSV_FILES},
+    }
+    manifest["failed"].pop(target_date, None)
+    save_backfill_manifest(manifest)
+
+def mark_date_failed(manifest, target_date, error, attempts):
+    """再試行上限まで失敗した日付をマニフェストに記録（次回のバックフィルで再取得する）"""
+    manifest["completed"].pop(target_date, None)
+    manifest["failed"][target_date] = {
+        "failed_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "attempts": attempts,
+        "error": error,
+    }
+    save_backfill_manifest(manifest)
+
+def get_backfill_status(manifest, target_date, csv_dir):
+    """マニフェストとCSVフォルダから日付の状態を判定
+
+    "completed": 記録どおりのCSVが揃っている（スキップ）
+    "unrecorded": マニフェスト未記録だがCSVが揃っている（日次処理で取得済み等。記録してスキップ）
+    "changed": 完了として記録したCSVが消えた・サイズが変わった（再取得）
+    "failed": 前回失敗した（再取得）
+    "pending": 未取得
+    """
+    completed = manifest["completed"].get(target_date)
+    if completed is not None:
+        files = completed.get("files", {})
+        for name in REQUIRED_CSV_FILES:
+            path = os.path.join(csv_dir, name)
+            if not os.path.exists(path) or os.path.getsize(path) != files.get(name):
+                return "changed"
+        return "completed"
+   
+    if target_date in manifest["failed"]:
+        return "failed"
+   
+    if is_csv_folder_complete(csv_dir):
+        return "unrecorded"
+    return "pending"
+
+def is_fatal_browser_error(error, browser, page):
+    """ブラウザ・コンテキスト・ページが使えなくなったエラーか（作り直しが必要）"""
+    if not is_browser_alive(browser, page):
+        return True
+    return isinstance(error, PlaywrightError) and any(
+        keyword in str(error) for keyword in ("has been closed", "crashed", "disconnected"))
+
+class BackfillBrowser:
+    """バックフィルのワーカーが共有するブラウザ（落ちた場合は起動し直してログインし直す）"""
+   
+    def __init__(self, playwright):
+        self.playwright = playwright
+        self.browser = None
+        self.storage_state = None
+        self.launches = 0
+        self.lock = asyncio.Lock()
+   
+    async def get(self):
+        """稼働中のブラウザを返す（終了していれば起動し直す。再起動が上限を超えたらRuntimeError）"""
+        async with self.lock:
+            if self.browser is not None and self.browser.is_connected():
+                return self.browser
            
-            # コンテキスト作成
-            context_options = {
-                "accept_downloads": True,
-                "viewport": {"width": 1280, "height": 800}
-            }
+            if self.launches > 0:
+                if self.launches > CONFIG["BACKFILL"]["max_relaunches"]:
+                    raise RuntimeError(f"ブラウザの再起動が上限（{CONFIG['BACKFILL']['max_relaunches']}回）に達しました")
+                logger.warning(f"ブラウザを起動し直します（{self.launches}回目の再起動）")
+            self.launches += 1
            
-            # コンテキスト作成
-            context = await browser.new_context(**context_options)
-            page = await context.new_page()
+            browser = await launch_browser(self.playwright)
+            try:
+                # ログインは起動ごとに1回だけ行い、各ワーカーにセッションを引き継ぐ
+                context, page = await open_logged_in_page(browser)
+                self.storage_state = await context.storage_state()
+                await context.close()
+            except Exception:
+                if browser.is_connected():
+                    await browser.close()
+                raise
+           
+            self.browser = browser
+            return browser
+   
+    async def close(self):
+        if self.browser is not None and self.browser.is_connected():
+            await self.browser.close()
+
+async def close_quietly(context):
+    """コンテキストを閉じる（既に使えなくなっている場合のエラーは無視）"""
+    if context is None:
+        return
+    try:
+        await context.close()
+    except Exception:
+        pass
+
+async def backfill_worker(worker_id, shared_browser, queue, manifest, results):
+    """キューから日付を取り出して1ページで順番に取得するワーカー"""
+    csv_base_dir = Path(CONFIG["PATHS"]["csv_base_dir"])
+    browser = None
+    context = None
+    page = None
+    needs_reset = False
+   
+    try:
+        while True:
+            try:
+                target_date, attempt = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+           
+            try:
+                browser = await shared_browser.get()
+            except Exception as e:
+                # 起動し直せない場合は残りの日付を未処理として残す
+                queue.put_nowait((target_date, attempt))
+                logger.error(f"[ワーカー{worker_id}] ブラウザを用意できないため停止します: {str(e)}")
+                return
            
-            page.set_default_timeout(CONFIG["TIMEOUT"]["page"])
-            page.set_default_navigation_timeout(CONFIG["TIMEOUT"]["navigation"])
+            logger.info(f"[ワーカー{worker_id}] --- {target_date} の処理開始（{attempt + 1}回目） ---")
+            csv_dir = csv_base_dir / target_date
+            csv_dir.mkdir(exist_ok=True)
            
             try:
-                # ログイン & レポートモード設定
-                await login(page, logger)
+                if not is_browser_alive(browser, page) or page.context.browser is not browser:
+                    # 初回・前回の致命的なエラー後・ブラウザ再起動後はコンテキストから作り直す
+                    await close_quietly(context)
+                    context, page = await new_report_page(browser, shared_browser.storage_state)
+                    await reset_report_form(page)
+                elif needs_reset:
+                    await reset_report_form(page)
                
-                # 一般モードのCSV取得 - 単一日付として処理
-                await process_csv(page, logger, "general", str(csv_dir), target_date, target_date)
+                needs_reset = True
                
-                logger.info(f"{CONFIG['WAIT']['between_steps']}秒間待機します...")
-                await asyncio.sleep(CONFIG["WAIT"]["between_steps"])
+                if not await try_direct_export(page.context.request, str(csv_dir), target_date, target_date):
+                    await fetch_reports_sequentially(page, str(csv_dir), target_date, target_date)
                
-                # アダルトモードのCSV取得 - 単一日付として処理
-                await process_csv(page, logger, "adult", str(csv_dir), target_date, target_date)
+                mark_date_completed(manifest, target_date, str(csv_dir))
+                results[target_date] = {"date": target_date, "path": str(csv_dir), "success": True}
+                logger.info(f"[ワーカー{worker_id}] {target_date} の処理が完了しました")
                
-                logger.info(f"{CONFIG['WAIT']['between_steps']}秒間待機します...")
-                await asyncio.sleep(CONFIG["WAIT"]["between_steps"])
-               
-                # 広告主CSV取得 - 単一日付として処理
-                await get_advertiser_csv(page, str(csv_dir), target_date, target_date)
-               
-                # ブラウザクローズ
-                await browser.close()
-               
-                logger.info(f"{target_date} の処理が完了しました")
-                results.append({"date": target_date, "path": str(csv_dir), "success": True})
+            except Exception as e:
+                if is_fatal_browser_error(e, browser, page):
+                    logger.warning(f"[ワーカー{worker_id}] ブラウザ・ページが使えなくなったため作り直します: {str(e)}")
+                    await close_quietly(context)
+                    context = None
+                    page = None
                
+                if attempt < CONFIG["BACKFILL"]["max_retries"]:
+                    logger.warning(f"[ワーカー{worker_id}] {target_date} の処理に失敗したため再試行します: {str(e)}")
+                    queue.put_nowait((target_date, attempt + 1))
+                else:
+                    logger.error(f"[ワーカー{worker_id}] {target_date} の処理が再試行上限に達しました: {str(e)}")
+                    import traceback
+                    logger.error(traceback.format_exc())
+                    mark_date_failed(manifest, target_date, str(e), attempt + 1)
+                    results[target_date] = {"date": target_date, "error": str(e), "success": False}
+    finally:
+        await close_quietly(context)
+
+async def process_backfill(date_list):
+    """日付リストを複数のワーカーページで並列に取得する（マニフェストで取得完了の日付はスキップ）"""
+    logger.info(f"バックフィルを開始します（{len(date_list)}日間）")
+   
+    csv_base_dir = Path(CONFIG["PATHS"]["csv_base_dir"])
+    csv_base_dir.mkdir(exist_ok=True)
+   
+    # マニフェストの状態で取得対象を決める（前回失敗・記録と異なるCSVは再取得）
+    manifest = load_backfill_manifest()
+    pending = []
+    for target_date in date_list:
+        csv_dir = str(csv_base_dir / target_date)
+        status = get_backfill_status(manifest, target_date, csv_dir)
+       
+        if status == "completed":
+            continue
+        if status == "unrecorded":
+            mark_date_completed(manifest, target_date, csv_dir)
+            continue
+       
+        if status == "failed":
+            previous = manifest["failed"][target_date]
+            logger.info(f"{target_date}: 前回失敗した日付を再取得します（{previous['failed_at']}, {previous['error']}）")
+        elif status == "changed":
+            logger.warning(f"{target_date}: 取得完了として記録したCSVが変わっているため再取得します")
+        pending.append(target_date)
+   
+    logger.info(f"取得済みのためスキップ: {len(date_list) - len(pending)}日, 取得対象: {len(pending)}日")
+   
+    results = {}
+    if pending:
+        worker_count = max(1, min(CONFIG["BACKFILL"]["workers"], len(pending)))
+        logger.info(f"ワーカー数: {worker_count}")
+       
+        queue = asyncio.Queue()
+        for target_date in pending:
+            queue.put_nowait((target_date, 0))
+       
+        async with async_playwright() as playwright:
+            shared_browser = BackfillBrowser(playwright)
+            try:
+                await asyncio.gather(*[
+                    backfill_worker(worker_id + 1, shared_browser, queue, manifest, results)
+                    for worker_id in range(worker_count)
+                ])
             except Exception as e:
-                logger.error(f"{target_date} の処理中にエラーが発生しました: {str(e)}")
+                logger.error(f"バックフィル中にエラーが発生しました: {str(e)}")
                 import traceback
                 logger.error(traceback.format_exc())
-                await browser.close()
-                results.append({"date": target_date, "error": str(e), "success": False})
+            finally:
+                await shared_browser.close()
+       
+        # ブラウザ停止などで処理されなかった日付を失敗として扱う
+        for target_date in pending:
+            if target_date not in results:
+                mark_date_failed(manifest, target_date, "未処理", 0)
+                results[target_date] = {"date": target_date, "error": "未処理", "success": False}
    
-    # 成功・失敗の結果を表示
-    success_count = sum(1 for r in results if r["success"])
-    logger.info(f"処理結果: 成功={success_count}, 失敗={len(results) - success_count}")
+    success_count = sum(1 for r in results.values() if r["success"])
+    failed = sorted(d for d, r in results.items() if not r["success"])
+    logger.info(f"バックフィル結果: 成功={success_count}, 失敗={len(failed)}, スキップ={len(date_list) - len(pending)}")
+    if failed:
+        logger.warning(f"失敗した日付（マニフェストに記録し、再実行で再取得されます）: {', '.join(failed)}")
+    log_wait_summary()
    
-    if len(results) > 0 and results[0]["success"]:
-        # 最初の成功した処理のパスを返す
-        print(results[0]["path"])
-        return 0 if success_count == len(results) else 1
-    else:
-        return 1
+    # 先頭日付のCSV保存先を標準出力に出力（後続処理で使用）
+    first_dir = csv_base_dir / date_list[0]
+    if is_csv_folder_complete(first_dir):
+        print(str(first_dir))
+   
+    return 0 if not failed else 1
 
 async def process_date_range(start_date, end_date):
     """日付範囲を一括で処理する（新機能）"""
     logger.info(f"日付範囲 {start_date} から {end_date} を一括処理します")
    
-    # TMP ディレクトリ準備
-    tmp_dir = Path(CONFIG["PATHS"]["tmp_dir"])
-    tmp_dir.mkdir(exist_ok=True)
-   
-    # 既存ファイルをクリア
-    for file in tmp_dir.glob("*"):
-        if file.is_file():
-            file.unlink()
-   
     # CSV保存ディレクトリ作成 - 日付範囲に基づいた命名
     csv_base_dir = Path(CONFIG["PATHS"]["csv_base_dir"])
     csv_base_dir.mkdir(exist_ok=True)
@@ -685,46 +1607,20 @@ async def process_date_range(start_date, end_date):
    
     async with async_playwright() as playwright:
         # ブラウザ起動
-        browser_launch_options = {"headless": CONFIG["BROWSER"]["headless"]}
-        logger.info("ブラウザを起動しています...")
-        browser = await playwright.chromium.launch(**browser_launch_options)
-       
-        # コンテキスト作成
-        context_options = {
-            "accept_downloads": True,
-            "viewport": {"width": 1280, "height": 800}
-        }
-       
-        # コンテキスト作成
-        context = await browser.new_context(**context_options)
-        page = await context.new_page()
-       
-        page.set_default_timeout(CONFIG["TIMEOUT"]["page"])
-        page.set_default_navigation_timeout(CONFIG["TIMEOUT"]["navigation"])
+        browser = await launch_browser(playwright)
        
         try:
-            # ログイン & レポートモード設定
-            await login(page, logger)
-           
-            # 一般モードのCSV取得
-            await process_csv(page, logger, "general", str(csv_dir), start_date, end_date)
-           
-            logger.info(f"{CONFIG['WAIT']['between_steps']}秒間待機します...")
-            await asyncio.sleep(CONFIG["WAIT"]["between_steps"])
+            # ログイン & レポートモード設定（保存済みセッションがあればログインを省略）
+            context, page = await open_logged_in_page(browser)
            
-            # アダルトモードのCSV取得
-            await process_csv(page, logger, "adult", str(csv_dir), start_date, end_date)
-           
-            logger.info(f"{CONFIG['WAIT']['between_steps']}秒間待機します...")
-            await asyncio.sleep(CONFIG["WAIT"]["between_steps"])
-           
-            # 広告主CSV取得
-            await get_advertiser_csv(page, str(csv_dir), start_date, end_date)
+            # 一般/アダルト/広告主CSV取得
+            await fetch_reports(browser, page, str(csv_dir), start_date, end_date)
            
             # ブラウザクローズ
             await browser.close()
            
             logger.info(f"日付範囲 {start_date} から {end_date} の処理が完了しました")
+            log_wait_summary()
            
             # CSV保存先を標準出力に出力（後続処理で使用）
             print(str(csv_dir))
@@ -791,9 +1687,26 @@ async def main():
                 elif mode_arg in ['individual', 'each', '0']:
                     CONFIG["PROCESSING_MODE"]["range_as_batch"] = False
                     logger.info("処理モード: 各日付を個別処理")
+                elif mode_arg in ['backfill']:
+                    CONFIG["PROCESSING_MODE"]["range_as_batch"] = False
+                    CONFIG["PROCESSING_MODE"]["backfill"] = True
+                    logger.info("処理モード: 各日付を並列バックフィル")
             except Exception:
                 logger.warning(f"無効な処理モード指定: {sys.argv[6]}")
        
+        # CSV取得方式設定
+        # コマンドライン引数から並列取得の有無を設定可能にする（第7引数）
+        if len(sys.argv) > 7:
+            fetch_arg = sys.argv[7].lower()
+            if fetch_arg in ['concurrent', 'parallel', '1']:
+                CONFIG["PROCESSING_MODE"]["concurrent_fetch"] = True
+                logger.info("CSV取得方式: 並列取得")
+            elif fetch_arg in ['sequential', 'serial', '0']:
+                CONFIG["PROCESSING_MODE"]["concurrent_fetch"] = False
+                logger.info("CSV取得方式: 順次取得")
+            else:
+                logger.warning(f"無効なCSV取得方式指定: {sys.argv[7]}")
+       
         # 日付範囲解析
         start_date, end_date = parse_date_range(date_str)
        
@@ -810,6 +1723,9 @@ async def main():
         if CONFIG["PROCESSING_MODE"]["range_as_batch"]:
             # 日付範囲を一括処理
             return await process_date_range(start_date, end_date)
+        elif CONFIG["PROCESSING_MODE"]["backfill"]:
+            # 各日付を複数ページで並列に処理（取得済みの日付はスキップ）
+            return await process_backfill(date_list)
         else:
             # 各日付を個別に処理
             return await process_date_individually(date_list)
@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+キャンペーンCSVを列単位で読み込み、キャンペーングループ別・サイズ別に集計するツール
+使用例:
+  python campaign_analytics.py                        # 昨日の一般キャンペーンをグループ別に集計
+  python campaign_analytics.py 20250519 --type adult  # アダルトキャンペーンを集計
+  python campaign_analytics.py 20250519 --by size     # サイズ別に集計
+  python campaign_analytics.py 20250519 --top 50 --export campaign_summary.tsv
+"""
+import os
+import sys
+import argparse
+from datetime import datetime, timedelta
+from loguru import logger
+from rich.console import Console
+from rich.table import Table
+
+from csv_encoding import sniff_encoding, remember_encoding
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:
+    np = None
+    pd = None
+
+# 設定
+CONFIG = {
+    "csv_base_dir": "csv"
+}
+
+# キャンペーン種別 → CSVファイル名
+CAMPAIGN_FILES = {
+    "general": "general_campane.csv",
+    "adult": "adult_campane.csv"
+}
+
+# 読み込む列と型（CTR・CVR等の率は集計後に計算し直すため読み込まない）
+COLUMN_DTYPES = {
+    "キャンペーングループ": "category",
+    "ID": "str",
+    "キャンペーン名": "str",
+    "サイズ": "category",
+    "ステータス": "category",
+    "Imp": "int64",
+    "Click": "int64",
+    "CV": "int64",
+    "グロス": "float64",
+    "ネット": "float64",
+    "利益": "float64"
+}
+
+# 合計する数値列
+METRIC_COLUMNS = ["Imp", "Click", "CV", "グロス", "ネット", "利益"]
+
+# 集計軸
+GROUP_KEYS = {
+    "group": "キャンペーングループ",
+    "size": "サイズ"
+}
+
+# [total]行と列合計の許容誤差（金額は小数点以下の丸めを考慮）
+TOTAL_TOLERANCE = 0.01
+
+def require_pandas():
+    """pandasが使えるか確認"""
+    if pd is None:
+        raise ImportError("pandasがインストールされていません（pip install pandas）")
+
+def find_header_line(file_path, encoding, max_lines=10):
+    """ヘッダー行の行番号（0始まり）を探す（先頭のパンくず行・空行を読み飛ばすため）"""
+    with open(file_path, 'r', encoding=encoding, newline='') as f:
+        for index, line in enumerate(f):
+            if index >= max_lines:
+                break
+            if line.lstrip('"').startswith("キャンペーングループ"):
+                return index
+    raise ValueError(f"キャンペーンCSVのヘッダー行が見つかりません: {file_path}")
+
+def load_campaign_csv(file_path):
+    """キャンペーンCSVを型付きの列として読み込み、(明細, [total]行) を返す"""
+    require_pandas()
+
+    encoding, verified, stat_result = sniff_encoding(file_path)
+    header_line = find_header_line(file_path, encoding)
+
+    read_options = dict(
+        encoding=encoding,
+        skiprows=header_line,
+        usecols=list(COLUMN_DTYPES),
+        dtype=COLUMN_DTYPES,
+        engine="c"
+    )
+    try:
+        df = pd.read_csv(file_path, **read_options)
+    except UnicodeDecodeError as e:
+        # 先頭サンプルより後ろに判定と異なる文字がある場合は置換文字で読み直す（キャッシュしない）
+        logger.warning(f"キャンペーンCSVを{encoding}で最後まで復号できません（置換文字で読み込みます）: {file_path}: {str(e)}")
+        df = pd.read_csv(file_path, encoding_errors="replace", **read_options)
+    else:
+        if not verified:
+            remember_encoding(file_path, encoding, stat_result)
+
+    is_total = (df["キャンペーン名"] == "[total]").to_numpy()
+    if is_total.sum() != 1:
+        logger.warning(f"[total]行が{int(is_total.sum())}行あります: {file_path}")
+
+    total_row = df.loc[is_total, METRIC_COLUMNS].iloc[-1] if is_total.any() else None
+    rows = df.loc[~is_total].reset_index(drop=True)
+
+    logger.info(f"キャンペーンCSVを読み込みました: {file_path}（{len(rows)}行, エンコーディング {encoding}）")
+    return rows, total_row
+
+def check_total(rows, total_row):
+    """[total]行と列合計を照合し、差異のある列を {列名: (列合計, [total]値)} で返す"""
+    sums = rows[METRIC_COLUMNS].sum()
+    if total_row is None:
+        return {column: (sums[column], None) for column in METRIC_COLUMNS}
+
+    diff = (sums - total_row.astype("float64")).abs()
+    mismatched = diff[diff > TOTAL_TOLERANCE].index
+    return {column: (sums[column], total_row[column]) for column in mismatched}
+
+def add_rates(summary):
+    """集計値からCTR・CVR・CPC・eCPMを計算（分母が0の場合はNaN）"""
+    imp = summary["Imp"].to_numpy(dtype="float64")
+    click = summary["Click"].to_numpy(dtype="float64")
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        summary["CTR"] = np.where(imp > 0, click / imp, np.nan)
+        summary["CVR"] = np.where(click > 0, summary["CV"].to_numpy() / click, np.nan)
+        summary["CPC(グロス)"] = np.where(click > 0, summary["グロス"].to_numpy() / click, np.nan)
+        summary["eCPM(グロス)"] = np.where(imp > 0, summary["グロス"].to_numpy() / imp * 1000, np.nan)
+    return summary
+
+def aggregate(rows, key):
+    """指定列ごとに数値列を合計（グロス降順）"""
+    summary = rows.groupby(key, observed=True, sort=False)[METRIC_COLUMNS].sum()
+    summary.insert(0, "キャンペーン数", rows.groupby(key, observed=True, sort=False).size())
+    summary = add_rates(summary)
+    return summary.sort_values("グロス", ascending=False)
+
+def analyze_campaign_csv(file_path, by="group"):
+    """キャンペーンCSVを読み込み、[total]行を照合して集計結果を返す"""
+    rows, total_row = load_campaign_csv(file_path)
+
+    mismatched = check_total(rows, total_row)
+    if mismatched:
+        for column, (column_sum, total_value) in mismatched.items():
+            logger.warning(f"[total]行と列合計が一致しません: {column} 列合計={column_sum} [total]={total_value}")
+    else:
+        logger.info("[total]行と列合計が一致しました")
+
+    return aggregate(rows, GROUP_KEYS[by]), mismatched
+
+def display_summary(summary, title, top=None):
+    """集計結果を表形式で表示"""
+    console = Console()
+
+    table = Table(title=title, show_header=True, header_style="bold")
+    table.add_column(summary.index.name)
+    for column in summary.columns:
+        table.add_column(column, justify="right")
+
+    shown = summary if top is None else summary.head(top)
+    for key, values in shown.iterrows():
+        cells = []
+        for column, value in values.items():
+            if pd.isna(value):
+                cells.append("-")
+            elif column in ("CTR", "CVR"):
+                cells.append(f"{value:.3%}")
+            elif column in ("グロス", "ネット", "利益", "CPC(グロス)", "eCPM(グロス)"):
+                cells.append(f"{value:,.2f}")
+            else:
+                cells.append(f"{int(value):,}")
+        table.add_row(str(key), *cells)
+
+    console.print(table)
+    if top is not None and len(summary) > top:
+        console.print(f"（上位{top}件を表示 / 全{len(summary)}件）")
+
+def parse_arguments():
+    """コマンドライン引数解析"""
+    parser = argparse.ArgumentParser(description="fam8 キャンペーンCSV集計ツール")
+    parser.add_argument("date", nargs="?", default=None, help="対象日付（例: 20250519、省略時は昨日）")
+    parser.add_argument("--type", choices=list(CAMPAIGN_FILES), default="general", help="キャンペーン種別")
+    parser.add_argument("--by", choices=list(GROUP_KEYS), default="group", help="集計軸（group: キャンペーングループ, size: サイズ）")
+    parser.add_argument("--top", type=int, default=30, help="表示件数（0で全件）")
+    parser.add_argument("--export", help="集計結果をTSVに出力するファイル名")
+    return parser.parse_args()
+
+def main():
+    """メイン関数"""
+    args = parse_arguments()
+
+    try:
+        require_pandas()
+    except ImportError as e:
+        print(f"[ERROR] {e}")
+        return 1
+
+    target_date = args.date or (datetime.now() - timedelta(days=1)).strftime("%Y%m%d")
+    file_path = os.path.join(CONFIG["csv_base_dir"], target_date, CAMPAIGN_FILES[args.type])
+
+    if not os.path.exists(file_path):
+        print(f"キャンペーンCSVが見つかりません: {file_path}")
+        return 1
+
+    summary, mismatched = analyze_campaign_csv(file_path, by=args.by)
+    display_summary(summary, f"{target_date} {args.type} {GROUP_KEYS[args.by]}別集計", top=args.top or None)
+
+    if args.export:
+        summary.to_csv(args.export, sep="\t", encoding="utf-8-sig")
+        print(f"[INFO] 集計結果を '{args.export}' にエクスポートしました。")
+
+    return 1 if mismatched else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
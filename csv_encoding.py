@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+CSVのエンコーディングをバイト列から判定するモジュール（判定結果はファイルごとにキャッシュ）
+
+Shift_JIS系はNEC特殊文字等を含むためcp932（Shift_JISの上位互換）として扱う。
+判定は先頭サンプル1回の読み込みだけで行い、ファイル全体の確認はしない。
+キャッシュにはファイル全体を読み込んだ側が最後まで復号できたエンコーディングだけを記録する。
+"""
+import os
+import json
+import threading
+from loguru import logger
+
+# 候補エンコーディング（優先順）
+ENCODINGS = ['cp932', 'utf-8-sig', 'utf-8']
+
+# 判定できない場合の既定値
+DEFAULT_ENCODING = 'cp932'
+
+# 判定に使う先頭サンプルのサイズ（バイト）
+SAMPLE_SIZE = 64 * 1024
+
+# 判定結果のキャッシュ（パス・サイズ・更新時刻が同じファイルは再判定しない）
+CACHE_FILE = os.path.join("meta", "encoding_cache.json")
+CACHE_MAX_ENTRIES = 200
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def detect_encoding_from_bytes(sample, truncated=False):
+    """バイト列のサンプルからエンコーディングを判定（ファイルを開き直さない）"""
+    if sample.startswith(b'\xef\xbb\xbf'):
+        return 'utf-8-sig'
+
+    # サンプル末尾でマルチバイト文字が切れている可能性があるため最後の改行までで判定
+    if truncated and b'\n' in sample:
+        sample = sample[:sample.rfind(b'\n') + 1]
+
+    # ASCIIのみなら既定のcp932（サンプル外の日本語もcp932として読む）
+    if sample.isascii():
+        return DEFAULT_ENCODING
+
+    # 非ASCIIを含み、UTF-8として正しく復号できる場合はUTF-8（Shift_JISの文字列が偶然UTF-8として正しいことはほぼない）
+    try:
+        sample.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+
+    for encoding in ENCODINGS:
+        try:
+            sample.decode(encoding)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+
+    # デフォルトのエンコーディングを返す
+    return DEFAULT_ENCODING
+
+def cache_key(file_path, stat_result=None):
+    """キャッシュのキー（絶対パス・サイズ・更新時刻）"""
+    if stat_result is None:
+        stat_result = os.stat(file_path)
+    return f"{os.path.abspath(file_path)}|{stat_result.st_size}|{stat_result.st_mtime_ns}"
+
+def _load_cache():
+    """キャッシュを読み込む（プロセス内では1回だけ）"""
+    global _cache
+    if _cache is None:
+        _cache = {}
+        if os.path.exists(CACHE_FILE):
+            try:
+                with open(CACHE_FILE, 'r', encoding='utf-8') as f:
+                    _cache = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"エンコーディングキャッシュを読み込めません: {str(e)}")
+                _cache = {}
+    return _cache
+
+def _save_cache():
+    """キャッシュを書き込む（古いものから件数上限を超えた分を削除）"""
+    cache = _load_cache()
+    while len(cache) > CACHE_MAX_ENTRIES:
+        cache.pop(next(iter(cache)))
+
+    try:
+        os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+        tmp_path = CACHE_FILE + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, CACHE_FILE)
+    except OSError as e:
+        logger.warning(f"エンコーディングキャッシュを保存できません: {str(e)}")
+
+def get_cached_encoding(file_path, stat_result=None):
+    """キャッシュ済みの判定結果を取得（なければNone）"""
+    key = cache_key(file_path, stat_result)
+    with _cache_lock:
+        return _load_cache().get(key)
+
+def remember_encoding(file_path, encoding, stat_result=None):
+    """判定結果をキャッシュに記録（パイプラインでは複数スレッドから呼ばれるためロックする）"""
+    key = cache_key(file_path, stat_result)
+    with _cache_lock:
+        cache = _load_cache()
+        if cache.get(key) != encoding:
+            cache[key] = encoding
+            _save_cache()
+
+def sniff_encoding(file_path):
+    """キャッシュまたは先頭サンプルからエンコーディングを判定し、(エンコーディング, キャッシュ済みか, stat結果) を返す
+
+    サンプルだけの判定はキャッシュしない（ファイル全体を読み込む側が最後まで復号できた時点で remember_encoding を呼ぶ）
+    """
+    stat_result = os.stat(file_path)
+
+    encoding = get_cached_encoding(file_path, stat_result)
+    if encoding:
+        return encoding, True, stat_result
+
+    with open(file_path, 'rb') as f:
+        sample = f.read(SAMPLE_SIZE)
+    return detect_encoding_from_bytes(sample, truncated=len(sample) >= SAMPLE_SIZE), False, stat_result
+
+def detect_encoding(file_path):
+    """ファイルのエンコーディングを検出（キャッシュがなければ先頭サンプルのみで判定）"""
+    return sniff_encoding(file_path)[0]
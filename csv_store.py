@@ -0,0 +1,358 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+日次CSVをSQLiteに蓄積し、期間集計を問い合わせるモジュール
+使用例:
+  python csv_store.py ingest                        # 未取り込みの日付フォルダをすべて取り込む
+  python csv_store.py ingest 20250519               # 指定日だけ取り込む（取り込み済みなら省略）
+  python csv_store.py ingest 20250501-20250531 --force  # 期間を取り込み直す
+  python csv_store.py query 20250501-20250531       # 日別の合計
+  python csv_store.py query 20250501-20250531 --by group --type adult  # キャンペーングループ別
+  python csv_store.py query 20250501-20250531 --by advertiser          # 広告主別
+"""
+import os
+import re
+import sys
+import csv
+import sqlite3
+import argparse
+from datetime import datetime, timedelta
+from loguru import logger
+from rich.console import Console
+from rich.table import Table
+
+from csv_encoding import sniff_encoding, remember_encoding
+from advertiser_csv import iter_advertiser_rows
+from campaign_analytics import CAMPAIGN_FILES, find_header_line
+
+# 設定
+CONFIG = {
+    "csv_base_dir": "csv",
+    "db_path": os.path.join("meta", "csv_store.db"),
+    "log_dir": "log"
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS campaigns (
+    date TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    campaign_id TEXT,
+    campaign_group TEXT,
+    name TEXT,
+    size TEXT,
+    status TEXT,
+    imp INTEGER,
+    click INTEGER,
+    cv INTEGER,
+    gross REAL,
+    net REAL,
+    profit REAL
+);
+CREATE INDEX IF NOT EXISTS idx_campaigns_date ON campaigns (date, kind);
+CREATE INDEX IF NOT EXISTS idx_campaigns_id ON campaigns (campaign_id, date);
+
+CREATE TABLE IF NOT EXISTS campaign_totals (
+    date TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    imp INTEGER,
+    click INTEGER,
+    cv INTEGER,
+    gross REAL,
+    net REAL,
+    profit REAL,
+    PRIMARY KEY (date, kind)
+);
+
+CREATE TABLE IF NOT EXISTS advertisers (
+    date TEXT NOT NULL,
+    advertiser_id TEXT,
+    name TEXT,
+    agency TEXT,
+    imp INTEGER,
+    click INTEGER,
+    cv INTEGER,
+    gross REAL,
+    net REAL
+);
+CREATE INDEX IF NOT EXISTS idx_advertisers_date ON advertisers (date);
+CREATE INDEX IF NOT EXISTS idx_advertisers_id ON advertisers (advertiser_id, date);
+
+CREATE TABLE IF NOT EXISTS ingested_dates (
+    date TEXT PRIMARY KEY,
+    ingested_at TEXT NOT NULL,
+    campaign_rows INTEGER,
+    advertiser_rows INTEGER
+);
+"""
+
+# 取り込みに必要なCSV
+REQUIRED_FILES = ["advertiser.csv", "general_campane.csv", "adult_campane.csv"]
+
+# 期間集計の軸 → 集計列
+CAMPAIGN_GROUP_COLUMNS = {
+    "group": "campaign_group",
+    "size": "size",
+    "campaign": "campaign_id"
+}
+
+def setup_logger():
+    """ログ設定"""
+    log_dir = CONFIG["log_dir"]
+    os.makedirs(log_dir, exist_ok=True)
+
+    today = datetime.now().strftime('%Y%m%d')
+    log_file = os.path.join(log_dir, f"{today}.log")
+
+    logger.remove()
+    format_string = "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>csv_store</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
+
+    logger.add(log_file, format=format_string, level="INFO", encoding="utf-8", enqueue=True)
+    logger.add(sys.stderr, format=format_string, level="INFO", colorize=True)
+
+def connect(db_path=None):
+    """データベースに接続（テーブル・インデックスがなければ作成）"""
+    db_path = db_path or CONFIG["db_path"]
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    return conn
+
+def to_int(value):
+    """CSVの値を整数に変換（空・'-'はNone）"""
+    value = (value or "").strip().replace(",", "")
+    if not value or value == "-":
+        return None
+    return int(float(value))
+
+def to_float(value):
+    """CSVの値を小数に変換（空・'-'はNone）"""
+    value = (value or "").strip().replace(",", "")
+    if not value or value == "-":
+        return None
+    return float(value)
+
+def read_campaign_rows(file_path):
+    """キャンペーンCSVを読み込み、(明細行のリスト, [total]行) を返す"""
+    encoding, verified, stat_result = sniff_encoding(file_path)
+    header_line = find_header_line(file_path, encoding)
+
+    rows = []
+    total = None
+    replaced = 0
+    # 先頭サンプルだけで判定した場合は復号できないバイトを置換文字にして読み進め、最後まで置換がなければキャッシュする
+    with open(file_path, 'r', encoding=encoding, errors='strict' if verified else 'replace', newline='') as f:
+        for _ in range(header_line):
+            next(f)
+
+        for record in csv.DictReader(f):
+            if not verified and any('\ufffd' in (value or "") for value in record.values() if isinstance(value, str)):
+                logger.warning(f"キャンペーンCSVに{encoding}で復号できない文字があります（置換文字で読み込みます）: {file_path}")
+                replaced += 1
+            values = (
+                to_int(record["Imp"]), to_int(record["Click"]), to_int(record["CV"]),
+                to_float(record["グロス"]), to_float(record["ネット"]), to_float(record["利益"])
+            )
+            if record["キャンペーン名"] == "[total]":
+                total = values
+                continue
+            rows.append((record["ID"], record["キャンペーングループ"], record["キャンペーン名"],
+                         record["サイズ"], record["ステータス"]) + values)
+
+    if not verified and replaced == 0:
+        remember_encoding(file_path, encoding, stat_result)
+
+    return rows, total
+
+def read_advertiser_rows(file_path):
+    """広告主CSVを読み込む（表示率・CTR・CVRは集計時に計算し直すため保存しない）"""
+    rows = []
+    for record in iter_advertiser_rows(file_path):
+        # 末尾の[total]行は明細ではないため保存しない
+        if record.name == "[total]":
+            continue
+        _, imp, click, _, cv, _, gross, net = record.metrics
+        rows.append((record.advertiser_id, record.name, record.agency,
+                     to_int(imp), to_int(click), to_int(cv), to_float(gross), to_float(net)))
+    return rows
+
+def list_date_folders():
+    """CSVフォルダ内の日付フォルダ（YYYYMMDD）を昇順で返す"""
+    base_dir = CONFIG["csv_base_dir"]
+    if not os.path.exists(base_dir):
+        return []
+    return sorted(name for name in os.listdir(base_dir)
+                  if re.fullmatch(r"\d{8}", name) and os.path.isdir(os.path.join(base_dir, name)))
+
+def get_ingested_dates(conn):
+    """取り込み済みの日付"""
+    return {row[0] for row in conn.execute("SELECT date FROM ingested_dates")}
+
+def ingest_date(conn, target_date):
+    """1日分のCSVを取り込む（同じ日付のデータは置き換える）"""
+    csv_dir = os.path.join(CONFIG["csv_base_dir"], target_date)
+    missing = [name for name in REQUIRED_FILES if not os.path.exists(os.path.join(csv_dir, name))]
+    if missing:
+        logger.warning(f"{target_date}: CSVが揃っていないため取り込みません: {', '.join(missing)}")
+        return False
+
+    campaign_rows = 0
+    with conn:
+        conn.execute("DELETE FROM campaigns WHERE date = ?", (target_date,))
+        conn.execute("DELETE FROM campaign_totals WHERE date = ?", (target_date,))
+        conn.execute("DELETE FROM advertisers WHERE date = ?", (target_date,))
+
+        for kind, file_name in CAMPAIGN_FILES.items():
+            rows, total = read_campaign_rows(os.path.join(csv_dir, file_name))
+            conn.executemany(
+                "INSERT INTO campaigns VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ((target_date, kind) + row for row in rows)
+            )
+            if total is not None:
+                conn.execute("INSERT INTO campaign_totals VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                             (target_date, kind) + total)
+            campaign_rows += len(rows)
+
+        advertiser_rows = read_advertiser_rows(os.path.join(csv_dir, "advertiser.csv"))
+        conn.executemany(
+            "INSERT INTO advertisers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            ((target_date,) + row for row in advertiser_rows)
+        )
+
+        conn.execute("INSERT OR REPLACE INTO ingested_dates VALUES (?, ?, ?, ?)",
+                     (target_date, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), campaign_rows, len(advertiser_rows)))
+
+    logger.info(f"{target_date}: キャンペーン{campaign_rows}行・広告主{len(advertiser_rows)}行を取り込みました")
+    return True
+
+def ingest(conn, target_dates=None, force=False):
+    """日付フォルダを取り込む（取り込み済みの日付は force 指定時以外は省略）"""
+    if target_dates is None:
+        target_dates = list_date_folders()
+
+    ingested = set() if force else get_ingested_dates(conn)
+    pending = [target_date for target_date in target_dates if target_date not in ingested]
+    logger.info(f"取り込み対象: {len(pending)}日（取り込み済みのため省略 {len(target_dates) - len(pending)}日）")
+
+    return sum(1 for target_date in pending if ingest_date(conn, target_date))
+
+def query_daily_totals(conn, start_date, end_date, kind=None):
+    """日別・種別ごとの合計"""
+    sql = """
+        SELECT date, kind, SUM(imp), SUM(click), SUM(cv), SUM(gross), SUM(net), SUM(profit)
+        FROM campaigns
+        WHERE date BETWEEN ? AND ? AND (? IS NULL OR kind = ?)
+        GROUP BY date, kind
+        ORDER BY date, kind
+    """
+    return conn.execute(sql, (start_date, end_date, kind, kind)).fetchall()
+
+def query_campaign_range(conn, start_date, end_date, by="group", kind=None, limit=30):
+    """期間内のキャンペーン集計（グロス降順）"""
+    column = CAMPAIGN_GROUP_COLUMNS[by]
+    label = "MAX(name)" if by == "campaign" else column
+    sql = f"""
+        SELECT {label}, COUNT(DISTINCT date), SUM(imp), SUM(click), SUM(cv), SUM(gross), SUM(net), SUM(profit)
+        FROM campaigns
+        WHERE date BETWEEN ? AND ? AND (? IS NULL OR kind = ?)
+        GROUP BY {column}
+        ORDER BY SUM(gross) DESC
+        LIMIT ?
+    """
+    return conn.execute(sql, (start_date, end_date, kind, kind, limit)).fetchall()
+
+def query_advertiser_range(conn, start_date, end_date, limit=30):
+    """期間内の広告主別集計（グロス降順）"""
+    sql = """
+        SELECT MAX(name), COUNT(DISTINCT date), SUM(imp), SUM(click), SUM(cv), SUM(gross), SUM(net), SUM(gross) - SUM(net)
+        FROM advertisers
+        WHERE date BETWEEN ? AND ?
+        GROUP BY advertiser_id
+        ORDER BY SUM(gross) DESC
+        LIMIT ?
+    """
+    return conn.execute(sql, (start_date, end_date, limit)).fetchall()
+
+def parse_date_range(date_str):
+    """YYYYMMDD または YYYYMMDD-YYYYMMDD を (開始日, 終了日) に変換"""
+    start_date, _, end_date = date_str.partition("-")
+    return start_date, end_date or start_date
+
+def expand_dates(start_date, end_date):
+    """期間内の日付リスト"""
+    current = datetime.strptime(start_date, "%Y%m%d")
+    end = datetime.strptime(end_date, "%Y%m%d")
+    dates = []
+    while current <= end:
+        dates.append(current.strftime("%Y%m%d"))
+        current += timedelta(days=1)
+    return dates
+
+def display_rows(title, headers, rows):
+    """集計結果を表形式で表示"""
+    console = Console()
+    table = Table(title=title, show_header=True, header_style="bold")
+    table.add_column(headers[0])
+    for header in headers[1:]:
+        table.add_column(header, justify="right")
+
+    for row in rows:
+        cells = [str(row[0])]
+        for value in row[1:]:
+            if value is None:
+                cells.append("-")
+            elif isinstance(value, float):
+                cells.append(f"{value:,.2f}")
+            elif isinstance(value, int):
+                cells.append(f"{value:,}")
+            else:
+                cells.append(str(value))
+        table.add_row(*cells)
+
+    console.print(table)
+
+def parse_arguments():
+    """コマンドライン引数解析"""
+    parser = argparse.ArgumentParser(description="fam8 日次CSV蓄積・期間集計ツール")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = subparsers.add_parser("ingest", help="日付フォルダのCSVを取り込む")
+    ingest_parser.add_argument("date", nargs="?", default=None, help="対象日付・期間（例: 20250519, 20250501-20250531、省略時は全フォルダ）")
+    ingest_parser.add_argument("--force", action="store_true", help="取り込み済みの日付も取り込み直す")
+
+    query_parser = subparsers.add_parser("query", help="期間集計を表示")
+    query_parser.add_argument("date", help="対象期間（例: 20250501-20250531）")
+    query_parser.add_argument("--by", choices=["date"] + list(CAMPAIGN_GROUP_COLUMNS) + ["advertiser"], default="date", help="集計軸")
+    query_parser.add_argument("--type", choices=list(CAMPAIGN_FILES), default=None, help="キャンペーン種別（省略時は両方）")
+    query_parser.add_argument("--top", type=int, default=30, help="表示件数")
+    return parser.parse_args()
+
+def main():
+    """メイン関数"""
+    args = parse_arguments()
+    conn = connect()
+
+    try:
+        if args.command == "ingest":
+            target_dates = expand_dates(*parse_date_range(args.date)) if args.date else None
+            ingest(conn, target_dates, force=args.force)
+            return 0
+
+        start_date, end_date = parse_date_range(args.date)
+        metrics = ["Imp", "Click", "CV", "グロス", "ネット", "利益"]
+
+        if args.by == "date":
+            rows = query_daily_totals(conn, start_date, end_date, args.type)
+            display_rows(f"{start_date}〜{end_date} 日別合計", ["日付", "種別"] + metrics, rows)
+        elif args.by == "advertiser":
+            rows = query_advertiser_range(conn, start_date, end_date, args.top)
+            display_rows(f"{start_date}〜{end_date} 広告主別集計", ["広告主", "日数"] + metrics, rows)
+        else:
+            rows = query_campaign_range(conn, start_date, end_date, args.by, args.type, args.top)
+            display_rows(f"{start_date}〜{end_date} {args.by}別集計", [args.by, "日数"] + metrics, rows)
+        return 0
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    setup_logger()
+    sys.exit(main())
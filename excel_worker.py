@@ -0,0 +1,361 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Excelを常駐させて転記ジョブを受け付けるワーカーモジュール
+
+1つのExcel（xw.App）を起動したままにし、開いた進捗ブックをジョブ間で使い回す。
+excel_writer.py からローカル接続で転記ジョブを送る。
+
+使い方:
+    python excel_worker.py          ワーカーを起動
+    python excel_worker.py ping     稼働確認
+    python excel_worker.py stop     ワーカーを終了
+"""
+import os
+import sys
+import time
+import secrets
+import subprocess
+from datetime import datetime
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+from loguru import logger
+
+try:
+    import xlwings as xw
+except ImportError:
+    xw = None
+
+# 設定
+CONFIG = {
+    "address": ("127.0.0.1", 47651),
+    # 接続の認証キー（環境変数があれば優先。なければ初回起動時に乱数で作成してファイルに保存）
+    "authkey_env": "FAM8_EXCEL_WORKER_KEY",
+    "authkey_file": os.path.join(os.path.dirname(os.path.abspath(__file__)), "meta", "excel_worker.key"),
+    "log_dir": "log",
+    # 自動起動したワーカーの応答を待つ秒数
+    "start_timeout": 60
+}
+
+def setup_logger():
+    """ログ設定"""
+    log_dir = CONFIG["log_dir"]
+    os.makedirs(log_dir, exist_ok=True)
+
+    today = datetime.now().strftime('%Y%m%d')
+    log_file = os.path.join(log_dir, f"{today}.log")
+
+    logger.remove()
+    format_string = "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>excel_worker</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
+
+    logger.add(log_file, format=format_string, level="INFO", encoding="utf-8", enqueue=True)
+    logger.add(sys.stderr, format=format_string, level="INFO", colorize=True)
+
+def load_authkey(create=False):
+    """接続用の認証キーを取得
+
+    要求はpickleで受け渡すため、キーはソースに書かず環境ごとに作成する。
+    キーファイルは所有者のみ読み書きできる権限で作成する（Windowsではユーザーフォルダの権限に従う）。
+    """
+    env_key = os.environ.get(CONFIG["authkey_env"])
+    if env_key:
+        return env_key.encode("utf-8")
+
+    key_file = CONFIG["authkey_file"]
+    if not os.path.exists(key_file):
+        if not create:
+            raise ConnectionError(f"Excelワーカーの認証キーがありません: {key_file}")
+        os.makedirs(os.path.dirname(key_file), exist_ok=True)
+        try:
+            fd = os.open(key_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass  # 同時に起動した別プロセスが作成済み
+        else:
+            with os.fdopen(fd, 'w', encoding='ascii') as f:
+                f.write(secrets.token_hex(32))
+            logger.info(f"Excelワーカーの認証キーを作成しました: {key_file}")
+
+    with open(key_file, 'r', encoding='ascii') as f:
+        return bytes.fromhex(f.read().strip())
+
+class ExcelWorker:
+    """1つのExcelを所有し、進捗ブックを開いたまま転記ジョブを処理する"""
+
+    def __init__(self):
+        self.app = None
+        # パス → (XlwingsWorkbook, 保存直後の更新時刻)
+        self.books = {}
+        self.jobs = 0
+
+    def ensure_app(self):
+        """Excelの稼働確認（応答しない場合は自分が起動したExcelだけを終了して再起動）"""
+        if self.app is not None:
+            try:
+                self.app.books.count  # COM呼び出しが通るか確認
+                return self.app
+            except Exception as e:
+                logger.warning(f"Excelが応答しないため再起動します: {str(e)}")
+                self.kill_app()
+
+        if xw is None:
+            raise ImportError("xlwingsがインストールされていません")
+
+        start_time = time.time()
+        self.app = xw.App(visible=False, add_book=False)
+        self.app.display_alerts = False  # 確認ダイアログを表示しない
+        logger.info(f"Excelを起動しました（PID {self.app.pid}, {time.time() - start_time:.2f}秒）")
+        return self.app
+
+    def kill_app(self):
+        """このワーカーが起動したExcelだけを終了（他のExcelには触れない）"""
+        if self.app is None:
+            return
+
+        pid = self.app.pid
+        try:
+            self.app.quit()
+        except Exception:
+            subprocess.run(['taskkill', '/F', '/PID', str(pid)],
+                           stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+        self.app = None
+        self.books = {}
+
+    def get_workbook(self, path):
+        """キャッシュ済みのブックを返す（閉じられた・外部で更新された場合は開き直す）"""
+        from excel_writer import XlwingsWorkbook
+
+        app = self.ensure_app()
+        cached = self.books.get(path)
+
+        if cached is not None:
+            workbook, saved_mtime = cached
+            try:
+                workbook.book.name  # ブックが閉じられていないか確認
+                if os.path.getmtime(path) == saved_mtime:
+                    logger.info(f"開いたままの進捗ブックを使用します: {path}")
+                    return workbook
+                logger.info(f"進捗ブックが外部で更新されているため開き直します: {path}")
+                workbook.close()
+            except Exception as e:
+                logger.warning(f"キャッシュした進捗ブックを使えないため開き直します: {str(e)}")
+            del self.books[path]
+
+        start_time = time.time()
+        workbook = XlwingsWorkbook(app=app)
+        workbook.open(path)
+        logger.info(f"進捗ブックを開きました: {path}（{time.time() - start_time:.2f}秒）")
+        self.books[path] = (workbook, None)
+        return workbook
+
+    def transfer(self, job):
+        """転記ジョブを実行（ブックは保存後も開いたままにする）"""
+        from excel_writer import apply_transfer
+
+        path = job["progress_book_path"]
+        workbook = self.get_workbook(path)
+
+        try:
+            apply_transfer(workbook, job["matrix"], job["row_totals"], run_macro=job.get("run_macro"))
+        except Exception:
+            # 途中まで書き込んだブックは破棄して次回開き直す
+            self.books.pop(path, None)
+            try:
+                workbook.book.close()
+            except Exception:
+                pass
+            raise
+
+        self.books[path] = (workbook, os.path.getmtime(path))
+        self.jobs += 1
+
+    def release(self, path):
+        """キャッシュしているブックを保存せずに閉じる"""
+        cached = self.books.pop(path, None)
+        if cached is None:
+            return False
+        try:
+            cached[0].book.close()
+        except Exception:
+            pass
+        logger.info(f"進捗ブックを閉じました: {path}")
+        return True
+
+    def status(self):
+        """稼働状況"""
+        return {
+            "pid": os.getpid(),
+            "excel_pid": self.app.pid if self.app is not None else None,
+            "books": list(self.books),
+            "jobs": self.jobs
+        }
+
+    def close(self):
+        """開いているブックを閉じてExcelを終了"""
+        for workbook, _ in self.books.values():
+            try:
+                workbook.book.close()
+            except Exception:
+                pass
+        self.books = {}
+        if self.app is not None:
+            self.kill_app()
+            logger.info("Excelを終了しました")
+
+def handle_request(worker, request):
+    """1件の要求を処理して応答を返す"""
+    op = request.get("op")
+
+    if op == "ping":
+        return {"ok": True, **worker.status()}
+
+    if op == "transfer":
+        start_time = time.time()
+        try:
+            worker.transfer(request)
+        except Exception as e:
+            logger.error(f"転記ジョブでエラーが発生しました: {str(e)}")
+            import traceback
+            logger.error(traceback.format_exc())
+            return {"ok": False, "error": str(e)}
+        elapsed = time.time() - start_time
+        logger.info(f"転記ジョブが完了しました（{elapsed:.2f}秒）")
+        return {"ok": True, "elapsed": elapsed}
+
+    if op == "release":
+        return {"ok": True, "released": worker.release(request["path"])}
+
+    if op == "shutdown":
+        return {"ok": True}
+
+    return {"ok": False, "error": f"未対応の要求です: {op}"}
+
+def serve():
+    """ワーカーを起動して要求を順番に処理（Excelは1つなので同時には処理しない）"""
+    worker = ExcelWorker()
+
+    with Listener(CONFIG["address"], authkey=load_authkey(create=True)) as listener:
+        logger.info(f"Excelワーカーを起動しました: {CONFIG['address'][0]}:{CONFIG['address'][1]}")
+
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    logger.warning(f"接続を受け付けられませんでした: {str(e)}")
+                    continue
+
+                with conn:
+                    try:
+                        request = conn.recv()
+                    except EOFError:
+                        continue
+
+                    response = handle_request(worker, request)
+                    try:
+                        conn.send(response)
+                    except Exception as e:
+                        logger.warning(f"応答を返せませんでした: {str(e)}")
+
+                if request.get("op") == "shutdown":
+                    logger.info("終了要求を受け付けました")
+                    break
+        finally:
+            worker.close()
+
+class WorkerNotRunningError(ConnectionError):
+    """ワーカーが起動しておらず、自動起動もしない"""
+
+def send_request(request, timeout=None):
+    """ワーカーに要求を送り応答を受け取る（接続できない場合はConnectionError）"""
+    with Client(CONFIG["address"], authkey=load_authkey()) as conn:
+        conn.send(request)
+        if timeout is not None and not conn.poll(timeout):
+            raise TimeoutError(f"ワーカーが{timeout}秒以内に応答しません")
+        return conn.recv()
+
+def ping():
+    """ワーカーの稼働確認（稼働していなければNone、認証キーが一致しなければAuthenticationError）"""
+    try:
+        return send_request({"op": "ping"}, timeout=10)
+    except (ConnectionError, OSError, EOFError, TimeoutError):
+        return None
+
+def start_worker():
+    """ワーカーをバックグラウンドで起動し、応答するまで待つ"""
+    logger.info("Excelワーカーを起動します")
+    load_authkey(create=True)  # ワーカーと同じキーを使うため起動前に用意しておく
+    script = os.path.abspath(__file__)
+
+    creationflags = 0
+    if os.name == "nt":
+        creationflags = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    subprocess.Popen([sys.executable, script], cwd=os.path.dirname(script),
+                     stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                     creationflags=creationflags)
+
+    deadline = time.time() + CONFIG["start_timeout"]
+    while time.time() < deadline:
+        status = ping()
+        if status:
+            return status
+        time.sleep(0.5)
+
+    raise TimeoutError(f"Excelワーカーが{CONFIG['start_timeout']}秒以内に起動しませんでした")
+
+def release_book(path):
+    """ワーカーが開いたままにしているブックを閉じさせる（ワーカーが起動していなければ何もしない）"""
+    try:
+        return send_request({"op": "release", "path": path}, timeout=30).get("released", False)
+    except (ConnectionError, OSError, EOFError, TimeoutError):
+        return False
+
+def submit_transfer(progress_book_path, matrix, row_totals, run_macro, auto_start=True):
+    """ワーカーに転記ジョブを送る（稼働していなければ起動する）"""
+    status = ping()
+    if status is None:
+        if not auto_start:
+            raise WorkerNotRunningError("Excelワーカーが起動していません")
+        status = start_worker()
+    logger.info(f"Excelワーカーに転記ジョブを送信します（ワーカーPID {status['pid']}, 処理済み {status['jobs']}件）")
+
+    response = send_request({
+        "op": "transfer",
+        "progress_book_path": progress_book_path,
+        "matrix": matrix,
+        "row_totals": row_totals,
+        "run_macro": run_macro
+    })
+
+    if not response.get("ok"):
+        raise RuntimeError(f"Excelワーカーでの転記に失敗しました: {response.get('error')}")
+    return response
+
+if __name__ == "__main__":
+    setup_logger()
+
+    command = sys.argv[1].lower() if len(sys.argv) > 1 else "serve"
+
+    if command == "ping":
+        try:
+            status = ping()
+        except AuthenticationError:
+            logger.error("認証キーが一致しません（別の認証キーで起動したワーカーが稼働中です）")
+            sys.exit(1)
+        if status:
+            logger.info(f"Excelワーカー稼働中: {status}")
+        else:
+            logger.info("Excelワーカーは起動していません")
+        sys.exit(0 if status else 1)
+
+    if command == "stop":
+        try:
+            send_request({"op": "shutdown"}, timeout=30)
+            logger.info("Excelワーカーを終了しました")
+        except (ConnectionError, OSError, EOFError):
+            logger.info("Excelワーカーは起動していません")
+        except AuthenticationError:
+            logger.error("認証キーが一致しないため終了要求を送れません（別の認証キーで起動したワーカーが稼働中です）")
+            sys.exit(1)
+        sys.exit(0)
+
+    serve()
@@ -9,20 +9,69 @@ import glob
 import csv
 import re
 import time
+import zipfile
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 from loguru import logger
-import xlwings as xw  # xlwingsを必ず使用
+import csv_encoding
+import book_cache
+import excel_worker
+from advertiser_csv import iter_advertiser_rows
+
+# Excel操作バックエンド（使用するものだけインストールされていればよい）
+try:
+    import xlwings as xw  # Excel本体を使う場合（Windows）
+except ImportError:
+    xw = None
+
+try:
+    import openpyxl  # Excelを起動せずにブックを直接編集する場合（Linux等）
+    from openpyxl.utils.cell import coordinate_from_string, column_index_from_string
+except ImportError:
+    openpyxl = None
 
 # Excel定数を直接定義（win32com.constantsの代わり）
 XL_UP = -4162
 
+# openpyxlで保存すると失われるブック内の部品（フォームコントロールのボタン・図形・ActiveX・埋め込み）
+# 印刷設定（xl/printerSettings/*.bin）はプリンタドライバ固有の設定で、用紙・向き等はシートのpageSetupに残るため対象外
+# コメント用のVML（xl/drawings/vmlDrawing*.vml）はopenpyxlが書き直すため対象外
+OPENPYXL_LOSSY_PARTS = ("xl/drawings/", "xl/ctrlProps/", "xl/activeX/", "xl/embeddings/")
+OPENPYXL_KEPT_PARTS = ("xl/drawings/vmlDrawing",)
+
 # 設定
 CONFIG = {
     "PATHS": {
         "csv_base_dir": "csv",
-        "log_dir": "log"
+        "log_dir": "log",
+        # 進捗ブックの保存先（Linuxの場合はマウント先に変更する）
+        "progress_book_dir": r"\\rin\rep\営業本部\プロジェクト\fam\ADN\各ADN進捗表\fam8進捗"
+    },
+    "EXCEL": {
+        # 進捗ブックの操作方法: "xlwings"（Excel本体）または "openpyxl"（Excel不要・マクロ実行なし）
+        # openpyxlは参照シートのボタン（フォームコントロール）・図形を保存できないため、
+        # これらを含むブックではxlwingsに切り替える（Excel本体がなければ転記を中止）
+        "backend": "xlwings",
+        # trueの場合、ボタン等が失われることを承知のうえでopenpyxlで保存する
+        "openpyxl_allow_lossy": False,
+        # trueの場合、転記後にマクロ fam8progress_calling を実行（openpyxlでは実行できないため別ステージで実行）
+        "run_macro": True,
+        # trueの場合、参照シートをB2から2次元配列で一括書き込み。falseの場合、従来のセル単位書き込み
+        "bulk_write": True,
+        # trueの場合、参照シートの既存データと比較して変更のある行だけを書き込む（falseの場合は全体をクリアして書き込み）
+        "diff_write": True
+    },
+    "CACHE": {
+        # trueの場合、共有フォルダの進捗ブックをローカルの作業コピー（meta/book_cache）で操作して書き戻す
+        "enabled": True
+    },
+    "WORKER": {
+        # trueの場合、常駐Excelワーカー（excel_worker.py）に転記ジョブを送る（xlwingsのみ）
+        "enabled": False,
+        # ワーカーが起動していなければ自動で起動する
+        "auto_start": True
     }
 }
 
@@ -52,11 +101,27 @@ def parse_date(date_str):
    
     return date_str
 
+def parse_date_range(date_str):
+    """日付範囲（YYYYMMDD-YYYYMMDD）を日付文字列のリストに展開"""
+    start_str, _, end_str = date_str.partition("-")
+    start_date = datetime.strptime(start_str, "%Y%m%d")
+    end_date = datetime.strptime(end_str or start_str, "%Y%m%d")
+   
+    if end_date < start_date:
+        raise ValueError(f"終了日が開始日より前です: {date_str}")
+   
+    dates = []
+    current = start_date
+    while current <= end_date:
+        dates.append(current.strftime("%Y%m%d"))
+        current += timedelta(days=1)
+    return dates
+
 def find_progress_book_path():
     """進捗ブックパスを取得 - 標準入力を待たない"""
     # 自動検索のみを行う
     logger.info("進捗ブックを自動検索します")
-    base_path = r"\\rin\rep\営業本部\プロジェクト\fam\ADN\各ADN進捗表\fam8進捗"
+    base_path = CONFIG["PATHS"]["progress_book_dir"]
    
     if not os.path.exists(base_path):
         logger.error(f"進捗ブック保存先が見つかりません: {base_path}")
@@ -74,6 +139,18 @@ def find_progress_book_path():
     logger.info(f"最新の進捗ブック: {book_files[0]}")
     return book_files[0]
 
+def find_progress_book_for_date(target_date):
+    """対象日の月の進捗ブックパスを取得（例：新2025年5月fam8進捗.xlsm）"""
+    date_obj = datetime.strptime(target_date, "%Y%m%d")
+    filename = f"新{date_obj.year}年{date_obj.month}月fam8進捗.xlsm"
+    book_path = os.path.join(CONFIG["PATHS"]["progress_book_dir"], filename)
+   
+    if not os.path.exists(book_path):
+        logger.error(f"{target_date}の進捗ブックが見つかりません: {book_path}")
+        raise FileNotFoundError(f"{target_date}の進捗ブックが見つかりません: {book_path}")
+   
+    return book_path
+
 def find_csv_folder(target_date):
     """CSVフォルダを取得 - 標準入力を待たない"""
     # 自動検索のみを行う
@@ -87,19 +164,43 @@ def find_csv_folder(target_date):
     return csv_dir
 
 def detect_encoding(file_path):
-    """ファイルのエンコーディングを検出"""
-    encodings = ['shift_jis', 'cp932', 'utf-8-sig', 'utf-8']
-   
-    for encoding in encodings:
-        try:
-            with open(file_path, 'r', encoding=encoding) as f:
-                f.read(100)  # 先頭の一部だけ読んでみる
-                return encoding
-        except UnicodeDecodeError:
-            continue
+    """ファイルのエンコーディングを検出（判定はcsv_encodingに委譲し、先頭サンプルだけを読む）"""
+    return csv_encoding.detect_encoding(file_path)
+
+def read_total_line(file_path, encoding, block_size=8192):
+    """ファイル末尾からブロック単位で遡って[total]行を探す（行全体とファイル末尾から読んだバイト数を返す）"""
+    # [total]と改行はいずれの候補エンコーディングでもASCIIと同じバイト列
+    # （Shift_JISの2バイト目に改行コードは現れないため、改行位置で区切ってから復号する）
+    marker = b"[total]"
    
-    # デフォルトのエンコーディングを返す
-    return 'shift_jis'
+    with open(file_path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        buffer = b""
+       
+        while position > 0:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            buffer = f.read(read_size) + buffer
+           
+            index = buffer.rfind(marker)
+            if index == -1:
+                continue
+           
+            line_start = buffer.rfind(b"\n", 0, index) + 1
+            if line_start == 0 and position > 0:
+                # 行頭がさらに前のブロックにあるため続けて読む
+                continue
+           
+            line_end = buffer.find(b"\n", index)
+            if line_end == -1:
+                line_end = len(buffer)
+           
+            # 金額の列はASCIIのため、キャンペーン名等に復号できない文字があっても置換して読み進める
+            return buffer[line_start:line_end].decode(encoding, errors="replace").rstrip("\r"), len(buffer)
+       
+        return None, len(buffer)
 
 def extract_total_values(file_path, campaign_type):
     """CSVの[total]行からGROSS/NET値を抽出"""
@@ -107,26 +208,18 @@ def extract_total_values(file_path, campaign_type):
     logger.info(f"{campaign_type}キャンペーンCSVのエンコーディング: {encoding}")
    
     try:
-        # CSVファイルを行ごとに読み込む
-        with open(file_path, 'r', encoding=encoding) as f:
-            lines = f.readlines()
-       
-        logger.info(f"{campaign_type}キャンペーンCSV行数: {len(lines)}")
-       
-        # [total]行を見つける
-        total_line = None
-        for line in reversed(lines):  # 下から探す
-            if "[total]" in line:
-                total_line = line
-                logger.info(f"[total]行を見つけました: {line.strip()}")
-                break
+        # [total]行をファイル末尾から探す（下から探す）
+        total_line, bytes_read = read_total_line(file_path, encoding)
+        logger.info(f"{campaign_type}キャンペーンCSV: 末尾から{bytes_read}バイトを読み込み（ファイルサイズ {os.path.getsize(file_path)} バイト）")
        
         if not total_line:
             logger.warning(f"{campaign_type}キャンペーンCSVに[total]行が見つかりません")
             raise ValueError(f"{campaign_type}キャンペーンCSVに[total]行が見つかりません")
        
-        # CSVフィールドを分解
-        fields = total_line.split(',')
+        logger.info(f"[total]行を見つけました: {total_line.strip()}")
+       
+        # CSVフィールドを分解（引用符内のカンマで列がずれないようcsvモジュールで解析）
+        fields = next(csv.reader([total_line]))
        
         # フィールドを検査してGROSS/NET値を特定
         # カラム13と14が対象 (一般CSVのログから)
@@ -161,14 +254,340 @@ def kill_excel_processes():
         logger.error(f"Excelプロセス終了エラー: {str(e)}")
         return False
 
-def transfer_csv_to_excel(advertiser_csv, general_campane_csv, adult_campane_csv, progress_book_path):
-    """CSVを進捗ブックに転記し、マクロを実行"""
-    logger.info(f"Excelへの転記開始: {progress_book_path}")
+class XlwingsWorkbook:
+    """Excel本体（xlwings）で進捗ブックを操作するバックエンド"""
    
-    # 実行前に未終了のExcelプロセスを終了
-    kill_excel_processes()
+    def __init__(self, app=None):
+        # appを渡した場合は既存のExcelで開き、close時にExcelは終了しない（常駐ワーカー用）
+        self.app = app
+        self.owns_app = app is None
+        self.book = None
+   
+    def open(self, path):
+        if xw is None:
+            raise ImportError("xlwingsがインストールされていません")
+       
+        if self.app is None:
+            self.app = xw.App(visible=False)
+            self.app.display_alerts = False  # 確認ダイアログを表示しない
+        self.book = self.app.books.open(path)
+   
+    def clear_range(self, sheet_name, address):
+        self.book.sheets[sheet_name].range(address).clear_contents()
+   
+    def read_matrix(self, sheet_name, address):
+        return self.book.sheets[sheet_name].range(address).options(ndim=2).value
+   
+    def write_matrix(self, sheet_name, top_left, matrix):
+        self.book.sheets[sheet_name].range(top_left).value = matrix
+   
+    def write_cell(self, sheet_name, address, value):
+        self.book.sheets[sheet_name].range(address).value = value
+   
+    def run_macro(self, macro_name):
+        self.book.macro(macro_name)()
+        return True
+   
+    def save(self):
+        self.book.save()
+   
+    def close(self):
+        if self.book is not None:
+            self.book.close()
+            self.book = None
+        if self.app is not None and self.owns_app:
+            self.app.quit()
+            self.app = None
+            logger.info("Excelを終了しました")
+
+class OpenpyxlWorkbook:
+    """Excelを起動せずopenpyxlで進捗ブックを直接編集するバックエンド（マクロは保持するが実行しない）
+
+    保存時にフォームコントロール（参照シートの「Button 1」）・図形は失われる（印刷設定はpageSetupのみ残る）。
+    これらを含むブックは resolve_backend で xlwings に切り替える。
+    """
+   
+    def __init__(self):
+        self.path = None
+        self.book = None
+   
+    def open(self, path):
+        if openpyxl is None:
+            raise ImportError("openpyxlがインストールされていません")
+       
+        self.path = path
+        self.book = openpyxl.load_workbook(path, keep_vba=True)
+   
+    def clear_range(self, sheet_name, address):
+        for row in self.book[sheet_name][address]:
+            for cell in row:
+                cell.value = None
+   
+    def read_matrix(self, sheet_name, address):
+        return [[cell.value for cell in row] for row in self.book[sheet_name][address]]
+   
+    def write_matrix(self, sheet_name, top_left, matrix):
+        sheet = self.book[sheet_name]
+        column_letter, start_row = coordinate_from_string(top_left)
+        start_col = column_index_from_string(column_letter)
+       
+        for row_offset, row_values in enumerate(matrix):
+            for col_offset, value in enumerate(row_values):
+                self._set_value(sheet.cell(row=start_row + row_offset, column=start_col + col_offset), value)
+   
+    def write_cell(self, sheet_name, address, value):
+        self._set_value(self.book[sheet_name][address], value)
+   
+    def run_macro(self, macro_name):
+        logger.warning(f"openpyxlではマクロ {macro_name} を実行できません。別ステージ（excel_writer.py 日付 macro）で実行してください")
+        return False
+   
+    def save(self):
+        self.book.save(self.path)
+   
+    def close(self):
+        if self.book is not None:
+            self.book.close()
+            self.book = None
    
-    # まずCSVからデータを抽出（Excel処理前に実施）
+    @staticmethod
+    def _set_value(cell, value):
+        """Excelに文字列を入力した場合と同様に数値・パーセントを変換して設定"""
+        if isinstance(value, str):
+            text = value.strip()
+            if text.endswith("%"):
+                try:
+                    decimals = len(text[:-1].partition(".")[2])
+                    cell.value = float(text[:-1]) / 100
+                    cell.number_format = "0%" if decimals == 0 else "0." + "0" * decimals + "%"
+                    return
+                except ValueError:
+                    pass
+            else:
+                try:
+                    cell.value = int(text)
+                    return
+                except ValueError:
+                    pass
+                try:
+                    cell.value = float(text)
+                    return
+                except ValueError:
+                    pass
+        cell.value = value
+
+# バックエンド名 → 実装クラス
+WORKBOOK_BACKENDS = {
+    "xlwings": XlwingsWorkbook,
+    "openpyxl": OpenpyxlWorkbook,
+}
+
+def find_openpyxl_lossy_parts(path):
+    """openpyxlで保存すると失われる部品をブックから探す"""
+    with zipfile.ZipFile(path) as archive:
+        return [name for name in archive.namelist()
+                if name.startswith(OPENPYXL_LOSSY_PARTS) and not name.startswith(OPENPYXL_KEPT_PARTS)]
+
+def is_excel_available():
+    """Excel本体を起動できる環境か（xlwingsはExcelのないLinuxでもインポートできるため、Excelの有無を確認する）"""
+    if xw is None:
+        return False
+    if sys.platform == "win32":
+        try:
+            import winreg
+            winreg.CloseKey(winreg.OpenKey(winreg.HKEY_CLASSES_ROOT, r"Excel.Application\CLSID"))
+            return True
+        except OSError:
+            return False
+    if sys.platform == "darwin":
+        return os.path.exists("/Applications/Microsoft Excel.app")
+    return False
+
+def resolve_backend(progress_book_path, backend):
+    """使うバックエンドを決める（openpyxlで失われる部品を含むブックはxlwingsに切り替え、使えなければRuntimeError）"""
+    if backend != "openpyxl":
+        return backend
+
+    lossy_parts = find_openpyxl_lossy_parts(progress_book_path)
+    if not lossy_parts:
+        return backend
+
+    logger.warning(f"進捗ブックにopenpyxlで保存すると失われる部品があります（ボタン等）: {', '.join(lossy_parts)}")
+    if CONFIG["EXCEL"]["openpyxl_allow_lossy"]:
+        logger.warning("openpyxl_allow_lossy が有効なため、これらの部品を失ったまま保存します")
+        return backend
+    if is_excel_available():
+        logger.warning("ボタン等を保持するため xlwings（Excel本体）で転記します")
+        return "xlwings"
+    raise RuntimeError("openpyxlで保存すると進捗ブックのボタン等が失われるため転記を中止しました（Excelのある環境で実行するか openpyxl_allow_lossy を有効にしてください）")
+
+def create_workbook(backend):
+    """設定されたバックエンドのブック操作オブジェクトを作成"""
+    if backend not in WORKBOOK_BACKENDS:
+        raise ValueError(f"未対応のブック操作バックエンドです: {backend}")
+    return WORKBOOK_BACKENDS[backend]()
+
+def build_advertiser_matrix(records):
+    """広告主データを参照シートB〜M列の2次元配列に変換"""
+    matrix = []
+   
+    for record in records:
+        excel_row = len(matrix) + 2
+       
+        # B列:ID、C列:広告主名、D列:列1（空）、E列:代理店名、F〜M列:表示率〜ネット
+        matrix.append([record.advertiser_id, record.name, "", record.agency] + list(record.metrics))
+        logger.info(f"CSV {record.line_no}行目（Excel行 {excel_row}）: B列={record.advertiser_id}, C列={record.name}, E列={record.agency}")
+   
+    return matrix
+
+def count_cellwise_writes(matrix):
+    """セル単位で書き込んだ場合のCOM呼び出し回数（B〜E列は常に、F〜M列は値がある場合のみ）"""
+    return sum(4 + sum(1 for val in row[4:] if val is not None) for row in matrix)
+
+def write_advertiser_cells(workbook, matrix):
+    """（従来方式）参照シートにセル単位で書き込む"""
+    for offset, row_values in enumerate(matrix):
+        excel_row = offset + 2
+        for col_offset, val in enumerate(row_values):
+            # F列以降は空でない場合だけ転記
+            if col_offset >= 4 and val is None:
+                continue
+            col_letter = chr(ord('B') + col_offset)
+            workbook.write_cell("参照", f'{col_letter}{excel_row}', val)
+
+def write_advertiser_matrix(workbook, matrix):
+    """参照シートに広告主データを書き込み、書き込み方式ごとの所要時間をログ出力"""
+    if not matrix:
+        logger.warning("参照シートに書き込む広告主データがありません")
+        return
+   
+    cellwise_calls = count_cellwise_writes(matrix)
+    start_time = time.time()
+   
+    if CONFIG["EXCEL"]["bulk_write"]:
+        # B2を起点に2次元配列を1回で書き込む
+        workbook.write_matrix("参照", "B2", matrix)
+        elapsed = time.time() - start_time
+        logger.info(f"参照シート書き込み（一括）: {len(matrix)}行×{len(matrix[0])}列, {elapsed:.2f}秒, COM呼び出し1回（セル単位方式では{cellwise_calls}回）")
+    else:
+        write_advertiser_cells(workbook, matrix)
+        elapsed = time.time() - start_time
+        logger.info(f"参照シート書き込み（セル単位）: {len(matrix)}行, {elapsed:.2f}秒, COM呼び出し{cellwise_calls}回")
+
+def normalize_cell_value(value):
+    """差分比較用にセル値を正規化（Excelに文字列を入力した場合と同様に数値・パーセントを数値として扱う）"""
+    if value is None:
+        return None
+   
+    if isinstance(value, str):
+        text = value.strip()
+        if not text:
+            return None
+        try:
+            if text.endswith("%"):
+                value = float(text[:-1]) / 100
+            else:
+                value = float(text)
+        except ValueError:
+            return text
+   
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        # Excelは数値を有効数字15桁で保持するため、CSVの文字列と読み戻した値を同じ桁数にそろえて比較する
+        return float(f"{float(value):.15g}")
+   
+    return value
+
+def find_changed_blocks(current, matrix):
+    """新旧の行を比較し、変更のある連続した行ブロックを (開始行オフセット, 行数) のリストで返す"""
+    blocks = []
+    block_start = None
+   
+    for offset, new_row in enumerate(matrix):
+        old_row = current[offset] if offset < len(current) else []
+        width = max(len(new_row), len(old_row))
+        changed = any(
+            normalize_cell_value(new_row[col] if col < len(new_row) else None) !=
+            normalize_cell_value(old_row[col] if col < len(old_row) else None)
+            for col in range(width)
+        )
+       
+        if changed and block_start is None:
+            block_start = offset
+        elif not changed and block_start is not None:
+            blocks.append((block_start, offset - block_start))
+            block_start = None
+   
+    if block_start is not None:
+        blocks.append((block_start, len(matrix) - block_start))
+   
+    return blocks
+
+def find_last_filled_row(current):
+    """既存データの最終行オフセット（データがなければ-1）"""
+    for offset in range(len(current) - 1, -1, -1):
+        if any(normalize_cell_value(value) is not None for value in current[offset]):
+            return offset
+    return -1
+
+def write_advertiser_diff(workbook, matrix):
+    """参照シートの既存データ（B2:M1000）を一括で読み込み、変更のある行ブロックと末尾の不要行だけを書き換える"""
+    start_time = time.time()
+    current = workbook.read_matrix("参照", "B2:M1000") or []
+    read_elapsed = time.time() - start_time
+   
+    blocks = find_changed_blocks(current, matrix)
+    for block_start, block_rows in blocks:
+        workbook.write_matrix("参照", f"B{block_start + 2}", matrix[block_start:block_start + block_rows])
+   
+    # 新しいデータより下に残っている古い行だけをクリア
+    last_filled = find_last_filled_row(current)
+    if last_filled >= len(matrix):
+        workbook.clear_range("参照", f"B{len(matrix) + 2}:M{last_filled + 2}")
+        logger.info(f"末尾の不要行をクリアしました (B{len(matrix) + 2}:M{last_filled + 2})")
+   
+    width = len(matrix[0]) if matrix else 0
+    written_rows = sum(block_rows for _, block_rows in blocks)
+    elapsed = time.time() - start_time
+    logger.info(f"参照シート書き込み（差分）: 変更{len(blocks)}ブロック・{written_rows}行, "
+                f"書き込み{written_rows * width}セル（全体書き込みでは{len(matrix) * width}セル）, "
+                f"読み込み{read_elapsed:.2f}秒 / 合計{elapsed:.2f}秒")
+
+def update_advertiser_sheet(workbook, matrix):
+    """参照シートに広告主データを転記（差分書き込み、または全体クリア後に書き込み）"""
+    # 参照シートに広告主データを転記
+    logger.info("「参照」シートへの転記を開始します")
+   
+    if CONFIG["EXCEL"]["diff_write"]:
+        write_advertiser_diff(workbook, matrix)
+    else:
+        # 既存データを完全にクリア（B2からM1000まで）- N列は含めない
+        workbook.clear_range("参照", "B2:M1000")
+        logger.info("転記先の既存データをクリアしました (B2:M1000)")
+       
+        # データをExcelに転記
+        write_advertiser_matrix(workbook, matrix)
+   
+    logger.info(f"Excelシートに転記した行数: {len(matrix)}")
+
+def get_today_row():
+    """転記行を決定（今日が1日なら前月末日、それ以外は当日の日付+3）"""
+    today = datetime.now()
+    if today.day == 1:
+        # 前月末日を計算
+        last_day = today.replace(day=1) - timedelta(days=1)
+        row = last_day.day + 4
+        logger.info(f"本日は月初日のため、前月末日({last_day.day}日)を基準に行を計算: {row}行目")
+    else:
+        row = today.day + 3
+        logger.info(f"本日の日付({today.day}日)を基準に行を計算: {row}行目")
+    return row
+
+def get_date_row(target_date):
+    """対象日の転記行（5行目が1日）"""
+    return int(target_date[6:8]) + 4
+
+def extract_campaign_totals(general_campane_csv, adult_campane_csv):
+    """一般・アダルトキャンペーンCSVからGROSS/NET値を抽出"""
     try:
         general_gross, general_net = extract_total_values(general_campane_csv, "一般")
         logger.info(f"一般キャンペーン値: GROSS={general_gross}, NET={general_net}")
@@ -179,158 +598,177 @@ def transfer_csv_to_excel(advertiser_csv, general_campane_csv, adult_campane_csv
         logger.error(f"CSVからの値抽出に失敗: {str(e)}")
         raise
    
-    app = None
-    book = None
+    return (general_gross, general_net), (adult_gross, adult_net)
+
+def write_campaign_totals(workbook, row, general_totals, adult_totals):
+    """一般その他・アダルトその他シートの指定行J/K列にGROSS/NETを転記"""
+    for sheet_name, (gross, net) in (("一般その他", general_totals), ("アダルトその他", adult_totals)):
+        workbook.write_cell(sheet_name, f'J{row}', gross)
+        workbook.write_cell(sheet_name, f'K{row}', net)
+        logger.info(f"「{sheet_name}」シートの {row}行目 J/K列に転記しました: GROSS={gross}, NET={net}")
+
+def apply_transfer(workbook, matrix, row_totals, run_macro=None):
+    """開いている進捗ブックに参照シートと各行のJ/K列を転記し、マクロ実行・保存する"""
+    if run_macro is None:
+        run_macro = CONFIG["EXCEL"]["run_macro"]
+   
+    update_advertiser_sheet(workbook, matrix)
    
+    # 一般その他・アダルトその他シートに転記
+    for row, general_totals, adult_totals in row_totals:
+        write_campaign_totals(workbook, row, general_totals, adult_totals)
+   
+    # マクロ実行
+    if run_macro:
+        logger.info("マクロ fam8progress_calling を実行します")
+        if workbook.run_macro('fam8progress_calling'):
+            logger.info("マクロの実行が完了しました")
+    else:
+        logger.info("マクロの実行は設定により省略します")
+   
+    # 保存
+    workbook.save()
+    logger.info("進捗ブックを保存しました")
+
+def load_transfer_data(advertiser_csv, row_totals):
+    """転記データ（参照シートの2次元配列と各行のJ/K値）を用意する（Excelの起動と並行して別スレッドで実行）
+
+    row_totals に関数を渡した場合は、このスレッドで呼び出してキャンペーンCSVの値を抽出する
+    """
+    start_time = time.time()
+    if callable(row_totals):
+        row_totals = row_totals()
+   
+    # 広告主CSVを読み込み（1回の読み込みで逐次解析）
+    logger.info(f"広告主CSV読み込み中: {advertiser_csv}")
+    matrix = build_advertiser_matrix(iter_advertiser_rows(advertiser_csv))
+   
+    logger.info(f"CSVの解析が完了しました（{time.time() - start_time:.2f}秒）")
+    return matrix, row_totals
+
+def wait_transfer_data(future):
+    """別スレッドで解析中の転記データを受け取る（最初の書き込みの直前で待ち合わせる）"""
+    start_time = time.time()
+    matrix, row_totals = future.result()
+    logger.info(f"CSV解析の完了待ち: {time.time() - start_time:.2f}秒")
+    return matrix, row_totals
+
+def write_via_worker(progress_book_path, transfer_data):
+    """常駐Excelワーカーで転記（ワーカーが起動していない場合だけNoneを返し、通常の転記に切り替える）
+
+    通常の転記はExcelプロセスを強制終了するため、ワーカーが起動中・処理中の可能性がある失敗ではFalseを返す
+    """
+    # 広告主CSVの解析はこのプロセスで行い、ワーカーには転記データだけを送る
     try:
-        # xlwingsを使ってExcelを操作
-        app = xw.App(visible=False)
-        app.display_alerts = False  # 確認ダイアログを表示しない
-       
-        # 進捗ブックを開く
-        book = app.books.open(progress_book_path)
-        logger.info(f"進捗ブックを開きました: {progress_book_path}")
-       
-        # 参照シートに広告主データを転記
-        ref_sheet = book.sheets["参照"]
-        logger.info("「参照」シートへの転記を開始します")
-       
-        # 広告主CSVを読み込み
-        logger.info(f"広告主CSV読み込み中: {advertiser_csv}")
-        encoding = detect_encoding(advertiser_csv)
-       
-        # ファイルの内容を詳細にログ出力
-        with open(advertiser_csv, 'r', encoding=encoding) as f:
-            content = f.read()
+        matrix, row_totals = wait_transfer_data(transfer_data)
+    except Exception as e:
+        logger.error(f"広告主CSVの解析に失敗しました: {str(e)}")
+        return False
+   
+    try:
+        start_time = time.time()
+        excel_worker.submit_transfer(progress_book_path, matrix, row_totals,
+                                     run_macro=CONFIG["EXCEL"]["run_macro"],
+                                     auto_start=CONFIG["WORKER"]["auto_start"])
+        logger.info(f"Excelワーカーでの転記が完了しました（{time.time() - start_time:.2f}秒）")
+        return True
+   
+    except (excel_worker.WorkerNotRunningError, ConnectionRefusedError) as e:
+        logger.warning(f"Excelワーカーが起動していないため通常の転記を行います: {str(e)}")
+        return None
+
+    except TimeoutError as e:
+        # ワーカーのプロセスは起動済みでExcelを起動している途中の可能性があるため、通常の転記には切り替えない
+        logger.error(f"Excelワーカーの応答を待てませんでした（ワーカーのExcelを止めないよう通常の転記は行いません）: {str(e)}")
+        return False
+
+    except (ConnectionError, OSError, EOFError) as e:
+        logger.error(f"Excelワーカーとの通信中にエラーが発生しました（通常の転記は行いません）: {str(e)}")
+        return False
+
+    except excel_worker.AuthenticationError:
+        # 稼働中のワーカーのExcelを止めないよう、通常の転記には切り替えない
+        logger.error("Excelワーカーの認証キーが一致しません（別の認証キーで起動したワーカーを終了してください）")
+        return False
+   
+    except Exception as e:
+        logger.error(f"Excelワーカーでの転記中にエラーが発生しました: {str(e)}")
+        return False
+
+def write_to_progress_book(progress_book_path, advertiser_csv, row_totals):
+    """進捗ブックを1回だけ開き、参照シートと各行のJ/K列を転記してマクロ実行・保存する
+
+    row_totals は (行, 一般(GROSS, NET), アダルト(GROSS, NET)) のリスト、またはそれを返す関数
+    CSVの解析は別スレッドで行い、作業コピーの取得・Excelの起動・ブックを開く処理と並行させる
+    """
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        transfer_data = executor.submit(load_transfer_data, advertiser_csv, row_totals)
        
-        # ファイルの先頭部分をログ出力して確認
-        logger.info(f"CSVファイル先頭50文字: {repr(content[:50])}")
+        if not CONFIG["CACHE"]["enabled"]:
+            return write_to_book(progress_book_path, transfer_data)
        
-        # 改行コードを確認
-        if '\r\n' in content:
-            logger.info("改行コード: CRLF (Windows)")
-        elif '\r' in content:
-            logger.info("改行コード: CR (旧Mac)")
-        elif '\n' in content:
-            logger.info("改行コード: LF (Unix/Linux/新Mac)")
+        # 共有フォルダのブックはローカルの作業コピーで操作し、最後に書き戻す
+        try:
+            local_path, remote_state = book_cache.checkout(progress_book_path, before_refresh=release_cached_book)
+        except Exception as e:
+            logger.error(f"進捗ブックの作業コピーを用意できません: {str(e)}")
+            return False
        
-        # 既存データを完全にクリア（B2からM1000まで）- N列は含めない
-        ref_sheet.range("B2:M1000").clear_contents()
-        logger.info("転記先の既存データをクリアしました (B2:M1000)")
+        start_time = time.time()
+        if not write_to_book(local_path, transfer_data):
+            return False
+        logger.info(f"[ローカル] 転記・マクロ実行・保存 {time.time() - start_time:.2f}秒")
+   
+    try:
+        book_cache.checkin(local_path, progress_book_path, remote_state)
+        return True
+    except Exception as e:
+        logger.error(f"進捗ブックを共有フォルダに書き戻せませんでした: {str(e)}")
+        return False
+
+def release_cached_book(local_path):
+    """作業コピーを置き換える前に、常駐ワーカーが開いたままにしているブックを閉じる"""
+    if CONFIG["WORKER"]["enabled"]:
+        excel_worker.release_book(local_path)
+
+def write_to_book(progress_book_path, transfer_data):
+    """指定したブックファイルを開いて転記・マクロ実行・保存する（transfer_data は解析中の転記データのFuture）"""
+    logger.info(f"Excelへの転記開始: {progress_book_path}")
+    try:
+        backend = resolve_backend(progress_book_path, CONFIG["EXCEL"]["backend"])
+    except (RuntimeError, OSError, zipfile.BadZipFile) as e:
+        logger.error(str(e))
+        return False
+    logger.info(f"ブック操作バックエンド: {backend}")
+   
+    # 常駐ワーカーが使える場合はExcelの起動・終了を省略
+    if backend == "xlwings" and CONFIG["WORKER"]["enabled"]:
+        result = write_via_worker(progress_book_path, transfer_data)
+        if result is not None:
+            return result
+   
+    # 実行前に未終了のExcelプロセスを終了
+    if backend == "xlwings":
+        kill_excel_processes()
+   
+    workbook = None
+   
+    try:
+        # 進捗ブックを開く
+        workbook = create_workbook(backend)
+        workbook.open(progress_book_path)
+        logger.info(f"進捗ブックを開きました: {progress_book_path}")
        
-        # CSVファイルを行ごとに読み込み、実際のデータ行だけを処理
-        data_rows = []
-        with open(advertiser_csv, 'r', encoding=encoding) as f:
-            csv_reader = csv.reader(f)
-            
-            # すべての行を一旦読み込む
-            all_rows = list(csv_reader)
-            
-            # 空行を除外
-            all_rows = [row for row in all_rows if row and any(cell.strip() for cell in row)]
-            
-            logger.info(f"CSVから読み込んだ総行数: {len(all_rows)}")
-            
-            # 最初の数行をログ出力して確認
-            for i, row in enumerate(all_rows[:5]):
-                logger.info(f"CSV行 {i}: {row}")
-            
-            # ヘッダー行を探してスキップ
-            # 1. 'ID'のような文字列を含む行を見つける
-            # 2. 空でない行を順に調べる
-            data_start = 0
-            for i, row in enumerate(all_rows):
-                # ヘッダー行っぽい行を検出（キーワードチェック）
-                row_text = ' '.join(row).lower()
-                if ('id' in row_text and '広告主' in row_text) or '広告管理' in row_text:
-                    logger.info(f"ヘッダー行として検出: {row}")
-                    data_start = i + 1  # 次の行からデータ開始
-            
-            # 実際のデータ行だけを使用
-            data_rows = all_rows[data_start:]
-            logger.info(f"ヘッダー行をスキップした後のデータ行数: {len(data_rows)}")
-        
-        # 転記先のExcelのセル位置
-        excel_row = 2  # B2から開始
-        
-        # データをExcelに転記
-        for i, row in enumerate(data_rows):
-            # 行データの長さチェック
-            if len(row) < 3:
-                logger.warning(f"行 {i+data_start}（データ行 {i}）はデータ不足のためスキップします: {row}")
-                continue
-            
-            # B列:ID、C列:広告主名、D列:列1（空）
-            ref_sheet.range(f'B{excel_row}').value = row[0]  # ID
-            ref_sheet.range(f'C{excel_row}').value = row[1]  # 広告主名
-            ref_sheet.range(f'D{excel_row}').value = ""      # 列1（空列）
-            
-            # E列: 代理店名（列ずれ補正）
-            代理店名 = ""
-            if len(row) >= 3 and row[2].strip():
-                代理店名 = row[2].strip()
-            elif len(row) >= 4 and row[3].strip():
-                代理店名 = row[3].strip()
-            elif len(row) >= 5:
-                代理店名 = ' '.join(cell.strip() for cell in row[2:] if cell.strip())
-
-            ref_sheet.range(f'E{excel_row}').value = 代理店名
-            logger.info(f"行 {i+data_start}（Excel行 {excel_row}）: B列={row[0]}, C列={row[1]}, E列={代理店名}")
-            
-            # F列から表示率を含めた残りのデータを配置
-            if len(row) > 3:
-                # F列(表示率)からM列(ネット)までの順に転記
-                for col_offset, val in enumerate(row[3:11]):  # 3〜10番目の要素をF〜M列に対応
-                    if col_offset < 8:  # F～M列まで（8列分）
-                        col_letter = chr(ord('F') + col_offset)  # F, G, H...
-                        if val and val.strip():  # 空でない場合だけ転記
-                            ref_sheet.range(f'{col_letter}{excel_row}').value = val
-                            logger.info(f"  {col_letter}列={val}")
-            
-            excel_row += 1  # 次の行へ
-        
-        logger.info(f"Excelシートに転記した行数: {excel_row - 2}")
-        
-        # 行を決定（今日が1日なら前月末日、それ以外は当日の日付+3）
-        today = datetime.now()
-        if today.day == 1:
-            # 前月末日を計算
-            last_day = today.replace(day=1) - timedelta(days=1)
-            row = last_day.day + 4
-            logger.info(f"本日は月初日のため、前月末日({last_day.day}日)を基準に行を計算: {row}行目")
-        else:
-            row = today.day + 3
-            logger.info(f"本日の日付({today.day}日)を基準に行を計算: {row}行目")
-       
-        # 一般その他シートに転記
-        general_sheet = book.sheets["一般その他"]
-        general_sheet.range(f'J{row}').value = general_gross
-        general_sheet.range(f'K{row}').value = general_net
-        logger.info(f"「一般その他」シートの {row}行目 J/K列に転記しました: GROSS={general_gross}, NET={general_net}")
-       
-        # アダルトその他シートに転記
-        adult_sheet = book.sheets["アダルトその他"]
-        adult_sheet.range(f'J{row}').value = adult_gross
-        adult_sheet.range(f'K{row}').value = adult_net
-        logger.info(f"「アダルトその他」シートの {row}行目 J/K列に転記しました: GROSS={adult_gross}, NET={adult_net}")
-       
-        # マクロ実行
-        logger.info("マクロ fam8progress_calling を実行します")
-        book.macro('fam8progress_calling')()
-        logger.info("マクロの実行が完了しました")
+        # Excelの起動と並行して解析していたCSVデータを受け取る
+        matrix, row_totals = wait_transfer_data(transfer_data)
        
-        # 保存
-        book.save()
-        logger.info("進捗ブックを保存しました")
+        # 転記・マクロ実行・保存
+        apply_transfer(workbook, matrix, row_totals)
        
-        # ブックを閉じる
-        book.close()
+        # ブックを閉じてExcelを終了
+        workbook.close()
         logger.info("ブックを閉じました")
        
-        # Excelを終了
-        app.quit()
-        logger.info("Excelを終了しました")
-       
         return True
    
     except Exception as e:
@@ -343,13 +781,88 @@ def transfer_csv_to_excel(advertiser_csv, general_campane_csv, adult_campane_csv
     finally:
         # リソース解放
         try:
-            if app:
-                app.quit()
+            if workbook:
+                workbook.close()
         except:
             pass
        
         # 終了時にExcelを確実にクリーンアップ
-        kill_excel_processes()
+        if backend == "xlwings":
+            kill_excel_processes()
+
+def transfer_csv_to_excel(advertiser_csv, general_campane_csv, adult_campane_csv, progress_book_path, totals=None):
+    """CSVを進捗ブックに転記し、マクロを実行
+
+    totals に抽出済みの (一般(GROSS, NET), アダルト(GROSS, NET)) を渡した場合はキャンペーンCSVを読み直さない
+    """
+    row = get_today_row()
+   
+    if totals is not None:
+        general_totals, adult_totals = totals
+        return write_to_progress_book(progress_book_path, advertiser_csv, [(row, general_totals, adult_totals)])
+   
+    # CSVからのデータ抽出はExcelの起動と並行して行う
+    def extract_row_totals():
+        general_totals, adult_totals = extract_campaign_totals(general_campane_csv, adult_campane_csv)
+        return [(row, general_totals, adult_totals)]
+   
+    return write_to_progress_book(progress_book_path, advertiser_csv, extract_row_totals)
+
+def transfer_dates_to_excel(target_dates, progress_book_path):
+    """複数日分のCSVを1回のExcelセッションで転記（参照シートは最終日の広告主データ）"""
+    # 全日付のCSVからの値抽出はExcelの起動と並行して行う
+    def extract_row_totals():
+        row_totals = []
+        for target_date in target_dates:
+            csv_dir = os.path.abspath(find_csv_folder(target_date))
+            general_totals, adult_totals = extract_campaign_totals(
+                os.path.join(csv_dir, "general_campane.csv"),
+                os.path.join(csv_dir, "adult_campane.csv")
+            )
+            row = get_date_row(target_date)
+            logger.info(f"{target_date}: {row}行目に転記します")
+            row_totals.append((row, general_totals, adult_totals))
+        return row_totals
+   
+    advertiser_csv = os.path.join(os.path.abspath(find_csv_folder(target_dates[-1])), "advertiser.csv")
+    return write_to_progress_book(progress_book_path, advertiser_csv, extract_row_totals)
+
+def run_macro_stage(progress_book_path):
+    """マクロ fam8progress_calling だけを実行する（openpyxlで転記した後の別ステージ用）"""
+    logger.info(f"マクロ実行ステージを開始します: {progress_book_path}")
+   
+    book_path, remote_state = progress_book_path, None
+    workbook = XlwingsWorkbook()
+    try:
+        if CONFIG["CACHE"]["enabled"]:
+            book_path, remote_state = book_cache.checkout(progress_book_path, before_refresh=release_cached_book)
+       
+        # 常駐ワーカーが同じブックを開いたままにしている場合は閉じさせ、ワーカーのExcelは終了しない
+        release_cached_book(book_path)
+        if not CONFIG["WORKER"]["enabled"]:
+            kill_excel_processes()
+       
+        workbook.open(book_path)
+        workbook.run_macro('fam8progress_calling')
+        workbook.save()
+        workbook.close()
+        logger.info("マクロを実行して進捗ブックを保存しました")
+       
+        if remote_state is not None:
+            book_cache.checkin(book_path, progress_book_path, remote_state)
+        return True
+    except Exception as e:
+        logger.error(f"マクロ実行ステージでエラーが発生しました: {str(e)}")
+        import traceback
+        logger.error(traceback.format_exc())
+        return False
+    finally:
+        try:
+            workbook.close()
+        except:
+            pass
+        if not CONFIG["WORKER"]["enabled"]:
+            kill_excel_processes()
 
 def process_date(target_date):
     """単一日付の処理"""
@@ -414,6 +927,54 @@ def process_date(target_date):
         logger.error(traceback.format_exc())
         return 1
 
+def process_date_range(target_dates):
+    """複数日付の一括処理（進捗ブックごとに1回だけ開いて転記・マクロ実行・保存）"""
+    logger.info(f"==== {target_dates[0]}〜{target_dates[-1]} の一括転記処理開始（{len(target_dates)}日分） ====")
+   
+    # CSVが揃っている日付だけを対象にする
+    ready_dates = []
+    for target_date in target_dates:
+        csv_dir = os.path.abspath(find_csv_folder(target_date))
+        missing = [name for name in ("advertiser.csv", "general_campane.csv", "adult_campane.csv")
+                   if not os.path.exists(os.path.join(csv_dir, name))]
+        if missing:
+            logger.warning(f"{target_date}: 必要なCSVファイルが見つからないためスキップします: {', '.join(missing)}")
+            continue
+        ready_dates.append(target_date)
+   
+    if not ready_dates:
+        logger.error("転記できる日付がありません")
+        return 1
+   
+    # 月ごと（進捗ブックごと）にまとめる
+    groups = {}
+    for target_date in ready_dates:
+        groups.setdefault(target_date[:6], []).append(target_date)
+   
+    failed = len(target_dates) - len(ready_dates)
+    for month, dates in groups.items():
+        try:
+            progress_book_path = find_progress_book_for_date(dates[0])
+            logger.info(f"使用する進捗ブック: {progress_book_path}（{len(dates)}日分）")
+           
+            if transfer_dates_to_excel(dates, progress_book_path):
+                logger.info(f"{dates[0]}〜{dates[-1]} の転記が完了しました")
+            else:
+                logger.error(f"{dates[0]}〜{dates[-1]} の転記が失敗しました")
+                failed += len(dates)
+        except Exception as e:
+            logger.error(f"{month}の転記中にエラーが発生しました: {str(e)}")
+            import traceback
+            logger.error(traceback.format_exc())
+            failed += len(dates)
+   
+    if failed:
+        logger.error(f"==== 一括転記処理: {len(target_dates)}日中 {failed}日が失敗またはスキップされました ====")
+        return 1
+   
+    logger.info(f"==== 一括転記処理が完了しました（{len(target_dates)}日分） ====")
+    return 0
+
 if __name__ == "__main__":
     setup_logger()
     logger.info("Excel転記処理を開始します")
@@ -425,11 +986,36 @@ if __name__ == "__main__":
         else:
             date_str = "default"
        
-        target_date = parse_date(date_str)
-        logger.info(f"処理対象日: {target_date}")
+        # 範囲指定（YYYYMMDD-YYYYMMDD）の場合は一括転記
+        if "-" in date_str:
+            target_dates = parse_date_range(date_str)
+            logger.info(f"処理対象期間: {target_dates[0]}〜{target_dates[-1]}")
+        else:
+            target_dates = None
+            target_date = parse_date(date_str)
+            logger.info(f"処理対象日: {target_date}")
+       
+        # ブック操作バックエンド / マクロ単独実行の指定（第2引数）
+        if len(sys.argv) > 2:
+            option = sys.argv[2].lower()
+            if option in WORKBOOK_BACKENDS:
+                CONFIG["EXCEL"]["backend"] = option
+                logger.info(f"ブック操作バックエンドを設定: {option}")
+            elif option == "worker":
+                # 常駐Excelワーカー経由で転記
+                CONFIG["WORKER"]["enabled"] = True
+                logger.info("常駐Excelワーカーを使用します")
+            elif option == "macro":
+                # openpyxlで転記済みのブックに対してマクロだけを実行
+                sys.exit(0 if run_macro_stage(find_progress_book_path()) else 1)
+            else:
+                logger.warning(f"無効なオプション指定: {sys.argv[2]}")
        
         # 処理実行
-        result = process_date(target_date)
+        if target_dates:
+            result = process_date_range(target_dates)
+        else:
+            result = process_date(target_date)
        
         # 終了コード
         sys.exit(result)
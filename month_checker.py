@@ -103,8 +103,8 @@ def find_latest_progress_book():
     logger.info(f"最新の進捗ブックを検出: {latest_book}")
     return latest_book
 
-def check_progress_book(target_date):
-    """月替わりチェック処理のメイン関数"""
+def prepare_progress_book(target_date):
+    """月替わりチェックを行い、転記先の進捗ブックのパスを返す（見つからない場合はNone）"""
     # 対象日をdatetimeオブジェクトに変換
     date_obj = datetime.strptime(target_date, "%Y%m%d")
     
@@ -195,19 +195,26 @@ def check_progress_book(target_date):
             logger.error(f"進捗ブックが一つも見つかりません")
             # ブックが見つからなくても処理は続行
             logger.warning("進捗ブックが見つかりませんが、後続の処理は続行されます")
-            return 0  # エラーではなく正常終了を返す
+            return None
     
     # 最終確認
     if return_path and os.path.exists(return_path):
         # ファイルサイズ確認
         size = os.path.getsize(return_path)
         logger.info(f"返却ファイルサイズ: {size} バイト")
-        
-        print(return_path)
-        return 0
+        return return_path
     else:
         logger.warning(f"返却するブックが見つかりませんが、処理は続行します")
-        return 0  # エラーではなく正常終了を返す
+        return None
+
+def check_progress_book(target_date):
+    """月替わりチェック処理のメイン関数（進捗ブックのパスを標準出力に出力）"""
+    return_path = prepare_progress_book(target_date)
+    if return_path:
+        print(return_path)
+    
+    # ブックが見つからなくてもエラーではなく正常終了を返す
+    return 0
 
 if __name__ == "__main__":
     setup_logger()
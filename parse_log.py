@@ -7,31 +7,102 @@
   python parse_log.py 20250512           # 指定日のログを表示
   python parse_log.py 20250512 --level ERROR # エラーログのみ表示
   python parse_log.py 20250512 --function login # 特定関数のログ表示
+  python parse_log.py 20250501-20250531 --level ERROR # 期間内のエラーログを時刻順に表示
+  python parse_log.py --last 7d --function login # 直近7日分（本日を含む）のログ表示
+  python parse_log.py 20250512 --since 10:00 --until 10:30 # 時間帯で絞り込み
+  python parse_log.py --follow --level ERROR # 本日のログを追跡して表示（実行中の確認用）
+  python parse_log.py --benchmark        # ログ解析処理の速度比較（全ログファイル）
 """
 import os
 import sys
 import re
+import csv
+import glob
+import time
+import heapq
+import sqlite3
 import argparse
-from datetime import datetime
+from datetime import datetime, timedelta
+from operator import itemgetter
 from rich.console import Console
+from rich.live import Live
 from rich.table import Table
 from rich.text import Text
 
+# --follow の追記通知（Linuxのみ・任意。requirements.txt ではLinuxに限ってインストール。なければ一定間隔で確認）
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
 # 設定
 CONFIG = {
-    "log_dir": "log"
+    "log_dir": "log",
+    # --benchmark の繰り返し回数
+    "benchmark_repeat": 5,
+    # ログファイルごとの索引（<ログファイル名>.idx）でレベル・関数・モジュール・時間帯を絞り込む
+    "use_index": True,
+    # --follow で追記を確認する間隔（秒、inotifyが使える場合は通知を待つ上限）
+    "follow_interval": 0.5
 }
 
+# 各モジュールの setup_logger が出力する形式
+# "YYYY-MM-DD HH:mm:ss | LEVEL    | module:function:line - message"
+LOG_LINE_PATTERN = re.compile(
+    r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) \| (\w+) +\| ([^:]+):([^:]+):(\d+) - (.+)$'
+)
+
+# --since/--until の入力形式 → (桁数を固定した照合パターン, 入力形式, 比較用の形式, タイムスタンプの比較開始位置, 省略部分の補完（since, until）)
+# strptime は数字の桁数を前から詰めて解釈するため（202505121030 → 10:03:00 等）、先にパターンで形式を決める
+TIME_BOUND_FORMATS = [
+    (re.compile(r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}'), "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M:%S", 0, ("", "")),
+    (re.compile(r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}'), "%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M", 0, (":00", ":59")),
+    (re.compile(r'\d{14}'), "%Y%m%d%H%M%S", "%Y-%m-%d %H:%M:%S", 0, ("", "")),
+    (re.compile(r'\d{12}'), "%Y%m%d%H%M", "%Y-%m-%d %H:%M", 0, (":00", ":59")),
+    (re.compile(r'\d{8}'), "%Y%m%d", "%Y-%m-%d", 0, (" 00:00:00", " 23:59:59")),
+    (re.compile(r'\d{2}:\d{2}:\d{2}'), "%H:%M:%S", "%H:%M:%S", 11, ("", "")),
+    (re.compile(r'\d{2}:\d{2}'), "%H:%M", "%H:%M", 11, (":00", ":59"))
+]
+
+# ログ索引（ログファイルは追記のみのため、前回の索引位置から続きを登録する）
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS index_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    indexed_offset INTEGER NOT NULL,
+    head BLOB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS entries (
+    byte_offset INTEGER PRIMARY KEY,
+    byte_length INTEGER NOT NULL,
+    timestamp TEXT NOT NULL,
+    level TEXT NOT NULL,
+    module TEXT NOT NULL,
+    function TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_timestamp ON entries (timestamp);
+CREATE INDEX IF NOT EXISTS idx_entries_level ON entries (level);
+"""
+
+# 索引作成時に記録するログファイル先頭のバイト数（ファイルが作り直されたかの判定用）
+INDEX_HEAD_BYTES = 64
+
 def parse_arguments():
     """コマンドライン引数解析"""
     parser = argparse.ArgumentParser(description="fam8 ログ解析ツール")
-    parser.add_argument("date", nargs="?", default=None, help="対象日付（例: 20250512）")
+    parser.add_argument("date", nargs="?", default=None, help="対象日付または期間（例: 20250512, 20250501-20250531）")
+    parser.add_argument("--last", help="本日から遡る日数（例: 7d）")
     parser.add_argument("--level", "-l", help="ログレベルでフィルタ（例: ERROR, INFO）")
     parser.add_argument("--function", "-f", help="関数名でフィルタ")
     parser.add_argument("--module", "-m", help="モジュール名でフィルタ")
     parser.add_argument("--text", "-t", help="テキスト内容でフィルタ")
+    parser.add_argument("--since", help="この時刻以降のログに絞り込む（例: 10:00, \"2025-05-12 10:00\", 20250512）")
+    parser.add_argument("--until", help="この時刻以前のログに絞り込む（例: 10:30, \"2025-05-12 10:30\", 20250512）")
+    parser.add_argument("--no-index", action="store_true", help="ログ索引を使わずに全行を解析")
+    parser.add_argument("--follow", action="store_true", help="本日のログの追記を追跡して表示（Ctrl+Cで終了）")
     
     parser.add_argument("--export", action="store_true", help="TSV形式でlog_export.tsvに出力")  # ←この行を追加
+    parser.add_argument("--benchmark", action="store_true", help="新旧のログ行解析の速度を比較（日付省略時は全ログファイル）")
     return parser.parse_args()
 
 
@@ -48,8 +119,91 @@ def get_log_file(date_str=None):
     
     return log_file
 
+def parse_date_arg(date_arg):
+    """日付指定（YYYYMMDD または YYYYMMDD-YYYYMMDD）を日付リストに変換"""
+    start_str, _, end_str = date_arg.partition('-')
+    try:
+        start = datetime.strptime(start_str, '%Y%m%d')
+        end = datetime.strptime(end_str or start_str, '%Y%m%d')
+    except ValueError:
+        raise ValueError(f"日付の形式が正しくありません（YYYYMMDD または YYYYMMDD-YYYYMMDD）: {date_arg}")
+
+    if start > end:
+        raise ValueError(f"期間の開始日が終了日より後になっています: {date_arg}")
+
+    return [(start + timedelta(days=offset)).strftime('%Y%m%d') for offset in range((end - start).days + 1)]
+
+def parse_last_arg(last_arg):
+    """--last の指定（例: 7d）を本日までの日付リストに変換"""
+    match = re.fullmatch(r'(\d+)d?', last_arg.strip().lower())
+    if not match or int(match.group(1)) < 1:
+        raise ValueError(f"--last は日数で指定してください（例: 7d）: {last_arg}")
+
+    today = datetime.now()
+    days = int(match.group(1))
+    return [(today - timedelta(days=offset)).strftime('%Y%m%d') for offset in range(days - 1, -1, -1)]
+
+def resolve_log_files(args):
+    """対象のログファイルを日付順に返す（期間指定では存在する日だけ）"""
+    if args.last:
+        dates = parse_last_arg(args.last)
+    elif args.date:
+        dates = parse_date_arg(args.date)
+    else:
+        dates = [datetime.now().strftime('%Y%m%d')]
+
+    if len(dates) == 1:
+        log_file = get_log_file(dates[0])
+        return [log_file] if log_file else []
+
+    log_files = [os.path.join(CONFIG["log_dir"], f"{date_str}.log") for date_str in dates]
+    existing = [log_file for log_file in log_files if os.path.exists(log_file)]
+
+    if not existing:
+        print(f"指定期間のログファイルが見つかりません: {dates[0]}～{dates[-1]}")
+    elif len(existing) < len(log_files):
+        print(f"[INFO] ログファイルのない日を除外しました（{len(existing)}/{len(log_files)}日分を解析）")
+    return existing
+
+def parse_time_bound(value, is_until=False):
+    """--since/--until の指定を (比較開始位置, 比較値) に変換
+
+    日時はタイムスタンプ全体と、時刻のみの場合は各日の時刻部分と比較する。
+    """
+    value = value.strip()
+    for pattern, input_format, output_format, start, (since_fill, until_fill) in TIME_BOUND_FORMATS:
+        if not pattern.fullmatch(value):
+            continue
+        try:
+            parsed = datetime.strptime(value, input_format)
+        except ValueError:
+            break
+        return start, parsed.strftime(output_format) + (until_fill if is_until else since_fill)
+    raise ValueError(f"時刻の形式が正しくありません（例: 10:00, \"2025-05-12 10:00\", 20250512）: {value}")
+
 def parse_log_line(line):
-    """ログ行を解析して構造化"""
+    """ログ行を解析して構造化（1つのコンパイル済みパターンで照合）"""
+    # トレースバック等の継続行は先頭がタイムスタンプでないため照合せずに除外
+    if not line[:1].isdigit():
+        return None
+
+    match = LOG_LINE_PATTERN.match(line)
+    if not match:
+        # 形式の崩れた行は従来の解析にまかせる
+        return parse_log_line_legacy(line)
+
+    timestamp, level, module, function, line_num, message = match.groups()
+    return {
+        'timestamp': timestamp,
+        'level': level,
+        'module': module.strip(),
+        'function': function.strip(),
+        'line': line_num,
+        'message': message.strip()
+    }
+
+def parse_log_line_legacy(line):
+    """ログ行を解析して構造化（従来の項目ごとの検索。--benchmark の比較用）"""
     # ログフォーマット: "<green>YYYY-MM-DD HH:mm:ss</green> | <level>LEVEL</level> | <cyan>module</cyan>:<cyan>function</cyan>:<cyan>line</cyan> - <level>message</level>"
     
     # まずタイムスタンプ部分を抽出
@@ -89,23 +243,106 @@ def parse_log_line(line):
         'message': message
     }
 
-def filter_logs(log_entries, args):
-    """条件に基づいてログをフィルタ"""
-    filtered = log_entries
-    
+def benchmark_parsers(log_files, repeat=None):
+    """新旧のログ行解析の処理時間を比較（結果が一致するかも確認）"""
+    repeat = repeat or CONFIG["benchmark_repeat"]
+
+    lines = []
+    for log_file in log_files:
+        with open(log_file, 'r', encoding='utf-8') as f:
+            lines.extend(line.strip() for line in f)
+
+    print(f"対象: {len(log_files)}ファイル / {len(lines):,}行（{repeat}回繰り返し）")
+
+    results = {}
+    for name, parser in (("従来（項目ごとの検索）", parse_log_line_legacy), ("新方式（コンパイル済みパターン）", parse_log_line)):
+        best = None
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            entries = [parser(line) for line in lines]
+            elapsed = time.perf_counter() - start_time
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = (best, entries)
+        print(f"{name}: {best:.3f}秒（{len(lines) / best:,.0f}行/秒）")
+
+    (legacy_time, legacy_entries), (new_time, new_entries) = results.values()
+    # 継続行は新方式では照合せずに除外するため、ログ行として解析できた行だけを比較
+    # （従来方式はモジュール名の前にレベル欄が残るため、最後の「|」以降で比較）
+    mismatched = 0
+    for old, new in zip(legacy_entries, new_entries):
+        if new is None:
+            continue
+        old = dict(old, module=old['module'].rsplit('|', 1)[-1].strip())
+        if old != new:
+            mismatched += 1
+    print(f"速度比: {legacy_time / new_time:.1f}倍 / 解析結果の不一致: {mismatched}行")
+    return 0 if mismatched == 0 else 1
+
+def iter_log_entries(log_file):
+    """ログファイルを1行ずつ解析してエントリを返す（ファイル全体は保持しない）"""
+    with open(log_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            entry = parse_log_line(line.strip())
+            if entry:
+                yield entry
+
+def build_filter(args):
+    """フィルタ条件を1つの判定関数にまとめる（条件がなければNone）"""
+    checks = []
+
     if args.level:
-        filtered = [entry for entry in filtered if entry['level'] == args.level]
-    
-    if args.function:
-        filtered = [entry for entry in filtered if args.function.lower() in entry['function'].lower()]
-    
-    if args.module:
-        filtered = [entry for entry in filtered if args.module.lower() in entry['module'].lower()]
-    
-    if args.text:
-        filtered = [entry for entry in filtered if args.text.lower() in entry['message'].lower()]
-    
-    return filtered
+        level = args.level
+        checks.append(lambda entry: entry['level'] == level)
+
+    # 部分一致の検索語は最初に1回だけ小文字化する
+    for field, needle in (('function', args.function), ('module', args.module), ('message', args.text)):
+        if needle:
+            checks.append(lambda entry, field=field, needle=needle.lower(): needle in entry[field].lower())
+
+    if args.since:
+        start, since = parse_time_bound(args.since)
+        checks.append(lambda entry: entry['timestamp'][start:] >= since)
+
+    if args.until:
+        end_start, until = parse_time_bound(args.until, is_until=True)
+        checks.append(lambda entry: entry['timestamp'][end_start:] <= until)
+
+    if not checks:
+        return None
+    if len(checks) == 1:
+        return checks[0]
+
+    def predicate(entry):
+        for check in checks:
+            if not check(entry):
+                return False
+        return True
+
+    return predicate
+
+def filter_logs(log_entries, args):
+    """条件に基づいてログをフィルタ（逐次処理）"""
+    predicate = build_filter(args)
+    if predicate is None:
+        return iter(log_entries)
+    return filter(predicate, log_entries)
+
+def add_log_columns(table):
+    """ログ表示の列を設定"""
+    table.add_column("時刻", style="green")
+    table.add_column("レベル", width=10)
+    table.add_column("モジュール:関数", width=30)
+    table.add_column("メッセージ", width=80)
+
+def format_log_row(entry):
+    """ログ1件を表の1行分のセルに変換"""
+    # レベルに応じたスタイル
+    level_style = "red bold" if entry['level'] == "ERROR" else "yellow" if entry['level'] == "WARNING" else "blue"
+
+    # 場所情報
+    location = f"{entry['module']}:{entry['function']}"
+
+    return (entry['timestamp'], Text(entry['level'], style=level_style), location, entry['message'])
 
 def display_logs_table(log_entries):
     """ログを表形式で表示"""
@@ -113,67 +350,369 @@ def display_logs_table(log_entries):
     
     # 表の設定
     table = Table(show_header=True, header_style="bold")
-    table.add_column("時刻", style="green")
-    table.add_column("レベル", width=10)
-    table.add_column("モジュール:関数", width=30)
-    table.add_column("メッセージ", width=80)
+    add_log_columns(table)
     
     # ログ行を表に追加
     for entry in log_entries:
-        # レベルに応じたスタイル
-        level_style = "red bold" if entry['level'] == "ERROR" else "yellow" if entry['level'] == "WARNING" else "blue"
-        
-        # 場所情報
-        location = f"{entry['module']}:{entry['function']}"
-        
-        # テーブル行の追加
-        table.add_row(
-            entry['timestamp'],
-            Text(entry['level'], style=level_style),
-            location,
-            entry['message']
-        )
+        table.add_row(*format_log_row(entry))
     
     # 表を出力
     console.print(table)
 
+def get_index_path(log_file):
+    """ログ索引のパス"""
+    return log_file + ".idx"
+
+def open_log_index(log_file):
+    """ログ索引に接続（壊れている場合は作り直す）"""
+    index_path = get_index_path(log_file)
+    conn = sqlite3.connect(index_path)
+    try:
+        conn.executescript(INDEX_SCHEMA)
+    except sqlite3.DatabaseError:
+        conn.close()
+        os.remove(index_path)
+        conn = sqlite3.connect(index_path)
+        conn.executescript(INDEX_SCHEMA)
+    return conn
+
+def update_log_index(conn, log_file):
+    """前回の索引位置から追記分を索引に登録し、登録した行数を返す
+
+    書き込み途中の最終行（改行なし）は次回に回す。ログファイルが作り直されていれば最初から作り直す。
+    """
+    state = conn.execute("SELECT indexed_offset, head FROM index_state WHERE id = 1").fetchone()
+    size = os.path.getsize(log_file)
+
+    with open(log_file, 'rb') as f:
+        head = f.read(INDEX_HEAD_BYTES)
+        offset = 0
+        if state is not None:
+            indexed_offset, indexed_head = state
+            if indexed_offset <= size and head[:len(indexed_head)] == indexed_head:
+                offset = indexed_offset
+            else:
+                conn.execute("DELETE FROM entries")
+        if state is not None and offset == size:
+            return 0
+
+        rows = []
+        f.seek(offset)
+        for raw in f:
+            if not raw.endswith(b'\n'):
+                break
+            entry = parse_log_line(raw.decode('utf-8', errors='replace').strip())
+            if entry:
+                rows.append((offset, len(raw), entry['timestamp'], entry['level'], entry['module'], entry['function']))
+            offset += len(raw)
+
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)", rows)
+        conn.execute("INSERT OR REPLACE INTO index_state VALUES (1, ?, ?)", (offset, head))
+    return len(rows)
+
+def has_index_filters(args):
+    """索引で絞り込める条件があるか（メッセージは索引に含めないため対象外）"""
+    return any((args.level, args.function, args.module, args.since, args.until))
+
+def lookup_log_index(log_file, args):
+    """索引を更新し、条件に合う行の (オフセット, 長さ) をファイル順に返す"""
+    conditions = []
+    params = []
+
+    if args.level:
+        conditions.append("level = ?")
+        params.append(args.level)
+
+    for column, needle in (("function", args.function), ("module", args.module)):
+        if needle:
+            conditions.append(f"instr(lower({column}), ?) > 0")
+            params.append(needle.lower())
+
+    for bound, operator, is_until in ((args.since, ">=", False), (args.until, "<=", True)):
+        if bound:
+            start, value = parse_time_bound(bound, is_until)
+            column = "timestamp" if start == 0 else f"substr(timestamp, {start + 1})"
+            conditions.append(f"{column} {operator} ?")
+            params.append(value)
+
+    sql = "SELECT byte_offset, byte_length FROM entries"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY byte_offset"
+
+    conn = open_log_index(log_file)
+    try:
+        update_log_index(conn, log_file)
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+def read_indexed_entries(log_file, rows, args):
+    """索引で絞り込んだ行だけを読み出して解析（メッセージ等の残りの条件はここで判定）"""
+    predicate = build_filter(args)
+    with open(log_file, 'rb') as f:
+        for offset, length in rows:
+            f.seek(offset)
+            entry = parse_log_line(f.read(length).decode('utf-8', errors='replace').strip())
+            if entry and (predicate is None or predicate(entry)):
+                yield entry
+
+def iter_filtered_entries(log_file, args):
+    """1日分のログをフィルタして返す（索引で絞り込める条件があれば索引を使う）"""
+    if CONFIG["use_index"] and not args.no_index and has_index_filters(args):
+        try:
+            rows = lookup_log_index(log_file, args)
+        except (sqlite3.Error, OSError) as e:
+            print(f"[WARN] ログ索引を使えないため全行を解析します: {log_file}（{e}）")
+        else:
+            return read_indexed_entries(log_file, rows, args)
+
+    return filter_logs(iter_log_entries(log_file), args)
+
+def is_time_ordered(log_file):
+    """ログファイルの各行の時刻が書き込み順に並んでいるか（行頭の時刻だけを比較し、行全体は解析しない）"""
+    previous = b""
+    with open(log_file, 'rb') as f:
+        for line in f:
+            # 例外のトレースバック等の継続行は時刻で始まらない
+            if line[4:5] != b"-" or line[7:8] != b"-":
+                continue
+            timestamp = line[:19]
+            if timestamp < previous:
+                return False
+            previous = timestamp
+    return True
+
+def iter_time_ordered_entries(log_file, args):
+    """1日分のログを時刻順に返す（書き込み順が時刻順ならそのまま1行ずつ、そうでなければそのファイルだけ並べ替える）"""
+    entries = iter_filtered_entries(log_file, args)
+    if is_time_ordered(log_file):
+        return entries
+
+    # 複数プロセスが同じファイルに書き込むと、キュー経由の書き込みで時刻が前後することがある
+    print(f"[WARN] 時刻順に並んでいない行があるため、このファイルのログを並べ替えてからマージします: {log_file}")
+    return iter(sorted(entries, key=itemgetter('timestamp')))
+
+def iter_merged_entries(log_files, args):
+    """複数日のログを時刻順にマージして返す
+
+    各ファイルは書き込み順（ほぼ時刻順）のため、連結して並べ替えずにk-wayマージする。
+    日付をまたいで実行したプロセスのログは起動日のファイルに書かれるため、ファイル間で時刻が重なることがある。
+    時刻が前後している行を含むファイルだけを並べ替える（メモリに載るのはそのファイルの分だけ）。
+    """
+    if len(log_files) == 1:
+        yield from iter_filtered_entries(log_files[0], args)
+        return
+
+    yield from heapq.merge(*[iter_time_ordered_entries(log_file, args) for log_file in log_files],
+                           key=itemgetter('timestamp'))
+
+def stream_to_tsv(log_entries, f):
+    """ログをTSVに1行ずつ書き出しながら、エントリをそのまま次に渡す"""
+    writer = csv.writer(f, delimiter="\t")
+    writer.writerow(["時刻", "レベル", "モジュール:関数", "メッセージ"])
+    for entry in log_entries:
+        location = f"{entry['module']}:{entry['function']}"
+        writer.writerow([entry["timestamp"], entry["level"], location, entry["message"]])
+        yield entry
+
 def export_to_tsv(log_entries, filepath="log_export.tsv"):
     """ログをTSV形式でエクスポート（Excel対応）"""
-    import csv
     with open(filepath, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f, delimiter="\t")
-        writer.writerow(["時刻", "レベル", "モジュール:関数", "メッセージ"])
-        for entry in log_entries:
-            location = f"{entry['module']}:{entry['function']}"
-            writer.writerow([entry["timestamp"], entry["level"], location, entry["message"]])
+        for _ in stream_to_tsv(log_entries, f):
+            pass
+
+class LogFollower:
+    """本日のログファイルの追記分を読み取る
+
+    日付が変わったら翌日のファイルも追跡する。各プロセスは起動日のログファイルに書き続けるため、
+    前日のファイルは翌日のファイルができた後も1日分は追跡を続ける。
+    """
+
+    def __init__(self):
+        self.log_dir = CONFIG["log_dir"]
+        # パス → [ファイル, 改行までそろっていない末尾]
+        self.files = {}
+        self.inotify = None
+
+        if INotify is not None:
+            try:
+                self.inotify = INotify()
+                self.inotify.add_watch(self.log_dir, flags.MODIFY | flags.CREATE | flags.MOVED_TO)
+            except OSError:
+                self.inotify = None
+
+        # 起動時点のファイルは末尾から追跡する
+        self.attach(self.today_path(), from_end=True)
+
+    def today_path(self):
+        """本日のログファイルのパス"""
+        return os.path.join(self.log_dir, f"{datetime.now().strftime('%Y%m%d')}.log")
+
+    def attach(self, path, from_end=False):
+        """ログファイルの追跡を開始（まだ作られていなければ何もしない）"""
+        if path in self.files or not os.path.exists(path):
+            return
+        f = open(path, 'rb')
+        if from_end:
+            f.seek(0, os.SEEK_END)
+        self.files[path] = [f, b'']
+
+    def check_rollover(self):
+        """本日のファイルができていれば追跡を始め、前日より古いファイルの追跡をやめる"""
+        today_path = self.today_path()
+        if today_path in self.files:
+            return
+
+        self.attach(today_path)
+        if today_path not in self.files:
+            return
+
+        yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y%m%d')
+        for path in list(self.files):
+            if os.path.basename(path)[:8] < yesterday:
+                self.files.pop(path)[0].close()
+
+    def read_lines(self):
+        """前回から追記された行を返す（書き込み途中の行は次回に回す）"""
+        self.check_rollover()
+
+        for path, state in list(self.files.items()):
+            f = state[0]
+            if os.path.getsize(path) < f.tell():
+                # ファイルが作り直された
+                f.seek(0)
+                state[1] = b''
+
+            data = f.read()
+            if not data:
+                continue
+
+            *lines, state[1] = (state[1] + data).split(b'\n')
+            for raw in lines:
+                yield raw.decode('utf-8', errors='replace')
+
+    def is_followed_name(self, name):
+        """通知されたファイル名が追跡中または本日のログファイルか（同じフォルダの索引 *.log.idx 等の更新は無視する）"""
+        return name == os.path.basename(self.today_path()) or any(os.path.basename(path) == name for path in self.files)
+
+    def wait(self):
+        """次の追記まで待つ（inotifyが使えなければ一定間隔で確認）"""
+        if self.inotify is None:
+            time.sleep(CONFIG["follow_interval"])
+            return
+
+        deadline = time.time() + CONFIG["follow_interval"]
+        while True:
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                return
+            events = self.inotify.read(timeout=max(1, int(timeout * 1000)))
+            if any(self.is_followed_name(event.name) for event in events):
+                return
+
+    def close(self):
+        """追跡中のファイルを閉じる"""
+        for f, _ in self.files.values():
+            f.close()
+        self.files = {}
+        if self.inotify is not None:
+            self.inotify.close()
+
+class FollowStatus:
+    """--follow の画面下部に表示する追跡状況"""
+
+    def __init__(self, follower):
+        self.follower = follower
+        self.matched = 0
+
+    def __rich__(self):
+        names = ", ".join(os.path.basename(path) for path in self.follower.files) or "ログファイルの作成待ち"
+        watch = "inotify" if self.follower.inotify is not None else f"{CONFIG['follow_interval']}秒ごとに確認"
+        return Text(f"追跡中: {names}（{watch}） / 表示 {self.matched}件 / {datetime.now().strftime('%H:%M:%S')} / Ctrl+Cで終了", style="dim")
+
+def follow_log_entries(follower, args):
+    """追記されたログを解析・フィルタして返し続ける"""
+    predicate = build_filter(args)
+    while True:
+        for line in follower.read_lines():
+            entry = parse_log_line(line.strip())
+            if entry and (predicate is None or predicate(entry)):
+                yield entry
+        follower.wait()
+
+def follow_logs(args):
+    """本日のログを追跡して表示（一致した行だけを追記表示し、表全体は描き直さない）"""
+    if args.date or args.last:
+        print("[WARN] --follow では本日のログを追跡します（日付・期間の指定は無視します）")
+
+    follower = LogFollower()
+    status = FollowStatus(follower)
+    console = Console()
+    export_file = open("log_export.tsv", "w", newline="", encoding="utf-8") if args.export else None
+
+    try:
+        with Live(status, console=console, refresh_per_second=2, transient=True) as live:
+            entries = follow_log_entries(follower, args)
+            if export_file:
+                entries = stream_to_tsv(entries, export_file)
+
+            for entry in entries:
+                row = Table(show_header=False, show_edge=False, box=None)
+                add_log_columns(row)
+                row.add_row(*format_log_row(entry))
+                live.console.print(row)
+                status.matched += 1
+                if export_file:
+                    export_file.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        follower.close()
+        if export_file:
+            export_file.close()
+
+    print(f"[INFO] ログの追跡を終了しました（表示 {status.matched}件）")
+    if export_file:
+        print("[INFO] ログを 'log_export.tsv' にエクスポートしました。")
+    return 0
 
 
 def main():
     """メイン関数"""
     args = parse_arguments()
-    
-    log_file = get_log_file(args.date)
-    if not log_file:
+
+    try:
+        build_filter(args)  # --since/--until の形式を確認
+        if args.follow:
+            return follow_logs(args)
+        if args.benchmark and not (args.date or args.last):
+            log_files = sorted(glob.glob(os.path.join(CONFIG["log_dir"], "*.log")))
+        else:
+            log_files = resolve_log_files(args)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
         return 1
+
+    if not log_files:
+        if args.benchmark:
+            print("解析対象のログファイルがありません")
+        return 1
+
+    if args.benchmark:
+        return benchmark_parsers(log_files)
     
-    # ログファイル読み込み
-    log_entries = []
-    with open(log_file, 'r', encoding='utf-8') as f:
-        for line in f:
-            entry = parse_log_line(line.strip())
-            if entry:
-                log_entries.append(entry)
-    
-    # フィルタリング
-    filtered_entries = filter_logs(log_entries, args)
-    
-    # 表示
-    display_logs_table(filtered_entries)
+    # 読み込み・フィルタ・出力を1行ずつ連結して処理（複数日は時刻順にマージ）
+    filtered_entries = iter_merged_entries(log_files, args)
 
-    # TSV出力（--exportオプションがあれば）
+    # 表示（--exportオプションがあれば表示と同時にTSVへ出力）
     if args.export:
-        export_to_tsv(filtered_entries)
+        with open("log_export.tsv", "w", newline="", encoding="utf-8") as f:
+            display_logs_table(stream_to_tsv(filtered_entries, f))
         print("[INFO] ログを 'log_export.tsv' にエクスポートしました。")
+    else:
+        display_logs_table(filtered_entries)
     
     return 0
 
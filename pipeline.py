@@ -0,0 +1,283 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+月替わりチェック・CSV取得・Excel転記を1つのプロセスで実行するパイプライン
+
+CSV取得（ブラウザ操作）の間に、月替わりチェックと確定済みキャンペーンCSVの集計値抽出を並行して行う。
+使用例:
+  python pipeline.py              # 昨日の日付で実行
+  python pipeline.py 20250519     # 指定日で実行
+"""
+import os
+import sys
+import time
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from loguru import logger
+
+import month_checker
+import browser_control
+import excel_writer
+import csv_store
+
+# 設定
+CONFIG = {
+    "log_dir": "log",
+    # 確定済みCSVの確認間隔（秒）
+    "poll_interval": 0.5,
+    # CSV取得後に日次CSVをSQLiteに蓄積する（Excel転記と並行）
+    "ingest": True
+}
+
+@dataclass
+class BookInfo:
+    """進捗ブック（月替わりチェックの対象月のブック、または転記先のブック）"""
+    target_date: str
+    path: Optional[str]
+
+@dataclass
+class CsvBundle:
+    """CSV取得の結果（1日分のCSVフォルダ）"""
+    target_date: str
+    csv_dir: str
+
+    @property
+    def advertiser_csv(self):
+        return os.path.join(self.csv_dir, "advertiser.csv")
+
+    @property
+    def general_campane_csv(self):
+        return os.path.join(self.csv_dir, "general_campane.csv")
+
+    @property
+    def adult_campane_csv(self):
+        return os.path.join(self.csv_dir, "adult_campane.csv")
+
+@dataclass
+class ExtractedTotals:
+    """キャンペーンCSVの[total]行から抽出したGROSS/NET"""
+    general: Tuple[int, int]
+    adult: Tuple[int, int]
+
+@dataclass
+class StageTimer:
+    """ステージごとの処理時間"""
+    started_at: float = field(default_factory=time.time)
+    stages: dict = field(default_factory=dict)
+
+    def record(self, name, start_time):
+        self.stages[name] = time.time() - start_time
+
+    def log_summary(self):
+        logger.info("---- ステージ別処理時間 ----")
+        for name, elapsed in self.stages.items():
+            logger.info(f"{name}: {elapsed:.2f}秒")
+        logger.info(f"全体: {time.time() - self.started_at:.2f}秒")
+
+# 各エントリポイントが単体実行時にログに書いているモジュール表記（parse_log の絞り込み・インデックスと揃える）
+LOG_LABELS = {
+    "browser_control": "browser",
+    "month_checker": "month_checker",
+    "excel_writer": "excel_writer",
+    "csv_store": "csv_store",
+}
+
+# ログ設定を持たず、単体実行時は呼び出し元のエントリポイントの表記で書かれるモジュール
+# （呼び出し元のステージが分からない場合の表記。ステージ内では logger.contextualize(stage=...) の表記を使う）
+HELPER_LOG_LABELS = {
+    "csv_encoding": "excel_writer",
+    "advertiser_csv": "excel_writer",
+    "book_cache": "excel_writer",
+    "excel_worker": "excel_writer",
+    "campaign_analytics": "csv_store",
+}
+
+def set_log_label(record):
+    """ログ出力元のモジュール名を、各モジュール単体実行時と同じ表記に揃える"""
+    module = record["module"]
+    if module in HELPER_LOG_LABELS:
+        record["extra"]["label"] = record["extra"].get("stage", HELPER_LOG_LABELS[module])
+    else:
+        record["extra"]["label"] = LOG_LABELS.get(module, module)
+
+def setup_logger():
+    """ログ設定（各モジュールのログをモジュール名付きで1つのログに出力）"""
+    log_dir = CONFIG["log_dir"]
+    os.makedirs(log_dir, exist_ok=True)
+
+    today = datetime.now().strftime('%Y%m%d')
+    log_file = os.path.join(log_dir, f"{today}.log")
+
+    logger.remove()
+    logger.configure(patcher=set_log_label)
+    format_string = "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{extra[label]}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
+
+    logger.add(log_file, format=format_string, level="INFO", encoding="utf-8", enqueue=True)
+    logger.add(sys.stderr, format=format_string, level="INFO", colorize=True)
+
+async def run_month_check(target_date, timer):
+    """月替わりチェック（ファイル操作のみのため別スレッドで実行）"""
+    start_time = time.time()
+    try:
+        with logger.contextualize(stage=LOG_LABELS["month_checker"]):
+            path = await asyncio.to_thread(month_checker.prepare_progress_book, target_date)
+    except Exception as e:
+        # 従来どおり月替わりチェックのエラーでは処理を止めない
+        logger.error(f"月替わりチェック中にエラーが発生しました: {str(e)}")
+        path = None
+    timer.record("月替わりチェック", start_time)
+    return BookInfo(target_date, path)
+
+async def run_download(target_date, timer):
+    """CSV取得（ブラウザ操作）"""
+    start_time = time.time()
+    csv_dir = await browser_control.fetch_csv_folder(target_date)
+    timer.record("CSV取得", start_time)
+    return CsvBundle(target_date, os.path.abspath(csv_dir))
+
+async def wait_for_committed_csv(path, download_task, started_at):
+    """CSVが確定する（.partから置き換えられる）まで待つ
+
+    以前の実行で保存済みのファイルは、CSV取得が終わるまで今回の結果とみなさない
+    """
+    while True:
+        if os.path.exists(path) and (os.path.getmtime(path) >= started_at or download_task.done()):
+            return path
+        if download_task.done():
+            raise FileNotFoundError(f"CSVが見つかりません: {path}")
+        await asyncio.sleep(CONFIG["poll_interval"])
+
+async def run_extraction(csv_dir, download_task, timer):
+    """確定したキャンペーンCSVから順に[total]行を抽出（CSV取得と並行）"""
+    started_at = time.time()
+
+    async def extract(file_name, campaign_type):
+        path = await wait_for_committed_csv(os.path.join(csv_dir, file_name), download_task, started_at)
+        start_time = time.time()
+        with logger.contextualize(stage=LOG_LABELS["excel_writer"]):
+            values = await asyncio.to_thread(excel_writer.extract_total_values, path, campaign_type)
+        timer.record(f"集計値抽出（{campaign_type}）", start_time)
+        return values
+
+    general, adult = await asyncio.gather(
+        extract("general_campane.csv", "一般"),
+        extract("adult_campane.csv", "アダルト")
+    )
+    return ExtractedTotals(general, adult)
+
+async def run_ingest(target_date, timer):
+    """日次CSVをSQLiteに蓄積（失敗しても転記は続行）"""
+    start_time = time.time()
+
+    def ingest():
+        conn = csv_store.connect()
+        try:
+            csv_store.ingest(conn, [target_date], force=True)
+        finally:
+            conn.close()
+
+    try:
+        with logger.contextualize(stage=LOG_LABELS["csv_store"]):
+            await asyncio.to_thread(ingest)
+    except Exception as e:
+        logger.warning(f"CSV蓄積処理でエラーが発生しました（転記は続行します）: {str(e)}")
+    timer.record("CSV蓄積", start_time)
+
+async def run_transfer(book, bundle, totals, timer):
+    """Excel転記（抽出済みの集計値を渡す）"""
+    start_time = time.time()
+    with logger.contextualize(stage=LOG_LABELS["excel_writer"]):
+        success = await asyncio.to_thread(
+            excel_writer.transfer_csv_to_excel,
+            bundle.advertiser_csv,
+            bundle.general_campane_csv,
+            bundle.adult_campane_csv,
+            book.path,
+            (totals.general, totals.adult)
+        )
+    timer.record("Excel転記", start_time)
+    return success
+
+async def run_pipeline(target_date):
+    """パイプライン本体"""
+    timer = StageTimer()
+    logger.info(f"==== {target_date} のパイプライン処理開始 ====")
+
+    csv_dir = os.path.abspath(os.path.join(browser_control.CONFIG["PATHS"]["csv_base_dir"], target_date))
+
+    # 月替わりチェック・CSV取得・集計値抽出を並行して開始
+    month_task = asyncio.create_task(run_month_check(target_date, timer))
+    download_task = asyncio.create_task(run_download(target_date, timer))
+    extract_task = asyncio.create_task(run_extraction(csv_dir, download_task, timer))
+
+    try:
+        bundle = await download_task
+    except Exception as e:
+        logger.error(f"CSV取得でエラーが発生しました: {str(e)}")
+        extract_task.cancel()
+        await asyncio.gather(month_task, extract_task, return_exceptions=True)
+        timer.log_summary()
+        return 1
+
+    # 転記先は従来の excel_writer.py と同じく最新の進捗ブック
+    # （月末日は月替わりチェックで作成された次月のブックになるため、月替わりチェックの完了後に探す）
+    checked = await month_task
+    try:
+        book = BookInfo(target_date, await asyncio.to_thread(excel_writer.find_progress_book_path))
+    except FileNotFoundError as e:
+        logger.error(f"進捗ブックが見つかりません: {str(e)}")
+        extract_task.cancel()
+        await asyncio.gather(extract_task, return_exceptions=True)
+        timer.log_summary()
+        return 1
+    if checked.path and os.path.normcase(os.path.abspath(checked.path)) != os.path.normcase(os.path.abspath(book.path)):
+        logger.info(f"対象月の進捗ブック（{checked.path}）ではなく、最新の進捗ブックに転記します")
+    logger.info(f"使用する進捗ブック: {book.path}")
+
+    try:
+        totals = await extract_task
+    except Exception as e:
+        logger.error(f"CSVからの値抽出に失敗: {str(e)}")
+        timer.log_summary()
+        return 1
+
+    # Excel転記とCSV蓄積を並行して実行
+    jobs = [run_transfer(book, bundle, totals, timer)]
+    if CONFIG["ingest"]:
+        jobs.append(run_ingest(target_date, timer))
+    success = (await asyncio.gather(*jobs))[0]
+
+    timer.log_summary()
+    if success:
+        logger.info(f"==== {target_date} のパイプライン処理が完了しました ====")
+        return 0
+
+    logger.error(f"==== {target_date} のExcel転記が失敗しました ====")
+    return 1
+
+def main():
+    """メイン関数"""
+    setup_logger()
+
+    try:
+        date_str = sys.argv[1] if len(sys.argv) > 1 else "default"
+        if date_str == "default":
+            target_date = (datetime.now() - timedelta(days=1)).strftime("%Y%m%d")
+        elif browser_control.validate_date_format(date_str):
+            target_date = date_str
+        else:
+            logger.error(f"無効な日付指定です（YYYYMMDD形式で指定してください）: {date_str}")
+            return 1
+
+        return asyncio.run(run_pipeline(target_date))
+
+    except Exception as e:
+        logger.error(f"パイプライン全体でエラーが発生しました: {str(e)}")
+        import traceback
+        logger.error(traceback.format_exc())
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,26 +10,10 @@ for /f %%a in ('powershell -command "(Get-Date).AddDays(-1).ToString('yyyyMMdd')
 echo gpt: %target_date%
 echo Jn܂...
 
-rem --- ւ`FbN ---
-python month_checker.py %target_date%
+rem --- ւ`FbNECSV擾EExcel]Li1vZXŎsj ---
+python pipeline.py %target_date%
 if %ERRORLEVEL% neq 0 (
-    echo ւ`FbNŃG[܂B
-    set "HAS_ERROR=1"
-    goto end
-)
-
-rem --- uEUECSV擾 ---
-python browser_control.py %target_date%
-if %ERRORLEVEL% neq 0 (
-    echo CSV擾ŃG[܂B
-    set "HAS_ERROR=1"
-    goto end
-)
-
-rem --- Excel]L ---
-python excel_writer.py %target_date%
-if %ERRORLEVEL% neq 0 (
-    echo Excel]LŃG[܂B
+    echo pCvCŃG[܂B
     set "HAS_ERROR=1"
     goto end
 )
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""advertiser_csv.py の広告主CSVの逐次解析（ヘッダー検出・列ずれ補正・改行コード・復号できない文字）のテスト"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import csv_encoding
+import advertiser_csv
+
+BREADCRUMB = "広告管理 ＞ キャンペーン ＞ 広告主"
+HEADER = '"ID","広告主名","代理店名","表示率","Imp","Click","CTR","CV","CVR","グロス","ネット"'
+
+
+def data_line(advertiser_id, agency="株式会社カラット"):
+    return f'"{advertiser_id}","広告主{advertiser_id}","{agency}","100%",1000,10,"1.0%",1,"10.0%",100.5,80.25'
+
+
+@pytest.fixture(autouse=True)
+def encoding_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(csv_encoding, "CACHE_FILE", str(tmp_path / "encoding_cache.json"))
+    monkeypatch.setattr(csv_encoding, "_cache", None)
+
+
+def write_csv(path, lines, newline="\r\n", encoding="cp932"):
+    path.write_bytes(newline.join(lines).encode(encoding) + newline.encode("ascii"))
+    return str(path)
+
+
+def read_all(path):
+    info = {}
+    return list(advertiser_csv.iter_advertiser_rows(path, info)), info
+
+
+def test_header_after_breadcrumb_is_skipped(tmp_path):
+    path = write_csv(tmp_path / "advertiser.csv", [BREADCRUMB, "", HEADER, data_line("1141"), data_line("125")])
+
+    rows, info = read_all(path)
+
+    assert [row.advertiser_id for row in rows] == ["1141", "125"]
+    assert rows[0].line_no == 4
+    assert rows[0].agency == "株式会社カラット"
+    assert rows[0].metrics == ("100%", "1000", "10", "1.0%", "1", "10.0%", "100.5", "80.25")
+    assert info["encoding"] == "cp932"
+    assert info["rows"] == 2
+
+
+def test_headerless_file_is_read_from_the_top(tmp_path):
+    lines = [data_line(str(index)) for index in range(1, 16)]
+    path = write_csv(tmp_path / "advertiser.csv", lines)
+
+    rows, info = read_all(path)
+
+    # 先頭10行にヘッダーがなくても、保留していた先頭の行から順に返す
+    assert [row.advertiser_id for row in rows] == [str(index) for index in range(1, 16)]
+    assert info["rows"] == 15
+
+
+def test_short_headerless_file(tmp_path):
+    path = write_csv(tmp_path / "advertiser.csv", [data_line("1"), "x,y", data_line("2")])
+
+    rows, info = read_all(path)
+
+    assert [row.advertiser_id for row in rows] == ["1", "2"]
+    assert info["skipped"] == 1
+
+
+def test_agency_column_shift():
+    # 代理店名が空で右隣の列にある場合
+    shifted = advertiser_csv.to_record(5, ["10", "広告主", "", "代理店B", "1000"])
+    assert shifted.agency == "代理店B"
+
+    # [total]行は3列目以降の値をつなげる
+    total = advertiser_csv.to_record(9, ["", "[total]", "", "", "97921884", "500880"])
+    assert total.agency == "97921884 500880"
+    assert total.metrics[:3] == (None, "97921884", "500880")
+
+
+@pytest.mark.parametrize("newline, expected", [
+    ("\r\n", "CRLF (Windows)"),
+    ("\n", "LF (Unix/Linux/新Mac)"),
+])
+def test_crlf_and_lf_give_the_same_rows(tmp_path, newline, expected):
+    path = write_csv(tmp_path / "advertiser.csv", [BREADCRUMB, HEADER, data_line("1141"), data_line("125")], newline=newline)
+
+    rows, info = read_all(path)
+
+    assert info["newline"] == expected
+    assert [row.advertiser_id for row in rows] == ["1141", "125"]
+    assert rows[-1].metrics[-1] == "80.25"
+
+
+def test_utf8_file(tmp_path):
+    path = write_csv(tmp_path / "advertiser.csv", [HEADER, data_line("1141")], encoding="utf-8")
+
+    rows, info = read_all(path)
+
+    assert info["encoding"] == "utf-8"
+    assert rows[0].agency == "株式会社カラット"
+
+
+def test_clean_file_caches_the_encoding(tmp_path):
+    path = write_csv(tmp_path / "advertiser.csv", [HEADER, data_line("1141")])
+
+    read_all(path)
+
+    assert csv_encoding.get_cached_encoding(path) == "cp932"
+
+
+def test_undecodable_bytes_after_the_sample_are_replaced(tmp_path):
+    # 先頭サンプルより後ろにcp932で復号できないバイト列を置く
+    count = advertiser_csv.SNIFF_SIZE // len(data_line("1000").encode("cp932")) + 10
+    lines = [HEADER] + [data_line(str(index)) for index in range(count)]
+    body = ("\r\n".join(lines) + "\r\n").encode("cp932")
+    bad_line = data_line("9999").encode("cp932").replace("株式会社カラット".encode("cp932"), b"\x82\xff")
+    path = tmp_path / "advertiser.csv"
+    path.write_bytes(body + bad_line + b"\r\n")
+
+    rows, info = read_all(str(path))
+
+    assert info["encoding"] == "cp932"
+    assert info["replaced"] == 1
+    assert len(rows) == count + 1
+    assert "\ufffd" in rows[-1].agency
+    # 置換が発生したファイルの判定結果はキャッシュしない
+    assert csv_encoding.get_cached_encoding(str(path)) is None
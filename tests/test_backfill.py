@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""browser_control.py のバックフィル（マニフェストによる再開・ブラウザの作り直し）のテスト"""
+import os
+import sys
+import asyncio
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import browser_control
+
+
+@pytest.fixture
+def csv_base(tmp_path, monkeypatch):
+    monkeypatch.setitem(browser_control.CONFIG["PATHS"], "csv_base_dir", str(tmp_path))
+    return tmp_path
+
+
+def write_csvs(csv_dir, content=b"a,b\r\n"):
+    csv_dir.mkdir(parents=True, exist_ok=True)
+    for name in browser_control.REQUIRED_CSV_FILES:
+        (csv_dir / name).write_bytes(content)
+
+
+def test_backfill_status_follows_manifest(csv_base):
+    manifest = browser_control.load_backfill_manifest()
+
+    assert browser_control.get_backfill_status(manifest, "20250501", str(csv_base / "20250501")) == "pending"
+
+    write_csvs(csv_base / "20250502")
+    assert browser_control.get_backfill_status(manifest, "20250502", str(csv_base / "20250502")) == "unrecorded"
+
+    browser_control.mark_date_completed(manifest, "20250502", str(csv_base / "20250502"))
+    manifest = browser_control.load_backfill_manifest()
+    assert browser_control.get_backfill_status(manifest, "20250502", str(csv_base / "20250502")) == "completed"
+
+    # 完了後にCSVが書き換わった・消えた場合は再取得
+    (csv_base / "20250502" / "advertiser.csv").write_bytes(b"partial")
+    assert browser_control.get_backfill_status(manifest, "20250502", str(csv_base / "20250502")) == "changed"
+
+    # 失敗として記録した日付はCSVが揃っていても再取得
+    write_csvs(csv_base / "20250503")
+    browser_control.mark_date_failed(manifest, "20250503", "timeout", 3)
+    manifest = browser_control.load_backfill_manifest()
+    assert browser_control.get_backfill_status(manifest, "20250503", str(csv_base / "20250503")) == "failed"
+    assert manifest["failed"]["20250503"]["attempts"] == 3
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.request = None
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+class FakePage:
+    def __init__(self, browser):
+        self.context = FakeContext(browser)
+
+    def is_closed(self):
+        return self.context.closed or not self.context.browser.connected
+
+
+class FakeSharedBrowser:
+    """起動のたびに新しいFakeBrowserを返す"""
+
+    def __init__(self):
+        self.browser = None
+        self.storage_state = {}
+        self.launches = 0
+
+    async def get(self):
+        if self.browser is None or not self.browser.is_connected():
+            self.browser = FakeBrowser()
+            self.launches += 1
+        return self.browser
+
+
+def test_worker_recreates_browser_after_crash(csv_base, monkeypatch):
+    pages = []
+    calls = {"count": 0}
+
+    async def new_report_page(browser, storage_state=None):
+        page = FakePage(browser)
+        pages.append(page)
+        return page.context, page
+
+    async def reset_report_form(page):
+        pass
+
+    async def try_direct_export(request_context, csv_dir, start_date, end_date):
+        return False
+
+    async def fetch_reports_sequentially(page, csv_dir, start_date, end_date):
+        calls["count"] += 1
+        if calls["count"] == 1:
+            # 1回目はブラウザが落ちる
+            page.context.browser.connected = False
+            raise browser_control.PlaywrightError("Target page, context or browser has been closed")
+        write_csvs(csv_base / start_date)
+
+    monkeypatch.setattr(browser_control, "new_report_page", new_report_page)
+    monkeypatch.setattr(browser_control, "reset_report_form", reset_report_form)
+    monkeypatch.setattr(browser_control, "try_direct_export", try_direct_export)
+    monkeypatch.setattr(browser_control, "fetch_reports_sequentially", fetch_reports_sequentially)
+
+    shared = FakeSharedBrowser()
+    manifest = browser_control.load_backfill_manifest()
+    results = {}
+
+    async def run():
+        queue = asyncio.Queue()
+        queue.put_nowait(("20250510", 0))
+        queue.put_nowait(("20250511", 0))
+        await browser_control.backfill_worker(1, shared, queue, manifest, results)
+
+    asyncio.run(run())
+
+    assert results["20250510"]["success"] and results["20250511"]["success"]
+    assert shared.launches == 2
+    # 落ちたブラウザのページは使い回さず、新しいブラウザでページを作り直す
+    assert len(pages) == 2 and pages[1].context.browser is shared.browser
+    assert set(browser_control.load_backfill_manifest()["completed"]) == {"20250510", "20250511"}
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""book_cache.py の作業コピー（取得の省略・取り直し・書き戻し時の競合検出）のテスト"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import book_cache
+import excel_writer
+
+
+@pytest.fixture
+def remote_book(tmp_path, monkeypatch):
+    monkeypatch.setitem(book_cache.CONFIG, "cache_dir", str(tmp_path / "book_cache"))
+    remote_dir = tmp_path / "remote"
+    remote_dir.mkdir()
+    path = remote_dir / "fam8進捗_202505.xlsm"
+    path.write_bytes(b"remote v1")
+    return str(path)
+
+
+def touch(path, seconds=10):
+    """更新時刻だけを進める（内容・サイズは変えない）"""
+    stat_result = os.stat(path)
+    os.utime(path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + seconds * 10**9))
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def checkout(remote_path):
+    """before_refresh の呼び出しを記録しながら作業コピーを取得する"""
+    refreshed = []
+    local_path, remote_state = book_cache.checkout(remote_path, before_refresh=refreshed.append)
+    return local_path, remote_state, refreshed
+
+
+def test_unchanged_remote_skips_copy(remote_book):
+    local_path, remote_state, refreshed = checkout(remote_book)
+    assert read(local_path) == b"remote v1"
+    assert refreshed == [local_path]
+
+    again, again_state, refreshed = checkout(remote_book)
+    assert again == local_path
+    assert again_state == remote_state
+    assert refreshed == []
+
+
+@pytest.mark.parametrize("change", ["mtime", "size"])
+def test_remote_update_refreshes_copy(remote_book, change):
+    local_path, _, _ = checkout(remote_book)
+
+    if change == "mtime":
+        touch(remote_book)
+    else:
+        with open(remote_book, "ab") as f:
+            f.write(b" + v2")
+
+    _, remote_state, refreshed = checkout(remote_book)
+
+    assert refreshed == [local_path]
+    assert remote_state == book_cache.file_state(remote_book)
+    assert read(local_path) == read(remote_book)
+
+
+@pytest.mark.parametrize("change", ["mtime", "size"])
+def test_local_copy_touched_outside_checkout_is_refreshed(remote_book, change):
+    local_path, _, _ = checkout(remote_book)
+
+    # 前回の実行が途中で終わった等で作業コピーだけが書き換わった
+    if change == "mtime":
+        with open(local_path, "r+b") as f:
+            f.write(b"LOCAL")
+        touch(local_path)
+    else:
+        with open(local_path, "ab") as f:
+            f.write(b" half-written")
+
+    _, _, refreshed = checkout(remote_book)
+
+    assert refreshed == [local_path]
+    assert read(local_path) == b"remote v1"
+
+
+def test_checkin_writes_back_and_next_checkout_reuses_copy(remote_book):
+    local_path, remote_state, _ = checkout(remote_book)
+    with open(local_path, "wb") as f:
+        f.write(b"transferred")
+
+    book_cache.checkin(local_path, remote_book, remote_state)
+
+    assert read(remote_book) == b"transferred"
+    _, _, refreshed = checkout(remote_book)
+    assert refreshed == []
+
+
+def test_checkin_refuses_when_remote_changed(remote_book):
+    local_path, remote_state, _ = checkout(remote_book)
+    with open(local_path, "wb") as f:
+        f.write(b"transferred")
+
+    # 作業中に別の人が共有フォルダのブックを保存した
+    with open(remote_book, "wb") as f:
+        f.write(b"someone else")
+    touch(remote_book)
+
+    with pytest.raises(book_cache.BookConflictError):
+        book_cache.checkin(local_path, remote_book, remote_state)
+
+    assert read(remote_book) == b"someone else"
+    cache_dir = os.path.dirname(local_path)
+    conflicts = [name for name in os.listdir(cache_dir) if ".conflict-" in name]
+    assert len(conflicts) == 1
+    assert conflicts[0].startswith("fam8進捗_202505.conflict-") and conflicts[0].endswith(".xlsm")
+    assert read(os.path.join(cache_dir, conflicts[0])) == b"transferred"
+
+
+def test_checkin_detects_mtime_only_change(remote_book):
+    local_path, remote_state, _ = checkout(remote_book)
+    touch(remote_book)
+
+    with pytest.raises(book_cache.BookConflictError):
+        book_cache.checkin(local_path, remote_book, remote_state)
+
+    assert read(remote_book) == b"remote v1"
+
+
+def test_macro_stage_releases_worker_book_before_refresh(remote_book, monkeypatch):
+    calls = []
+    monkeypatch.setitem(excel_writer.CONFIG["CACHE"], "enabled", True)
+    monkeypatch.setitem(excel_writer.CONFIG["WORKER"], "enabled", True)
+    monkeypatch.setattr(excel_writer.excel_worker, "release_book", lambda path: calls.append(("release", path)))
+    monkeypatch.setattr(excel_writer, "kill_excel_processes", lambda: calls.append(("kill",)))
+
+    class FailingWorkbook:
+        def open(self, path):
+            calls.append(("open", path))
+            raise RuntimeError("Excelなし")
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(excel_writer, "XlwingsWorkbook", FailingWorkbook)
+
+    assert excel_writer.run_macro_stage(remote_book) is False
+
+    local_path = book_cache.get_local_path(remote_book)
+    # 作業コピーを置き換える前と開く前にワーカーのブックを閉じ、ワーカーのExcelは終了しない
+    assert calls == [("release", local_path), ("release", local_path), ("open", local_path)]
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""excel_writer.py の参照シート差分書き込み（セル値の正規化・変更ブロックの検出）のテスト"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import excel_writer
+
+
+class FakeWorkbook:
+    """参照シートの読み書きを記録するだけのブック"""
+
+    def __init__(self, current):
+        self.current = current
+        self.writes = []
+        self.clears = []
+
+    def read_matrix(self, sheet_name, address):
+        return self.current
+
+    def write_matrix(self, sheet_name, top_left, matrix):
+        self.writes.append((top_left, matrix))
+
+    def clear_range(self, sheet_name, address):
+        self.clears.append(address)
+
+
+def row(advertiser_id, gross="100", net="90"):
+    """CSVから作る参照シートの1行（B〜M列）"""
+    return [advertiser_id, f"広告主{advertiser_id}", "", "代理店", "100%", "1000", "10", "1.0%", "1", "10.0%", gross, net]
+
+
+def excel_row(advertiser_id, gross=100.0, net=90.0):
+    """Excelが row() を数値に変換して保持した値（読み戻した値）"""
+    return [float(advertiser_id), f"広告主{advertiser_id}", None, "代理店", 1.0, 1000.0, 10.0, 0.01, 1.0, 0.1, gross, net]
+
+
+@pytest.mark.parametrize("csv_value, excel_value", [
+    ("12.5%", 0.125),
+    ("0.128%", 0.00128),
+    ("", None),
+    ("  ", None),
+    ("1141", 1141.0),
+    # Excelは有効数字15桁で保持する
+    ("211992.81000000006", 211992.81),
+    ("154230.7678400005", 154230.767840001),
+    ("広告主A", "広告主A"),
+])
+def test_normalize_matches_excel_round_trip(csv_value, excel_value):
+    assert excel_writer.normalize_cell_value(csv_value) == excel_writer.normalize_cell_value(excel_value)
+
+
+def test_normalize_keeps_real_differences():
+    assert excel_writer.normalize_cell_value("12.5%") != excel_writer.normalize_cell_value(12.5)
+    assert excel_writer.normalize_cell_value("100") != excel_writer.normalize_cell_value(100.00000001)
+    assert excel_writer.normalize_cell_value("0") != excel_writer.normalize_cell_value(None)
+
+
+def test_changed_rows_are_grouped_into_contiguous_blocks():
+    current = [excel_row(i) for i in range(1, 8)]
+    matrix = [row(str(i)) for i in range(1, 8)]
+    matrix[1] = row("2", gross="101")
+    matrix[2] = row("3", net="91")
+    matrix[5] = row("6", gross="0")
+
+    assert excel_writer.find_changed_blocks(current, matrix) == [(1, 2), (5, 1)]
+
+
+def test_rows_beyond_existing_data_are_changed():
+    current = [excel_row(1)]
+    matrix = [row("1"), row("2"), row("3")]
+
+    assert excel_writer.find_changed_blocks(current, matrix) == [(1, 2)]
+
+
+def test_unchanged_sheet_writes_nothing():
+    current = [excel_row(i) for i in range(1, 4)] + [[None] * 12] * 5
+    workbook = FakeWorkbook(current)
+
+    excel_writer.write_advertiser_diff(workbook, [row(str(i)) for i in range(1, 4)])
+
+    assert workbook.writes == []
+    assert workbook.clears == []
+
+
+def test_shorter_matrix_clears_trailing_rows():
+    current = [excel_row(i) for i in range(1, 6)] + [[None] * 12] * 5
+    workbook = FakeWorkbook(current)
+    matrix = [row("1"), row("2", gross="200")]
+
+    excel_writer.write_advertiser_diff(workbook, matrix)
+
+    assert workbook.writes == [("B3", [matrix[1]])]
+    # 新しいデータの次の行（4行目）から旧データの最終行（6行目）まで
+    assert workbook.clears == ["B4:M6"]
+
+
+def test_empty_sheet_is_written_in_one_block():
+    workbook = FakeWorkbook(None)
+    matrix = [row("1"), row("2")]
+
+    excel_writer.write_advertiser_diff(workbook, matrix)
+
+    assert workbook.writes == [("B2", matrix)]
+    assert workbook.clears == []
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""browser_control.py の直接エクスポート（記録したPOSTの再送）のテスト
+
+ローカルのスタブサーバーに送信し、日付の差し替え・Cookieの引き継ぎ・分割保存を確認する。
+"""
+import os
+import sys
+import asyncio
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import browser_control
+
+# スタブサーバーが返すCSVの繰り返し行数（分割書き込みを通るよう数MBにする）
+CSV_ROWS = 100000
+
+
+class ExportStubHandler(BaseHTTPRequestHandler):
+    """CSV出力のPOSTを受け、日付とCookieを埋め込んだcp932のCSVを返す"""
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        form = parse_qs(self.rfile.read(length).decode("ascii"), encoding="cp932")
+
+        if self.headers.get("Cookie") != "PHPSESSID=abc123":
+            body = "<html>ログイン</html>".encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+        else:
+            header = f"期間,{form['from'][0]},{form['to'][0]},{form['keyword'][0]}\r\n"
+            body = (header + "①,1,2\r\n" * CSV_ROWS).encode("cp932")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Disposition", "attachment; filename=export.csv")
+
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeRequestContext:
+    """APIRequestContext の代わり（Cookieの取得だけ）"""
+
+    def __init__(self, cookies):
+        self.cookies = cookies
+
+    async def storage_state(self):
+        return {"cookies": self.cookies, "origins": []}
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ExportStubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/report/export"
+    server.shutdown()
+    server.server_close()
+
+
+def make_template(url):
+    return {
+        "url": url,
+        "body": "mode=csv&from=2025-01-01&to=2025-01-01&keyword=%83e%83X%83g",
+        "from_field": "from",
+        "to_field": "to",
+    }
+
+
+def test_direct_export_streams_to_file(stub_server, tmp_path):
+    cookies = [
+        {"name": "PHPSESSID", "value": "abc123", "domain": "127.0.0.1", "path": "/", "secure": False},
+        {"name": "other", "value": "x", "domain": "example.com", "path": "/", "secure": False},
+    ]
+    save_path = asyncio.run(browser_control.direct_export(
+        FakeRequestContext(cookies), "general", str(tmp_path), "20250519", "20250519", make_template(stub_server)))
+
+    assert save_path == os.path.join(str(tmp_path), "general_campane.csv")
+    with open(save_path, "rb") as f:
+        content = f.read()
+    first_line = content.split(b"\r\n", 1)[0].decode("cp932")
+    assert first_line == "期間,2025-05-19,2025-05-19,テスト"
+    assert content.count("①".encode("cp932")) == CSV_ROWS
+
+    manifest = json.loads((tmp_path / browser_control.DOWNLOAD_MANIFEST).read_text(encoding="utf-8"))
+    assert manifest["general_campane.csv"]["bytes"] == len(content)
+    assert manifest["general_campane.csv"]["sha256"] == hashlib.sha256(content).hexdigest()
+    assert not os.path.exists(browser_control.partial_path(save_path))
+
+
+def test_direct_export_rejects_logged_out_response(stub_server, tmp_path):
+    with pytest.raises(Exception, match="CSV以外"):
+        asyncio.run(browser_control.direct_export(
+            FakeRequestContext([]), "adult", str(tmp_path), "20250519", "20250519", make_template(stub_server)))
+
+    assert os.listdir(tmp_path) == []
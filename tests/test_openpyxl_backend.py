@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""excel_writer.py のopenpyxlバックエンド（meta/template.xlsm に転記して残る部品）のテスト"""
+import os
+import sys
+import shutil
+import zipfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import excel_writer
+
+openpyxl = pytest.importorskip("openpyxl")
+
+TEMPLATE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "meta", "template.xlsm")
+
+# 参照シート（sheet1.xml）のボタン関連の要素
+BUTTON_ELEMENTS = ("<controls>", "<drawing ")
+
+
+@pytest.fixture
+def book(tmp_path):
+    path = tmp_path / "progress.xlsm"
+    shutil.copy(TEMPLATE, path)
+    return str(path)
+
+
+def transfer(path):
+    workbook = excel_writer.OpenpyxlWorkbook()
+    workbook.open(path)
+    try:
+        # B:ID C:広告主名 D:空 E:代理店名 F:表示率 G:Imp H:Click I:CTR J:CV K:CVR L:グロス M:ネット
+        matrix = [["1001", "広告主A", "", "代理店A", "12.5%", "1234", "12", "1.0%", "1", "8.3%", "1000", "900"]]
+        excel_writer.apply_transfer(workbook, matrix, [(5, (1000, 900), (500, 400))], run_macro=False)
+    finally:
+        workbook.close()
+
+
+def test_template_is_flagged_for_lost_button():
+    lossy_parts = excel_writer.find_openpyxl_lossy_parts(TEMPLATE)
+
+    assert "xl/drawings/drawing1.xml" in lossy_parts
+    assert "xl/ctrlProps/ctrlProp1.xml" in lossy_parts
+    # 印刷設定とVMLは保存後も実害がないため対象外
+    assert not any(name.startswith("xl/printerSettings/") for name in lossy_parts)
+    assert "xl/drawings/vmlDrawing1.vml" not in lossy_parts
+
+
+def test_openpyxl_transfer_keeps_macros_and_data_but_loses_button(book):
+    transfer(book)
+
+    with zipfile.ZipFile(book) as archive:
+        names = set(archive.namelist())
+        sheet_xml = archive.read("xl/worksheets/sheet1.xml").decode("utf-8")
+
+    # 残るもの: マクロ・VML・用紙設定
+    assert "xl/vbaProject.bin" in names
+    assert "xl/drawings/vmlDrawing1.vml" in names
+    assert "<pageSetup" in sheet_xml
+    # 失われるもの: ボタンの図形とシートからの参照・プリンタドライバの設定
+    assert "xl/drawings/drawing1.xml" not in names
+    assert not any(element in sheet_xml for element in BUTTON_ELEMENTS)
+    assert "xl/printerSettings/printerSettings1.bin" not in names
+
+    saved = openpyxl.load_workbook(book, keep_vba=True)
+    sheet = saved["参照"]
+    assert sheet["B2"].value == 1001
+    assert sheet["F2"].value == pytest.approx(0.125)
+    assert sheet["G2"].value == 1234
+    assert saved["一般その他"]["J5"].value == 1000
+    assert saved["アダルトその他"]["K5"].value == 400
+
+
+def test_resolve_backend_refuses_without_excel(book, monkeypatch):
+    monkeypatch.setattr(excel_writer, "is_excel_available", lambda: False)
+
+    with pytest.raises(RuntimeError):
+        excel_writer.resolve_backend(book, "openpyxl")
+
+    monkeypatch.setitem(excel_writer.CONFIG["EXCEL"], "openpyxl_allow_lossy", True)
+    assert excel_writer.resolve_backend(book, "openpyxl") == "openpyxl"
+
+
+def test_resolve_backend_switches_to_excel(book, monkeypatch):
+    monkeypatch.setattr(excel_writer, "is_excel_available", lambda: True)
+
+    assert excel_writer.resolve_backend(book, "openpyxl") == "xlwings"
+
+
+def test_excel_is_not_available_without_windows_or_mac(monkeypatch):
+    monkeypatch.setattr(excel_writer.sys, "platform", "linux")
+
+    assert excel_writer.is_excel_available() is False
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""parse_log.py の --since/--until 解析・複数日のマージ・--follow の通知待ちのテスト"""
+import os
+import sys
+from collections import namedtuple
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parse_log
+from parse_log import parse_time_bound
+
+
+@pytest.mark.parametrize("value, is_until, expected", [
+    ("202505121030", False, (0, "2025-05-12 10:30:00")),
+    ("202505121030", True, (0, "2025-05-12 10:30:59")),
+    ("20250512103005", False, (0, "2025-05-12 10:30:05")),
+    ("20250512103005", True, (0, "2025-05-12 10:30:05")),
+    ("20250512", False, (0, "2025-05-12 00:00:00")),
+    ("20250512", True, (0, "2025-05-12 23:59:59")),
+    ("2025-05-12 10:30", True, (0, "2025-05-12 10:30:59")),
+    ("10:30", False, (11, "10:30:00")),
+    ("10:30:05", True, (11, "10:30:05")),
+])
+def test_parse_time_bound(value, is_until, expected):
+    assert parse_time_bound(value, is_until) == expected
+
+
+@pytest.mark.parametrize("value", ["2025051210", "2025051210300", "25:00", "20251332", "10:3"])
+def test_parse_time_bound_rejects_invalid(value):
+    with pytest.raises(ValueError):
+        parse_time_bound(value)
+
+
+def log_line(timestamp, message, level="INFO"):
+    return f"{timestamp} | {level: <8} | excel_writer:process_date:10 - {message}\n"
+
+
+@pytest.fixture
+def args(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["parse_log.py", "--no-index"])
+    return parse_log.parse_arguments()
+
+
+def test_merge_orders_overlapping_and_interleaved_files(tmp_path, args):
+    # 日付をまたいだプロセスのログは起動日のファイルに残る
+    day1 = tmp_path / "20250519.log"
+    day1.write_text(log_line("2025-05-19 23:59:58", "a") + log_line("2025-05-20 00:00:03", "d")
+                    + "Traceback (most recent call last):\n", encoding="utf-8")
+    # 2つのプロセスの書き込みが前後したファイル
+    day2 = tmp_path / "20250520.log"
+    day2.write_text(log_line("2025-05-20 00:00:01", "b") + log_line("2025-05-20 00:00:05", "f")
+                    + log_line("2025-05-20 00:00:04", "e") + log_line("2025-05-20 00:00:02", "c"), encoding="utf-8")
+
+    assert parse_log.is_time_ordered(str(day1))
+    assert not parse_log.is_time_ordered(str(day2))
+
+    entries = list(parse_log.iter_merged_entries([str(day1), str(day2)], args))
+
+    assert [entry["message"].split()[0] for entry in entries] == ["a", "b", "c", "d", "e", "f"]
+    assert [entry["timestamp"] for entry in entries] == sorted(entry["timestamp"] for entry in entries)
+
+
+Event = namedtuple("Event", ["wd", "mask", "cookie", "name"])
+
+
+class FakeINotify:
+    """read() のたびに用意した通知を1回分ずつ返す"""
+
+    def __init__(self, *batches):
+        self.batches = list(batches)
+        self.reads = 0
+
+    def read(self, timeout=None):
+        self.reads += 1
+        return self.batches.pop(0) if self.batches else []
+
+    def close(self):
+        pass
+
+
+def test_follow_ignores_index_updates(tmp_path, monkeypatch):
+    monkeypatch.setitem(parse_log.CONFIG, "log_dir", str(tmp_path))
+    monkeypatch.setitem(parse_log.CONFIG, "follow_interval", 5)
+    follower = parse_log.LogFollower()
+    today = os.path.basename(follower.today_path())
+
+    # 索引（SQLite本体とジャーナル）の更新では戻らず、追跡中のログの更新で戻る
+    follower.inotify = FakeINotify(
+        [Event(1, 2, 0, today + ".idx"), Event(1, 256, 0, today + ".idx-journal")],
+        [Event(1, 2, 0, "20250101.log.idx")],
+        [Event(1, 2, 0, today)],
+        [Event(1, 2, 0, today)],
+    )
+    follower.wait()
+
+    assert follower.inotify.reads == 3
+    follower.close()
+
+
+def test_follow_wait_returns_after_interval_without_events(tmp_path, monkeypatch):
+    monkeypatch.setitem(parse_log.CONFIG, "log_dir", str(tmp_path))
+    monkeypatch.setitem(parse_log.CONFIG, "follow_interval", 0.05)
+    follower = parse_log.LogFollower()
+    follower.inotify = FakeINotify()
+
+    follower.wait()
+
+    assert follower.inotify.reads >= 1
+    follower.close()
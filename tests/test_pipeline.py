@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""pipeline.py の転記先ブックの選択とログのモジュール表記のテスト"""
+import os
+import sys
+import asyncio
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("playwright")
+
+import pipeline
+from loguru import logger
+
+
+@pytest.fixture
+def stages(monkeypatch, tmp_path):
+    """ブラウザ操作・Excel操作を伴うステージを置き換え、転記先のブックを記録する"""
+    transferred = []
+
+    async def run_month_check(target_date, timer):
+        # 月末日は月替わりチェックで次月のブックが作成される
+        (tmp_path / "新2025年6月fam8進捗.xlsm").write_bytes(b"")
+        return pipeline.BookInfo(target_date, str(tmp_path / "新2025年5月fam8進捗.xlsm"))
+
+    async def run_download(target_date, timer):
+        return pipeline.CsvBundle(target_date, str(tmp_path / target_date))
+
+    async def run_extraction(csv_dir, download_task, timer):
+        await download_task
+        return pipeline.ExtractedTotals((100, 90), (50, 40))
+
+    async def run_transfer(book, bundle, totals, timer):
+        transferred.append(book.path)
+        return True
+
+    def find_progress_book_path():
+        return sorted(str(path) for path in tmp_path.glob("新*年*月fam8進捗.xlsm"))[-1]
+
+    (tmp_path / "新2025年5月fam8進捗.xlsm").write_bytes(b"")
+    monkeypatch.setattr(pipeline, "run_month_check", run_month_check)
+    monkeypatch.setattr(pipeline, "run_download", run_download)
+    monkeypatch.setattr(pipeline, "run_extraction", run_extraction)
+    monkeypatch.setattr(pipeline, "run_transfer", run_transfer)
+    monkeypatch.setattr(pipeline.excel_writer, "find_progress_book_path", find_progress_book_path)
+    monkeypatch.setitem(pipeline.CONFIG, "ingest", False)
+    return transferred
+
+
+def test_month_end_transfers_to_latest_book_like_excel_writer(stages):
+    assert asyncio.run(pipeline.run_pipeline("20250531")) == 0
+
+    # 従来の excel_writer.py と同じく、月替わりチェック後の最新の進捗ブック
+    assert [os.path.basename(path) for path in stages] == ["新2025年6月fam8進捗.xlsm"]
+
+
+@pytest.mark.parametrize("module, stage, expected", [
+    ("browser_control", None, "browser"),
+    ("month_checker", None, "month_checker"),
+    ("excel_writer", "csv_store", "excel_writer"),
+    ("advertiser_csv", None, "excel_writer"),
+    ("advertiser_csv", "csv_store", "csv_store"),
+    ("csv_encoding", "excel_writer", "excel_writer"),
+    ("book_cache", None, "excel_writer"),
+    ("excel_worker", None, "excel_writer"),
+    ("campaign_analytics", None, "csv_store"),
+    ("pipeline", None, "pipeline"),
+])
+def test_log_labels_match_standalone_runs(module, stage, expected):
+    record = {"module": module, "extra": {} if stage is None else {"stage": stage}}
+
+    pipeline.set_log_label(record)
+
+    assert record["extra"]["label"] == expected
+
+
+def test_stage_label_reaches_worker_threads(tmp_path, monkeypatch):
+    import csv_encoding
+    import advertiser_csv
+
+    monkeypatch.setattr(csv_encoding, "CACHE_FILE", str(tmp_path / "encoding_cache.json"))
+    monkeypatch.setattr(csv_encoding, "_cache", None)
+    path = tmp_path / "advertiser.csv"
+    path.write_bytes("ID,広告主名,代理店名\r\n1,広告主,代理店\r\n".encode("cp932"))
+    records = []
+    handler_id = logger.add(lambda message: records.append(message.record), format="{message}")
+    logger.configure(patcher=pipeline.set_log_label)
+    try:
+        async def run():
+            with logger.contextualize(stage="csv_store"):
+                await asyncio.to_thread(list, advertiser_csv.iter_advertiser_rows(str(path)))
+
+        asyncio.run(run())
+    finally:
+        logger.remove(handler_id)
+        logger.configure(patcher=lambda record: None)
+
+    labels = {record["extra"]["label"] for record in records if record["module"] == "advertiser_csv"}
+    assert labels == {"csv_store"}
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""excel_writer.py のキャンペーンCSV末尾の[total]行の読み込みのテスト"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import excel_writer
+
+HEADER = "キャンペーングループ,ID,キャンペーン名,サイズ,ステータス,a,b,c,d,e,f,g,h,グロス,ネット\r\n"
+TOTAL = ",,[total],,,1,2,3,4,5,6,7,8,441799.97,320561.332196"
+
+
+def detail_line(index):
+    return f"グループ{index},{index},キャンペーン{index},300x250,配信中,1,2,3,4,5,6,7,8,100.5,80.25\r\n"
+
+
+def write_csv(path, body, encoding="cp932"):
+    path.write_bytes(body.encode(encoding))
+    return str(path)
+
+
+def test_small_file_without_trailing_newline(tmp_path):
+    path = write_csv(tmp_path / "general_campane.csv", HEADER + detail_line(1) + TOTAL)
+
+    line, bytes_read = excel_writer.read_total_line(path, "cp932")
+
+    assert line == TOTAL
+    assert bytes_read == os.path.getsize(path)
+
+
+def test_total_line_straddles_block_boundary(tmp_path):
+    body = HEADER + "".join(detail_line(i) for i in range(200)) + TOTAL + "\r\n"
+    path = write_csv(tmp_path / "general_campane.csv", body)
+    size = os.path.getsize(path)
+    total_start = size - len((TOTAL + "\r\n").encode("cp932"))
+
+    # 行頭が末尾ブロックの外、[total] がブロック内になるブロックサイズ
+    block_size = size - total_start - 5
+    line, bytes_read = excel_writer.read_total_line(path, "cp932", block_size=block_size)
+
+    assert line == TOTAL
+    assert bytes_read == 2 * block_size
+
+    # [total] の途中でブロックが切れる場合
+    marker_start = total_start + 2
+    line, _ = excel_writer.read_total_line(path, "cp932", block_size=size - marker_start - 3)
+    assert line == TOTAL
+
+
+def test_large_file_reads_only_the_tail(tmp_path):
+    body = HEADER + "".join(detail_line(i) for i in range(2000)) + TOTAL + "\r\n"
+    path = write_csv(tmp_path / "general_campane.csv", body)
+
+    line, bytes_read = excel_writer.read_total_line(path, "cp932")
+
+    assert line == TOTAL
+    assert bytes_read == 8192
+    assert bytes_read < os.path.getsize(path)
+
+
+def test_missing_total_line(tmp_path):
+    path = write_csv(tmp_path / "general_campane.csv", HEADER + "".join(detail_line(i) for i in range(500)))
+
+    line, bytes_read = excel_writer.read_total_line(path, "cp932")
+
+    assert line is None
+    assert bytes_read == os.path.getsize(path)
+
+    with pytest.raises(ValueError):
+        excel_writer.extract_total_values(path, "一般")
+
+
+def test_quoted_comma_before_amount_columns(tmp_path):
+    total = ',,[total],"300x250, 728x90",,1,2,3,4,5,6,7,8,"441799.97","320561.332196"'
+    path = write_csv(tmp_path / "general_campane.csv", HEADER + detail_line(1) + total + "\r\n")
+
+    assert excel_writer.extract_total_values(path, "一般") == (441800, 320561)
+
+
+def test_utf8_total_line(tmp_path):
+    path = write_csv(tmp_path / "general_campane.csv", HEADER + detail_line(1) + TOTAL + "\n", encoding="utf-8")
+
+    assert excel_writer.extract_total_values(path, "一般") == (441800, 320561)
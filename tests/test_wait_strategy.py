@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""browser_control.py のリクエスト追跡（watch_requests）のテスト"""
+import os
+import sys
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import browser_control
+
+
+class FakePage:
+    """page.on / page.remove_listener だけを持つページ"""
+
+    def __init__(self):
+        self.listeners = {}
+
+    def on(self, event, handler):
+        self.listeners.setdefault(event, []).append(handler)
+
+    def remove_listener(self, event, handler):
+        self.listeners[event].remove(handler)
+
+    def emit(self, event, url):
+        for handler in list(self.listeners.get(event, [])):
+            handler(SimpleNamespace(url=url))
+
+    def listener_count(self):
+        return sum(len(handlers) for handlers in self.listeners.values())
+
+
+@pytest.fixture
+def fast_wait(monkeypatch):
+    monkeypatch.setitem(browser_control.CONFIG["WAIT_STRATEGY"], "stable_sec", 0.05)
+    monkeypatch.setitem(browser_control.CONFIG["WAIT_STRATEGY"], "poll_interval", 0.01)
+
+
+def test_listeners_detached_without_waiting(monkeypatch, fast_wait):
+    # 固定待機（event_driven=False）では条件が呼ばれないが、with文を抜ければリスナーは外れる
+    monkeypatch.setitem(browser_control.CONFIG["WAIT_STRATEGY"], "event_driven", False)
+    page = FakePage()
+
+    async def run():
+        with browser_control.watch_requests(page) as requests:
+            assert page.listener_count() == 3
+            await browser_control.wait_ready("テスト", 0.01, requests.settled)
+
+    asyncio.run(run())
+    assert page.listener_count() == 0
+
+
+def test_listeners_detached_on_error(fast_wait):
+    page = FakePage()
+    with pytest.raises(RuntimeError):
+        with browser_control.watch_requests(page):
+            raise RuntimeError("click failed")
+    assert page.listener_count() == 0
+
+
+def test_settled_waits_for_tracked_requests(fast_wait):
+    page = FakePage()
+    url = f"https://example.com/{browser_control.CONFIG['WAIT_STRATEGY']['request_filter']}"
+
+    async def run():
+        with browser_control.watch_requests(page, require_seen=False) as requests:
+            page.emit("request", url)
+            waiter = asyncio.ensure_future(requests.settled())
+            await asyncio.sleep(0.2)
+            assert not waiter.done()  # 完了していないリクエストがある
+            page.emit("requestfinished", url)
+            await asyncio.wait_for(waiter, timeout=1)
+
+    asyncio.run(run())
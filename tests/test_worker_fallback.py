@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""excel_writer.py の常駐Excelワーカーから通常の転記への切り替え条件のテスト"""
+import os
+import sys
+from concurrent.futures import Future
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import excel_worker
+import excel_writer
+
+
+def transfer_data():
+    future = Future()
+    future.set_result(([["1", "広告主"]], [(5, (100, 90), (50, 40))]))
+    return future
+
+
+@pytest.fixture
+def submit(monkeypatch):
+    """submit_transfer が指定した例外を送出するようにする"""
+    def use(error):
+        def submit_transfer(*args, **kwargs):
+            raise error
+        monkeypatch.setattr(excel_worker, "submit_transfer", submit_transfer)
+    return use
+
+
+@pytest.mark.parametrize("error", [
+    excel_worker.WorkerNotRunningError("Excelワーカーが起動していません"),
+    ConnectionRefusedError(10061, "接続が拒否されました"),
+])
+def test_falls_back_only_when_worker_is_not_running(submit, error):
+    submit(error)
+
+    assert excel_writer.write_via_worker("progress.xlsm", transfer_data()) is None
+
+
+@pytest.mark.parametrize("error", [
+    # ワーカーのプロセスは起動したがExcelの起動が終わっていない
+    TimeoutError("Excelワーカーが60秒以内に起動しませんでした"),
+    EOFError(),
+    ConnectionResetError(10054, "接続がリセットされました"),
+    excel_worker.AuthenticationError("digest received was wrong"),
+    RuntimeError("Excelワーカーでの転記に失敗しました"),
+])
+def test_keeps_worker_excel_on_other_failures(submit, error):
+    submit(error)
+
+    assert excel_writer.write_via_worker("progress.xlsm", transfer_data()) is False
+
+
+def test_start_timeout_does_not_kill_excel(submit, monkeypatch, tmp_path):
+    submit(TimeoutError("Excelワーカーが60秒以内に起動しませんでした"))
+    killed = []
+    monkeypatch.setattr(excel_writer, "kill_excel_processes", lambda: killed.append(True))
+    monkeypatch.setitem(excel_writer.CONFIG["EXCEL"], "backend", "xlwings")
+    monkeypatch.setitem(excel_writer.CONFIG["WORKER"], "enabled", True)
+    book = tmp_path / "progress.xlsm"
+    book.write_bytes(b"")
+
+    assert excel_writer.write_to_book(str(book), transfer_data()) is False
+    assert killed == []